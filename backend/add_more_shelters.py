@@ -1,13 +1,13 @@
 # backend/add_more_shelters.py
 
 from app.db import SessionLocal
-from app.models.shelter import Shelter
+from app.importer import import_records
 
 def main():
     db = SessionLocal()
 
     new_shelters = [
-        Shelter(
+        dict(
             name="Downtown Family Shelter",
             address="200 Church St, Nashville, TN",
             geo_lat=36.1655,
@@ -16,7 +16,7 @@ def main():
             policies="Walk-ins allowed; families prioritized.",
             hours="Open 24/7",
         ),
-        Shelter(
+        dict(
             name="East Nashville Community Housing",
             address="900 Woodland St, Nashville, TN",
             geo_lat=36.1742,
@@ -25,7 +25,7 @@ def main():
             policies="Check-in 5–9pm; ID preferred but not required.",
             hours="5pm–9am daily",
         ),
-        Shelter(
+        dict(
             name="Northside Emergency Shelter",
             address="1500 10th St N, Nashville, TN",
             geo_lat=36.1901,
@@ -34,7 +34,7 @@ def main():
             policies="Single adults; no pets.",
             hours="Open 24/7",
         ),
-        Shelter(
+        dict(
             name="Southside Outreach Center",
             address="500 Nolensville Pike, Nashville, TN",
             geo_lat=36.1408,
@@ -43,7 +43,7 @@ def main():
             policies="Families and seniors; intake interview required.",
             hours="9am–10pm",
         ),
-        Shelter(
+        dict(
             name="West End Support Shelter",
             address="2500 West End Ave, Nashville, TN",
             geo_lat=36.1517,
@@ -55,21 +55,9 @@ def main():
     ]
 
     try:
-        for s in new_shelters:
-            # avoid duplicating if you re-run script
-            existing = (
-                db.query(Shelter)
-                .filter(Shelter.name == s.name, Shelter.address == s.address)
-                .first()
-            )
-            if existing:
-                print(f"⚠️ Shelter already exists, skipping: {s.name}")
-                continue
-
-            db.add(s)
-
-        db.commit()
-        print("✅ Added extra shelters (or skipped existing ones).")
+        # upsert on normalized name+address: re-running updates instead of duplicating
+        result = import_records(db, new_shelters)
+        print(f"✅ Added {result.inserted}, updated {result.updated}, unchanged {result.skipped}.")
     except Exception as e:
         db.rollback()
         print("❌ Error inserting shelters:", e)
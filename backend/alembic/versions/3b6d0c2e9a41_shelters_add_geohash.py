@@ -0,0 +1,61 @@
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "3b6d0c2e9a41"
+down_revision = "8285fbf7b7f4"
+branch_labels = None
+depends_on = None
+
+# Frozen copy of app.geo.encode_geohash as of this revision (precision 9); the migration
+# must keep producing the same hashes even if the app code changes later.
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def _encode_geohash(lat: float, lng: float, precision: int = 9) -> str:
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    chars = []
+    bit, ch, even = 0, 0, True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                ch = (ch << 1) | 1
+                lng_lo = mid
+            else:
+                ch <<= 1
+                lng_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                ch = (ch << 1) | 1
+                lat_lo = mid
+            else:
+                ch <<= 1
+                lat_hi = mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(_BASE32[ch])
+            bit, ch = 0, 0
+    return "".join(chars)
+
+def upgrade() -> None:
+    op.add_column("shelters", sa.Column("geohash", sa.String(length=12), nullable=True))
+
+    # Backfill existing rows
+    conn = op.get_bind()
+    rows = conn.execute(sa.text("SELECT id, geo_lat, geo_lng FROM shelters")).fetchall()
+    for row in rows:
+        conn.execute(
+            sa.text("UPDATE shelters SET geohash = :gh WHERE id = :id"),
+            {"gh": _encode_geohash(row.geo_lat, row.geo_lng), "id": row.id},
+        )
+
+    op.create_index("ix_shelters_geohash", "shelters", ["geohash"])
+
+def downgrade() -> None:
+    op.drop_index("ix_shelters_geohash", table_name="shelters")
+    with op.batch_alter_table("shelters") as batch_op:
+        batch_op.drop_column("geohash")
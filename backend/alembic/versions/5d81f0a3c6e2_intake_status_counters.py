@@ -0,0 +1,38 @@
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "5d81f0a3c6e2"
+down_revision = "a4c2e7f19b35"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        "intake_status_counters",
+        sa.Column("shelter_id", sa.Integer(), sa.ForeignKey("shelters.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("status", sa.String(), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.create_table(
+        "intake_daily_counters",
+        sa.Column("shelter_id", sa.Integer(), sa.ForeignKey("shelters.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("status", sa.String(), primary_key=True),
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+    # Seed from existing intakes (same logic as rebuild_intake_counters.py)
+    op.execute(
+        "INSERT INTO intake_status_counters (shelter_id, status, count) "
+        "SELECT shelter_id, status, COUNT(*) FROM intake_requests GROUP BY shelter_id, status"
+    )
+    op.execute(
+        "INSERT INTO intake_daily_counters (shelter_id, status, day, count) "
+        "SELECT shelter_id, status, date(created_at), COUNT(*) FROM intake_requests "
+        "WHERE created_at IS NOT NULL GROUP BY shelter_id, status, date(created_at)"
+    )
+
+def downgrade() -> None:
+    op.drop_table("intake_daily_counters")
+    op.drop_table("intake_status_counters")
@@ -0,0 +1,36 @@
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "9c3e5b7d2f10"
+down_revision = "5d81f0a3c6e2"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        "notification_outbox",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("channel", sa.String(), nullable=False),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("shelter_id", sa.Integer(), sa.ForeignKey("shelters.id", ondelete="SET NULL"), nullable=True),
+        sa.Column("intake_id", sa.Integer(), nullable=True),
+        sa.Column("recipient", sa.String(), nullable=True),
+        sa.Column("subject", sa.String(), nullable=True),
+        sa.Column("body", sa.Text(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False, server_default="pending"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("next_attempt_at", sa.DateTime(), nullable=False),
+        sa.Column("claimed_by", sa.String(), nullable=True),
+        sa.Column("claimed_at", sa.DateTime(), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("sent_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_notification_outbox_id", "notification_outbox", ["id"])
+    op.create_index("ix_notification_outbox_due", "notification_outbox", ["status", "next_attempt_at"])
+
+def downgrade() -> None:
+    op.drop_index("ix_notification_outbox_due", table_name="notification_outbox")
+    op.drop_index("ix_notification_outbox_id", table_name="notification_outbox")
+    op.drop_table("notification_outbox")
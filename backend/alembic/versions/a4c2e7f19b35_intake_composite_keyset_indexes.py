@@ -0,0 +1,31 @@
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "a4c2e7f19b35"
+down_revision = "3b6d0c2e9a41"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # Match the real filter shapes: (shelter[, status]) + newest-first keyset on (created_at, id)
+    op.create_index(
+        "ix_intake_requests_shelter_status_created",
+        "intake_requests",
+        ["shelter_id", "status", sa.text("created_at DESC"), sa.text("id DESC")],
+    )
+    op.create_index(
+        "ix_intake_requests_shelter_created",
+        "intake_requests",
+        ["shelter_id", sa.text("created_at DESC"), sa.text("id DESC")],
+    )
+    op.create_index(
+        "ix_intake_requests_status_created",
+        "intake_requests",
+        ["status", sa.text("created_at DESC"), sa.text("id DESC")],
+    )
+
+def downgrade() -> None:
+    op.drop_index("ix_intake_requests_status_created", table_name="intake_requests")
+    op.drop_index("ix_intake_requests_shelter_created", table_name="intake_requests")
+    op.drop_index("ix_intake_requests_shelter_status_created", table_name="intake_requests")
@@ -0,0 +1,93 @@
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "a9e3f7c2b5d4"
+down_revision = "f4b9d1e6a2c3"
+branch_labels = None
+depends_on = None
+
+# Columns of capacity_logs, in table order, for copying between layouts
+COLUMNS = "id, shelter_id, beds_total, beds_available, updated_at, updated_by, created_at"
+
+def _month_start(ts, add=0):
+    m = ts.year * 12 + (ts.month - 1) + add
+    return datetime(m // 12, m % 12 + 1, 1)
+
+def _partition_postgres() -> None:
+    # Rebuild capacity_logs as a monthly RANGE partitioned table on updated_at.
+    # The primary key has to include the partition key, hence (id, updated_at).
+    conn = op.get_bind()
+    op.execute("ALTER TABLE capacity_logs RENAME TO capacity_logs_unpartitioned")
+    # Index-backed names are schema-wide; free them for the new table
+    op.execute("ALTER TABLE capacity_logs_unpartitioned RENAME CONSTRAINT capacity_logs_pkey TO capacity_logs_unpartitioned_pkey")
+    op.execute("ALTER INDEX ix_capacity_logs_id RENAME TO ix_capacity_logs_unpartitioned_id")
+    op.execute(
+        "CREATE TABLE capacity_logs (LIKE capacity_logs_unpartitioned INCLUDING DEFAULTS) "
+        "PARTITION BY RANGE (updated_at)"
+    )
+    op.execute("ALTER TABLE capacity_logs ADD PRIMARY KEY (id, updated_at)")
+    op.execute("ALTER TABLE capacity_logs ADD FOREIGN KEY (shelter_id) REFERENCES shelters (id)")
+    op.execute("ALTER TABLE capacity_logs ADD FOREIGN KEY (updated_by) REFERENCES users (id)")
+    op.execute("CREATE TABLE capacity_logs_default PARTITION OF capacity_logs DEFAULT")
+
+    oldest = conn.execute(sa.text("SELECT min(updated_at) FROM capacity_logs_unpartitioned")).scalar()
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    month = _month_start(oldest or now)
+    while month <= _month_start(now, 2):
+        nxt = _month_start(month, 1)
+        op.execute(
+            f"CREATE TABLE capacity_logs_p{month:%Y%m} PARTITION OF capacity_logs "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{nxt:%Y-%m-%d}')"
+        )
+        month = nxt
+
+    op.execute(f"INSERT INTO capacity_logs ({COLUMNS}) SELECT {COLUMNS} FROM capacity_logs_unpartitioned")
+    # Keep the id sequence alive when the old table goes
+    op.execute("ALTER SEQUENCE capacity_logs_id_seq OWNED BY capacity_logs.id")
+    op.execute("DROP TABLE capacity_logs_unpartitioned")
+    op.create_index("ix_capacity_logs_id", "capacity_logs", ["id"])
+
+def _unpartition_postgres() -> None:
+    op.execute("ALTER TABLE capacity_logs RENAME TO capacity_logs_partitioned")
+    op.execute("ALTER TABLE capacity_logs_partitioned RENAME CONSTRAINT capacity_logs_pkey TO capacity_logs_partitioned_pkey")
+    op.execute("ALTER INDEX ix_capacity_logs_id RENAME TO ix_capacity_logs_partitioned_id")
+    op.execute("ALTER INDEX ix_capacity_logs_shelter_updated RENAME TO ix_capacity_logs_partitioned_shelter_updated")
+    op.execute("CREATE TABLE capacity_logs (LIKE capacity_logs_partitioned INCLUDING DEFAULTS)")
+    op.execute(f"INSERT INTO capacity_logs ({COLUMNS}) SELECT {COLUMNS} FROM capacity_logs_partitioned")
+    op.execute("ALTER SEQUENCE capacity_logs_id_seq OWNED BY capacity_logs.id")
+    op.execute("DROP TABLE capacity_logs_partitioned CASCADE")
+    op.execute("ALTER TABLE capacity_logs ADD PRIMARY KEY (id)")
+    op.execute("ALTER TABLE capacity_logs ADD FOREIGN KEY (shelter_id) REFERENCES shelters (id)")
+    op.execute("ALTER TABLE capacity_logs ADD FOREIGN KEY (updated_by) REFERENCES users (id)")
+    op.create_index("ix_capacity_logs_id", "capacity_logs", ["id"])
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        _partition_postgres()
+
+    op.create_index("ix_capacity_logs_shelter_updated", "capacity_logs", ["shelter_id", "updated_at"])
+
+    op.create_table(
+        "capacity_log_archive",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("period", sa.String(length=7), nullable=False),
+        sa.Column("first_log_id", sa.Integer(), nullable=False),
+        sa.Column("last_log_id", sa.Integer(), nullable=False),
+        sa.Column("row_count", sa.Integer(), nullable=False),
+        sa.Column("codec", sa.String(length=16), nullable=False, server_default="ndjson+gzip"),
+        sa.Column("payload", sa.LargeBinary(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index("ix_capacity_log_archive_period", "capacity_log_archive", ["period"])
+
+def downgrade() -> None:
+    op.drop_index("ix_capacity_log_archive_period", table_name="capacity_log_archive")
+    op.drop_table("capacity_log_archive")
+
+    if op.get_bind().dialect.name == "postgresql":
+        _unpartition_postgres()  # indexes go with the partitioned table
+    else:
+        op.drop_index("ix_capacity_logs_shelter_updated", table_name="capacity_logs")
@@ -0,0 +1,18 @@
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "b7e4a2d9c815"
+down_revision = "9c3e5b7d2f10"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column("notification_outbox", sa.Column("digest", sa.Boolean(), nullable=False, server_default=sa.false()))
+    op.add_column("shelters", sa.Column("notification_mode", sa.String(), nullable=True))
+
+def downgrade() -> None:
+    with op.batch_alter_table("shelters") as batch_op:
+        batch_op.drop_column("notification_mode")
+    with op.batch_alter_table("notification_outbox") as batch_op:
+        batch_op.drop_column("digest")
@@ -0,0 +1,52 @@
+from alembic import op
+import sqlalchemy as sa
+
+# Keyset indexes from a4c2e7f19b35; SQLite's table copy reflects them without DESC
+KEYSET_INDEXES = {
+    "ix_intake_requests_shelter_status_created": ["shelter_id", "status", "created_at DESC", "id DESC"],
+    "ix_intake_requests_shelter_created": ["shelter_id", "created_at DESC", "id DESC"],
+    "ix_intake_requests_status_created": ["status", "created_at DESC", "id DESC"],
+}
+
+def _restore_keyset_indexes(conn) -> None:
+    if conn.dialect.name != "sqlite":
+        return
+    for name, cols in KEYSET_INDEXES.items():
+        op.drop_index(name, table_name="intake_requests")
+        op.create_index(name, "intake_requests", [sa.text(c) for c in cols])
+
+# revision identifiers, used by Alembic.
+revision = "d3b8f1a6c472"
+down_revision = "a9e3f7c2b5d4"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Keyset cursors are built from (created_at, id): backfill NULLs with the oldest
+    # known timestamp (where SQLite already sorted them) before enforcing NOT NULL
+    conn = op.get_bind()
+    conn.execute(sa.text(
+        "UPDATE intake_requests SET created_at = "
+        "COALESCE((SELECT MIN(created_at) FROM intake_requests), CURRENT_TIMESTAMP) "
+        "WHERE created_at IS NULL"
+    ))
+
+    # recreate="auto": ALTER COLUMN on Postgres, table copy on SQLite
+    with op.batch_alter_table("intake_requests") as batch_op:
+        batch_op.alter_column(
+            "created_at",
+            existing_type=sa.DateTime(),
+            nullable=False,
+            existing_nullable=True,
+        )
+    _restore_keyset_indexes(conn)
+
+def downgrade():
+    with op.batch_alter_table("intake_requests") as batch_op:
+        batch_op.alter_column(
+            "created_at",
+            existing_type=sa.DateTime(),
+            nullable=True,
+            existing_nullable=False,
+        )
+    _restore_keyset_indexes(op.get_bind())
@@ -0,0 +1,41 @@
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "e2a8c4f0d7b1"
+down_revision = "b7e4a2d9c815"
+branch_labels = None
+depends_on = None
+
+# Frozen copy of app.importer.normalize_key as of this revision; later changes to the
+# importer's key format need their own migration, not a different backfill here.
+def _normalize_key(name: str, address: str) -> str:
+    def norm(s: str) -> str:
+        return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", s.lower())).strip()
+    return f"na:{norm(name)}|{norm(address)}"[:255]
+
+def upgrade() -> None:
+    op.add_column("shelters", sa.Column("import_key", sa.String(length=255), nullable=True))
+
+    # Backfill name+address keys; if two existing rows collide, only the oldest gets the key
+    conn = op.get_bind()
+    rows = conn.execute(sa.text("SELECT id, name, address FROM shelters ORDER BY id")).fetchall()
+    seen = set()
+    for row in rows:
+        key = _normalize_key(row.name, row.address)
+        if key in seen:
+            continue
+        seen.add(key)
+        conn.execute(
+            sa.text("UPDATE shelters SET import_key = :key WHERE id = :id"),
+            {"key": key, "id": row.id},
+        )
+
+    op.create_index("ix_shelters_import_key", "shelters", ["import_key"], unique=True)
+
+def downgrade() -> None:
+    op.drop_index("ix_shelters_import_key", table_name="shelters")
+    with op.batch_alter_table("shelters") as batch_op:
+        batch_op.drop_column("import_key")
@@ -0,0 +1,47 @@
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "f4b9d1e6a2c3"
+down_revision = "e2a8c4f0d7b1"
+branch_labels = None
+depends_on = None
+
+# Frozen copy of the app.rollups backfill as of this revision. SQLite bucket starts use the
+# text format SQLAlchemy writes for DateTime, so they match rows the app adds later.
+_BUCKET_FORMATS = {"hour": "%Y-%m-%d %H:00:00.000000", "day": "%Y-%m-%d 00:00:00.000000"}
+
+
+def _backfill_sql(dialect: str) -> str:
+    start = "date_trunc(:bucket, updated_at)" if dialect == "postgresql" else "strftime(:fmt, updated_at)"
+    return f"""
+        INSERT INTO capacity_rollups (shelter_id, bucket, bucket_start, samples, min_available,
+                                      max_available, sum_available, sum_occupancy_pct)
+        SELECT shelter_id, :bucket, {start}, count(*), min(beds_available), max(beds_available),
+               sum(beds_available),
+               sum(CASE WHEN beds_total > 0
+                        THEN (beds_total - beds_available) * 100.0 / beds_total ELSE 0.0 END)
+        FROM capacity_logs
+        GROUP BY 1, 3
+    """
+
+def upgrade() -> None:
+    op.create_table(
+        "capacity_rollups",
+        sa.Column("shelter_id", sa.Integer(), sa.ForeignKey("shelters.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("bucket", sa.String(length=8), primary_key=True),
+        sa.Column("bucket_start", sa.DateTime(), primary_key=True),
+        sa.Column("samples", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("min_available", sa.Integer(), nullable=False),
+        sa.Column("max_available", sa.Integer(), nullable=False),
+        sa.Column("sum_available", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("sum_occupancy_pct", sa.Float(), nullable=False, server_default="0"),
+    )
+
+    # Seed from existing logs
+    conn = op.get_bind()
+    for bucket, fmt in _BUCKET_FORMATS.items():
+        conn.execute(sa.text(_backfill_sql(conn.dialect.name)), {"bucket": bucket, "fmt": fmt})
+
+def downgrade() -> None:
+    op.drop_table("capacity_rollups")
@@ -1,25 +1,29 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Dict, Optional
+import threading
+import time
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import select, event
 
 from .settings import settings
 from .db import get_db
 from .models.user import User
+from .cache import TTLCache
+from .hashing import get_context, hash_password
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")  # for Swagger client compatibility
 
 # --- password hashing ---
+# Sync helpers for scripts; request handlers use the *_async variants from app.hashing
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return hash_password(password)
 
 # --- JWT ---
 def create_access_token(data: dict, expires_minutes: int = settings.ACCESS_TOKEN_EXPIRE_MINUTES) -> str:
@@ -33,29 +37,111 @@ def get_user_by_email(db: Session, email: str) -> Optional[User]:
     stmt = select(User).where(User.email == email)
     return db.execute(stmt).scalar_one_or_none()
 
+# --- principal cache ---
+# Verified token -> (user_id, exp) and user_id -> principal, so most requests skip
+# both the JWT decode and the users lookup. Entries for a user are dropped when a
+# transaction that updated or deleted that User row through the ORM commits (see
+# listeners below). Each drop also bumps the user's version, so a lookup that read
+# the row before the commit cannot put the old principal back afterwards.
+@dataclass(frozen=True)
+class CurrentUser:
+    id: int
+    email: str
+    role: str
+    shelter_id: Optional[int] = None
+
+_token_cache = TTLCache(maxsize=settings.AUTH_CACHE_MAX_ENTRIES, ttl=settings.AUTH_CACHE_TTL_SECONDS)
+_user_cache = TTLCache(maxsize=settings.AUTH_CACHE_MAX_ENTRIES, ttl=settings.AUTH_CACHE_TTL_SECONDS)
+_user_versions: Dict[int, int] = {}
+_versions_lock = threading.Lock()
+
+def invalidate_user_cache(user_id: int) -> None:
+    with _versions_lock:
+        _user_versions[int(user_id)] = _user_versions.get(int(user_id), 0) + 1
+        _user_cache.pop(int(user_id))
+
+def clear_auth_cache() -> None:
+    _token_cache.clear()
+    _user_cache.clear()
+
+def _cache_principal(principal: "CurrentUser", version: int) -> None:
+    with _versions_lock:
+        if _user_versions.get(principal.id, 0) == version:
+            _user_cache.set(principal.id, principal)
+
+# Collect changed users at flush, drop them once the change is visible to other sessions
+_DIRTY_USERS = "auth_dirty_user_ids"
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    ids = {obj.id for obj in (*session.dirty, *session.deleted) if isinstance(obj, User) and obj.id is not None}
+    if ids:
+        session.info.setdefault(_DIRTY_USERS, set()).update(ids)
+
+@event.listens_for(Session, "after_commit")
+def _on_users_committed(session):
+    for user_id in session.info.pop(_DIRTY_USERS, ()):
+        invalidate_user_cache(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def _on_users_rolled_back(session):
+    session.info.pop(_DIRTY_USERS, None)
+
+def _decode_token(token: str) -> Optional[int]:
+    """Returns the user id from a valid token, or None."""
+    if settings.AUTH_CACHE_ENABLED:
+        cached = _token_cache.get(token)
+        if cached is not None:
+            user_id, exp = cached
+            if exp is None or exp > time.time():
+                return user_id
+            _token_cache.pop(token)
+
+    try:
+        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+        sub = payload.get("sub")
+        if sub is None:
+            return None
+        user_id = int(sub)
+    except (JWTError, ValueError):
+        return None
+
+    if settings.AUTH_CACHE_ENABLED:
+        exp = payload.get("exp")
+        ttl = settings.AUTH_CACHE_TTL_SECONDS
+        if exp is not None:
+            ttl = min(ttl, exp - time.time())  # never outlive the token itself
+        _token_cache.set(token, (user_id, exp), ttl=ttl)
+    return user_id
+
 # --- dependencies ---
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> CurrentUser:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
-        user_id: Optional[int] = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
+    user_id = _decode_token(token)
+    if user_id is None:
         raise credentials_exception
 
-    stmt = select(User).where(User.id == int(user_id))
-    user = db.execute(stmt).scalar_one_or_none()
-    if user is None:
+    if settings.AUTH_CACHE_ENABLED:
+        principal = _user_cache.get(user_id)
+        if principal is not None:
+            return principal
+
+    version = _user_versions.get(user_id, 0)  # before the read, see _cache_principal
+    stmt = select(User.id, User.email, User.role, User.shelter_id).where(User.id == user_id)
+    row = db.execute(stmt).one_or_none()
+    if row is None:
         raise credentials_exception
-    return user
+    principal = CurrentUser(id=row.id, email=row.email, role=row.role, shelter_id=row.shelter_id)
+    if settings.AUTH_CACHE_ENABLED:
+        _cache_principal(principal, version)
+    return principal
 
 def require_role(*allowed_roles: str):
-    def dep(user: User = Depends(get_current_user)) -> User:
+    def dep(user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
         if user.role not in allowed_roles:
             raise HTTPException(status_code=403, detail="Insufficient permissions")
         return user
@@ -0,0 +1,98 @@
+from dataclasses import dataclass
+from datetime import datetime
+from threading import Lock
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from .models.capacity import CapacityLog
+
+
+@dataclass(frozen=True)
+class CurrentCapacity:
+    shelter_id: int
+    beds_total: int
+    beds_available: int
+    updated_at: datetime
+    version: Optional[int] = None  # capacity_logs.id of the newest log
+
+
+class AvailabilityIndex:
+    """
+    Process-local index of the newest capacity log per shelter.
+    Loaded once with a single query, then kept fresh by update_capacity
+    so reads never touch capacity_logs.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._by_shelter: Dict[int, CurrentCapacity] = {}
+        self._loaded = False
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def load(self, db: Session) -> int:
+        # Newest row per shelter in one pass (window functions work on SQLite 3.25+ and Postgres)
+        rn = func.row_number().over(
+            partition_by=CapacityLog.shelter_id,
+            order_by=(CapacityLog.updated_at.desc(), CapacityLog.id.desc()),
+        ).label("rn")
+        ranked = select(
+            CapacityLog.id,
+            CapacityLog.shelter_id,
+            CapacityLog.beds_total,
+            CapacityLog.beds_available,
+            CapacityLog.updated_at,
+            rn,
+        ).subquery()
+        stmt = select(
+            ranked.c.id,
+            ranked.c.shelter_id,
+            ranked.c.beds_total,
+            ranked.c.beds_available,
+            ranked.c.updated_at,
+        ).where(ranked.c.rn == 1)
+
+        fresh = {
+            row.shelter_id: CurrentCapacity(
+                row.shelter_id, row.beds_total, row.beds_available, row.updated_at, row.id
+            )
+            for row in db.execute(stmt)
+        }
+        with self._lock:
+            self._by_shelter = fresh
+            self._loaded = True
+        return len(fresh)
+
+    def ensure_loaded(self, db: Session) -> None:
+        if not self._loaded:
+            self.load(db)
+
+    def record(self, log: CapacityLog) -> bool:
+        """
+        Apply a committed capacity log (or any row with the same attributes).
+        Older or already-seen logs never overwrite newer ones; returns True if applied.
+        """
+        entry = CurrentCapacity(log.shelter_id, log.beds_total, log.beds_available, log.updated_at, log.id)
+        with self._lock:
+            current = self._by_shelter.get(log.shelter_id)
+            if current is not None and (current.updated_at, current.version or 0) >= (entry.updated_at, entry.version or 0):
+                return False
+            self._by_shelter[log.shelter_id] = entry
+            return True
+
+    def discard(self, shelter_id: int) -> None:
+        with self._lock:
+            self._by_shelter.pop(shelter_id, None)
+
+    def get(self, shelter_id: int) -> Optional[CurrentCapacity]:
+        return self._by_shelter.get(shelter_id)
+
+    def all(self) -> List[CurrentCapacity]:
+        return list(self._by_shelter.values())
+
+
+availability_index = AvailabilityIndex()
@@ -0,0 +1,114 @@
+import gzip
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Negotiated response compression (br > gzip) for single-body responses above a
+# size threshold. Streaming responses (SSE, exports) pass through untouched:
+# compressing them here would buffer events, and exports already offer .gz formats.
+# A compressed body is a different representation, so its strong ETag becomes weak
+# (W/"..."); If-None-Match uses weak comparison, so revalidation still gets a 304.
+
+# Optional: pip install brotli
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# Already compressed or not worth it
+SKIP_MEDIA_PREFIXES = ("image/", "video/", "audio/", "application/gzip", "application/zip", "text/event-stream")
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    codings: Dict[str, float] = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        key, _, value = params.strip().partition("=")
+        if key == "q":
+            try:
+                q = float(value)
+            except ValueError:
+                q = 0.0
+        if coding:
+            codings[coding.strip().lower()] = q
+    return codings
+
+
+def choose_encoding(header: str) -> Optional[str]:
+    codings = parse_accept_encoding(header)
+    wildcard = codings.get("*", 0.0)
+    for coding in (("br", "gzip") if brotli is not None else ("gzip",)):
+        if codings.get(coding, wildcard) > 0:
+            return coding
+    return None
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def compress(self, body: bytes, coding: str) -> bytes:
+        if coding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self.minimum_size <= 0:
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        coding = choose_encoding(request_headers.get("accept-encoding", ""))
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                start = message  # held until we know the body
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            passthrough = True  # whatever happens, only the first body message is inspected
+            headers = MutableHeaders(scope=start)
+            body = message.get("body", b"")
+            if start["status"] == 304:
+                # keep the weak form the client revalidated with
+                etag = headers.get("etag")
+                if etag and f"W/{etag}" in request_headers.get("if-none-match", ""):
+                    headers["ETag"] = f"W/{etag}"
+                await send(start)
+                await send(message)
+                return
+            media = headers.get("content-type", "")
+            if (
+                message.get("more_body", False)
+                or "content-encoding" in headers
+                or len(body) < self.minimum_size
+                or media.startswith(SKIP_MEDIA_PREFIXES)
+            ):
+                await send(start)
+                await send(message)
+                return
+
+            compressed = self.compress(body, coding)
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"
+            headers["Content-Encoding"] = coding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start)
+            await send({"type": "http.response.body", "body": compressed, "more_body": False})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,90 @@
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+from .responses import wire_format
+
+# Conditional GET support (ETag / Last-Modified -> 304).
+# Validators are computed from a cheap version query (ids, counts, max(updated_at)),
+# never from the response body, so a 304 costs one aggregate/indexed lookup and
+# skips ORM hydration and pydantic serialization entirely.
+# A strong ETag names one representation: MessagePack bodies get a "-msgpack" tag here,
+# and CompressionMiddleware weakens the ETag of bodies it encodes (W/"...").
+
+# What the 200 may vary on (WireFormatMiddleware / CompressionMiddleware); repeated on 304s
+VARY = "Accept, Accept-Encoding"
+
+
+@dataclass(frozen=True)
+class Validator:
+    etag: str
+    last_modified: Optional[datetime] = None
+
+    def headers(self) -> Dict[str, str]:
+        # no-cache = store, but revalidate every time (the body can change at any moment)
+        out = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if self.last_modified is not None:
+            out["Last-Modified"] = format_datetime(_as_utc(self.last_modified), usegmt=True)
+        return out
+
+
+def _as_utc(dt: datetime) -> datetime:
+    # SQLite hands back naive datetimes; everything is stored in UTC
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def make_validator(*parts, last_modified: Optional[datetime] = None) -> Validator:
+    """Strong ETag over the version parts (e.g. resource kind, id, count, max updated_at)."""
+    raw = "|".join("" if p is None else (p.isoformat() if isinstance(p, datetime) else str(p)) for p in parts)
+    digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+    fmt = wire_format()
+    if fmt != "json":
+        digest = f"{digest}-{fmt}"
+    return Validator(etag=f'"{digest}"', last_modified=last_modified)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison: ignore any W/ prefix
+    candidates = (t.strip() for t in header.split(","))
+    return any((t[2:] if t.startswith("W/") else t) == etag for t in candidates)
+
+
+def is_not_modified(request: Request, validator: Validator) -> bool:
+    # If-None-Match wins over If-Modified-Since when both are sent (RFC 9110 13.2.2)
+    inm = request.headers.get("if-none-match")
+    if inm is not None:
+        return _etag_matches(inm, validator.etag)
+
+    ims = request.headers.get("if-modified-since")
+    if ims and validator.last_modified is not None:
+        try:
+            since = parsedate_to_datetime(ims)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            return False
+        # HTTP dates have second precision
+        return _as_utc(validator.last_modified).replace(microsecond=0) <= since
+    return False
+
+
+def conditional(request: Request, response: Response, validator: Validator) -> Optional[Response]:
+    """
+    Returns a bare 304 if the client's copy is current; otherwise stamps the
+    validator headers on `response` and returns None so the route builds the body.
+    Compute the validator before reading the body: a write in between then only
+    makes the ETag older than the body, which costs a 200 next time, never a stale 304.
+    """
+    headers = validator.headers()
+    if is_not_modified(request, validator):
+        return Response(status_code=304, headers={**headers, "Vary": VARY})
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,90 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import select, func, delete, update, insert
+from sqlalchemy.orm import Session
+
+from .models.counters import IntakeStatusCounter, IntakeDailyCounter
+from .models.intake import IntakeRequest
+from .settings import settings
+
+
+def _upsert_increment(db: Session, model, keys: dict, delta: int) -> None:
+    """count += delta for the row at `keys`, creating it if needed (same transaction as caller)."""
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(model).values(**keys, count=delta).on_conflict_do_update(
+            index_elements=list(keys),
+            set_={"count": model.__table__.c.count + delta},
+        )
+        db.execute(stmt)
+        return
+
+    # Generic fallback: update, then insert if nothing matched
+    conds = [getattr(model, k) == v for k, v in keys.items()]
+    res = db.execute(update(model).where(*conds).values(count=model.count + delta))
+    if res.rowcount == 0:
+        db.execute(insert(model).values(**keys, count=delta))
+
+
+def _bump(db: Session, shelter_id: int, status: str, created_at: Optional[datetime], delta: int) -> None:
+    _upsert_increment(db, IntakeStatusCounter, {"shelter_id": shelter_id, "status": status}, delta)
+    if settings.INTAKE_DAILY_COUNTERS and created_at is not None:
+        _upsert_increment(
+            db, IntakeDailyCounter,
+            {"shelter_id": shelter_id, "status": status, "day": created_at.date()},
+            delta,
+        )
+
+
+def record_intake_created(db: Session, req: IntakeRequest) -> None:
+    # req must be flushed so created_at is populated
+    _bump(db, req.shelter_id, req.status, req.created_at, +1)
+
+
+def record_intake_status_change(db: Session, req: IntakeRequest, old_status: str) -> None:
+    _bump(db, req.shelter_id, old_status, req.created_at, -1)
+    _bump(db, req.shelter_id, req.status, req.created_at, +1)
+
+
+def count_intakes(db: Session, shelter_id: Optional[int] = None, status: Optional[str] = None) -> int:
+    """Total intakes for a shelter/status scope, read from the counters table."""
+    stmt = select(func.coalesce(func.sum(IntakeStatusCounter.count), 0))
+    if shelter_id is not None:
+        stmt = stmt.where(IntakeStatusCounter.shelter_id == shelter_id)
+    if status is not None:
+        stmt = stmt.where(IntakeStatusCounter.status == status)
+    return int(db.scalar(stmt) or 0)
+
+
+def rebuild_counters(db: Session) -> int:
+    """Recompute every counter from intake_requests. Returns the number of status rows written."""
+    db.execute(delete(IntakeStatusCounter))
+    db.execute(delete(IntakeDailyCounter))
+
+    totals = (
+        select(IntakeRequest.shelter_id, IntakeRequest.status, func.count())
+        .group_by(IntakeRequest.shelter_id, IntakeRequest.status)
+    )
+    res = db.execute(
+        insert(IntakeStatusCounter).from_select(["shelter_id", "status", "count"], totals)
+    )
+
+    if settings.INTAKE_DAILY_COUNTERS:
+        # date() works on both SQLite and Postgres
+        day = func.date(IntakeRequest.created_at)
+        daily = (
+            select(IntakeRequest.shelter_id, IntakeRequest.status, day, func.count())
+            .where(IntakeRequest.created_at.is_not(None))
+            .group_by(IntakeRequest.shelter_id, IntakeRequest.status, day)
+        )
+        db.execute(
+            insert(IntakeDailyCounter).from_select(["shelter_id", "status", "day", "count"], daily)
+        )
+
+    db.commit()
+    return res.rowcount
@@ -1,11 +1,135 @@
-from sqlalchemy import create_engine, text
+import sqlite3
+import threading
+from typing import AsyncIterator
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
 from .settings import settings
 
+
+# -----------------------------
+# SQLite high-concurrency profile (SQLITE_TUNED=true, file databases only).
+# - WAL: readers never block the writer and the writer never blocks readers.
+# - busy_timeout: a writer waits for the write lock instead of failing with
+#   "database is locked"; synchronous=NORMAL is durable enough under WAL and avoids an
+#   fsync per commit; mmap/cache keep hot pages in memory.
+# - One writer at a time per process: the first write statement of a transaction takes
+#   a process-wide gate, released when the connection goes back to the pool (sessions
+#   do that right after commit/rollback). Waiting writers queue on the gate instead of
+#   busy-polling SQLite, while readers keep using the rest of the pool.
+#   SQLite's own lock (plus busy_timeout) still serializes writers across processes.
+# - One writing transaction per thread: sync code that writes through a second session
+#   while its first one still holds the gate would wait on itself, so that fails at once.
+# -----------------------------
+READ_PREFIXES = ("SELECT", "PRAGMA", "EXPLAIN")
+
+
+def is_sqlite_file(url: str) -> bool:
+    u = make_url(url)
+    return u.get_backend_name() == "sqlite" and u.database not in (None, "", ":memory:") \
+        and not u.database.startswith("file::memory:")
+
+
+def sqlite_pragmas() -> dict:
+    return {
+        "journal_mode": "WAL",
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "cache_size": -settings.SQLITE_CACHE_SIZE_KB,  # negative = KiB
+        "temp_store": "MEMORY",
+    }
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # Works for sqlite3 and the aiosqlite adapter alike
+    cursor = dbapi_connection.cursor()
+    for pragma, value in sqlite_pragmas().items():
+        cursor.execute(f"PRAGMA {pragma} = {value}")
+    cursor.close()
+
+
+def is_write(context, statement: str) -> bool:
+    if context.isddl or context.is_crud:  # Core/ORM INSERT/UPDATE/DELETE, CTE-prefixed too
+        return True
+    if context.is_text:
+        # Raw SQL: anything but a plain read (WITH ... INSERT, REPLACE, VACUUM, ...)
+        return not statement.lstrip()[:7].upper().startswith(READ_PREFIXES)
+    return False
+
+
+class WriterGate:
+    """Process-wide single-writer lock, held from a transaction's first write to its end."""
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self._lock = threading.Lock()  # may be released from another threadpool thread
+        self._owner = None  # thread that took the gate, unless it came from a ThreadedSession
+        self._local = threading.local()
+
+    def before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if conn.info.get("holds_writer_gate") or not is_write(context, statement):
+            return
+        me = threading.get_ident()
+        if self._owner == me:
+            raise sqlite3.OperationalError(
+                "writer gate already held by another transaction on this thread "
+                "(commit or roll back the first session before writing with a second)"
+            )
+        if not self._lock.acquire(timeout=self.timeout):
+            raise sqlite3.OperationalError("database is locked (writer gate timeout)")
+        conn.info["holds_writer_gate"] = True
+        if not getattr(self._local, "unowned", False):
+            self._owner = me
+
+    def release(self, info) -> None:
+        if info is not None and info.pop("holds_writer_gate", False):
+            self._owner = None
+            self._lock.release()
+
+    def run_unowned(self, fn, *args, **kwargs):
+        # ThreadedSession calls: the transaction may end on any threadpool thread, so the
+        # thread that took the gate is not the one blocking its release
+        self._local.unowned = True
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self._local.unowned = False
+
+    def attach(self, engine) -> None:
+        event.listen(engine, "before_cursor_execute", self.before_execute)
+        # After the DBAPI commit/rollback: on return to the pool, or if the connection is discarded
+        event.listen(engine, "checkin", lambda dbapi_conn, record: self.release(getattr(record, "info", None)))
+        event.listen(engine, "reset", lambda dbapi_connection, connection_record, reset_state:
+                     self.release(getattr(connection_record, "info", None)))
+        event.listen(engine, "invalidate", lambda dbapi_conn, record, exc: self.release(getattr(record, "info", None)))
+
+
+SQLITE_TUNED = settings.SQLITE_TUNED and is_sqlite_file(settings.DATABASE_URL)
+writer_gate = WriterGate(settings.SQLITE_BUSY_TIMEOUT_MS / 1000) if SQLITE_TUNED else None
+
+engine_kwargs = {}
+if SQLITE_TUNED:
+    engine_kwargs = {
+        # a connection per concurrent reader; writers share the gate
+        "pool_size": settings.SQLITE_POOL_SIZE,
+        "max_overflow": settings.SQLITE_POOL_SIZE,
+        "connect_args": {"timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000, "check_same_thread": False},
+    }
+
 # For SQLite, echo=False to reduce noise; for Postgres, keep pool_pre_ping
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True, future=True)
+engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True, future=True, **engine_kwargs)
+if SQLITE_TUNED:
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    writer_gate.attach(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, future=True)
 
+# Opt-in slow-query log / N+1 detector; nothing is attached when it's off
+if settings.DB_DIAGNOSTICS:
+    from .diagnostics import attach_diagnostics
+    attach_diagnostics(engine)
+
 # Dependency
 def get_db():
     db = SessionLocal()
@@ -20,4 +144,106 @@ def ping_db() -> bool:
             conn.execute(text("SELECT 1"))
         return True
     except Exception:
-        return False
\ No newline at end of file
+        return False
+
+
+# -----------------------------
+# Async mode (DB_ASYNC=true): aiosqlite in dev, asyncpg on Postgres.
+# The sync engine above stays available for auth, scripts and streaming exports.
+# -----------------------------
+def to_async_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    driver = scheme.split("+", 1)[0]
+    if driver == "sqlite":
+        return f"sqlite+aiosqlite{sep}{rest}"
+    if driver in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg{sep}{rest}"
+    raise ValueError(f"No async driver configured for '{scheme}'")
+
+async_engine = None
+AsyncSessionLocal = None
+if settings.DB_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_engine = create_async_engine(
+        settings.ASYNC_DATABASE_URL or to_async_url(settings.DATABASE_URL),
+        pool_pre_ping=True,
+    )
+    if SQLITE_TUNED:
+        # Pragmas only: a blocking gate would stall the event loop, so async writers rely
+        # on busy_timeout (aiosqlite runs each connection in its own thread)
+        event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    # expire_on_commit=False: returned objects must not lazy-load after commit
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    if settings.DB_DIAGNOSTICS:
+        attach_diagnostics(async_engine.sync_engine)
+
+
+class ThreadedSession:
+    """
+    AsyncSession-shaped wrapper around a sync Session, used when DB_ASYNC is off.
+    Each awaited call runs in Starlette's threadpool, so routers can be written
+    once as `async def` against the AsyncSession API.
+    """
+
+    def __init__(self, session):
+        self.sync_session = session
+
+    def _run(self, fn, *args, **kwargs):
+        if writer_gate is not None:
+            return run_in_threadpool(writer_gate.run_unowned, fn, *args, **kwargs)
+        return run_in_threadpool(fn, *args, **kwargs)
+
+    def add(self, obj) -> None:
+        self.sync_session.add(obj)
+
+    def add_all(self, objs) -> None:
+        self.sync_session.add_all(objs)
+
+    async def get(self, *args, **kwargs):
+        return await self._run(self.sync_session.get, *args, **kwargs)
+
+    async def execute(self, *args, **kwargs):
+        return await self._run(self.sync_session.execute, *args, **kwargs)
+
+    async def scalar(self, *args, **kwargs):
+        return await self._run(self.sync_session.scalar, *args, **kwargs)
+
+    async def scalars(self, *args, **kwargs):
+        return await self._run(self.sync_session.scalars, *args, **kwargs)
+
+    async def flush(self, *args, **kwargs):
+        return await self._run(self.sync_session.flush, *args, **kwargs)
+
+    async def commit(self):
+        return await self._run(self.sync_session.commit)
+
+    async def rollback(self):
+        return await self._run(self.sync_session.rollback)
+
+    async def refresh(self, *args, **kwargs):
+        return await self._run(self.sync_session.refresh, *args, **kwargs)
+
+    async def delete(self, obj):
+        return await self._run(self.sync_session.delete, obj)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await self._run(fn, self.sync_session, *args, **kwargs)
+
+    async def close(self):
+        return await self._run(self.sync_session.close)
+
+
+# Async dependency: native AsyncSession in async mode, threaded sync session otherwise
+async def get_async_db() -> AsyncIterator:
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+
+    # Same expiry behaviour as the async sessions, so routers behave identically
+    db = ThreadedSession(SessionLocal(expire_on_commit=False))
+    try:
+        yield db
+    finally:
+        await db.close()
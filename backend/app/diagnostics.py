@@ -0,0 +1,138 @@
+import logging
+import re
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .settings import settings
+
+# Opt-in SQL diagnostics (DB_DIAGNOSTICS=true; app/db.py attaches the engine hooks).
+# - Slow-query log: statements slower than DB_SLOW_QUERY_MS, with the *shape* of their
+#   bound parameters (types and counts, never values) and the route that issued them.
+# - Per-request grouping: identical statements are counted together; a SELECT repeated
+#   DB_N_PLUS_ONE_THRESHOLD+ times in one request is reported as a probable N+1.
+# - DB_DIAGNOSTICS_HEADER=true adds X-DB-Queries and Server-Timing to responses.
+# When DB_DIAGNOSTICS is off none of this is attached, so it costs nothing.
+
+logger = logging.getLogger("app.db.diagnostics")
+
+_IN_LIST = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|\$\d+|:\w+)\s*,)+\s*(?:\?|%\(\w+\)s|\$\d+|:\w+)\s*\)")
+_WS = re.compile(r"\s+")
+
+
+@dataclass
+class RequestQueries:
+    scope: Scope
+    count: int = 0
+    seconds: float = 0.0
+    # normalized statement -> [executions, seconds, parameter shape]
+    statements: Dict[str, list] = field(default_factory=dict)
+
+    @property
+    def route(self) -> str:
+        path = getattr(self.scope.get("route"), "path", None) or self.scope.get("path", "?")
+        return f"{self.scope.get('method', '')} {path}"
+
+
+_current: ContextVar[Optional[RequestQueries]] = ContextVar("db_diagnostics", default=None)
+
+
+def normalize(statement: str) -> str:
+    # Expanded IN lists differ only in placeholder count; group them together
+    return _IN_LIST.sub("(…)", _WS.sub(" ", statement).strip())
+
+
+def param_shape(parameters, executemany: bool) -> str:
+    def one(params) -> str:
+        if isinstance(params, dict):
+            return "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in params.items()) + "}"
+        if isinstance(params, (list, tuple)):
+            return "(" + ", ".join(type(v).__name__ for v in params) + ")"
+        return type(params).__name__
+
+    if executemany and isinstance(parameters, (list, tuple)) and parameters:
+        return f"{len(parameters)} x {one(parameters[0])}"
+    return one(parameters) if parameters else "()"
+
+
+def _short(statement: str, limit: int = 500) -> str:
+    return statement if len(statement) <= limit else statement[:limit] + "…"
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("diag_start", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("diag_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    req = _current.get()
+
+    if elapsed * 1000 >= settings.DB_SLOW_QUERY_MS:
+        logger.warning(
+            "[SLOW SQL] %.1f ms%s: %s | params %s",
+            elapsed * 1000, f" ({req.route})" if req else "", _short(normalize(statement)),
+            param_shape(parameters, executemany),
+        )
+    if req is None:
+        return
+    req.count += 1
+    req.seconds += elapsed
+    key = normalize(statement)
+    stats = req.statements.get(key)
+    if stats is None:
+        req.statements[key] = [1, elapsed, param_shape(parameters, executemany)]
+    else:
+        stats[0] += 1
+        stats[1] += elapsed
+
+
+def attach_diagnostics(engine) -> None:
+    from sqlalchemy import event
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+
+def report(req: RequestQueries) -> None:
+    threshold = settings.DB_N_PLUS_ONE_THRESHOLD
+    if threshold <= 0:
+        return
+    for statement, (n, seconds, shape) in req.statements.items():
+        if n >= threshold and statement.upper().startswith("SELECT"):
+            logger.warning(
+                "[N+1] %s ran the same SELECT %d times (%.1f ms, %d queries in request): %s | params %s",
+                req.route, n, seconds * 1000, req.count, _short(statement), shape,
+            )
+
+
+class DiagnosticsMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        req = RequestQueries(scope)
+        token = _current.set(req)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and settings.DB_DIAGNOSTICS_HEADER:
+                # statements issued while streaming the body come too late to be counted here
+                headers = MutableHeaders(scope=message)
+                headers["X-DB-Queries"] = str(req.count)
+                headers.append("Server-Timing", f'db;dur={req.seconds * 1000:.1f};desc="{req.count} queries"')
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            report(req)
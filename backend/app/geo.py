@@ -0,0 +1,88 @@
+import math
+from typing import List, Tuple
+
+# Geohash helpers for the indexed shelters.geohash column.
+# Every stored hash has GEOHASH_PRECISION chars, so a cell prefix maps to a plain
+# BETWEEN range on the index (works the same on SQLite and Postgres).
+
+GEOHASH_PRECISION = 9
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEG_LAT = 111.32
+
+
+def encode_geohash(lat: float, lng: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    chars = []
+    bit, ch, even = 0, 0, True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                ch = (ch << 1) | 1
+                lng_lo = mid
+            else:
+                ch <<= 1
+                lng_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                ch = (ch << 1) | 1
+                lat_lo = mid
+            else:
+                ch <<= 1
+                lat_hi = mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(_BASE32[ch])
+            bit, ch = 0, 0
+    return "".join(chars)
+
+
+def cell_size_deg(precision: int) -> Tuple[float, float]:
+    """(height, width) in degrees of a geohash cell at this precision."""
+    bits = precision * 5
+    lng_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def covering_cells(lat: float, lng: float, radius_km: float) -> List[str]:
+    """
+    Geohash prefixes whose 3x3 neighbourhood around (lat, lng) covers the circle.
+    Picks the finest precision whose cells are at least radius_km on each side.
+    """
+    cos_lat = max(math.cos(math.radians(lat)), 0.01)
+    precision = 1
+    for p in range(GEOHASH_PRECISION, 0, -1):
+        h, w = cell_size_deg(p)
+        if h * KM_PER_DEG_LAT >= radius_km and w * KM_PER_DEG_LAT * cos_lat >= radius_km:
+            precision = p
+            break
+
+    h, w = cell_size_deg(precision)
+    cells = set()
+    for dlat in (-h, 0.0, h):
+        nlat = lat + dlat
+        if nlat < -90.0 or nlat > 90.0:
+            continue
+        for dlng in (-w, 0.0, w):
+            nlng = (lng + dlng + 180.0) % 360.0 - 180.0
+            cells.add(encode_geohash(nlat, nlng, precision))
+    return sorted(cells)
+
+
+def prefix_range(prefix: str) -> Tuple[str, str]:
+    """Inclusive [low, high] bounds of all full-precision hashes starting with prefix."""
+    pad = GEOHASH_PRECISION - len(prefix)
+    return prefix + _BASE32[0] * pad, prefix + _BASE32[-1] * pad
@@ -0,0 +1,100 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from threading import BoundedSemaphore, Lock
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+from .settings import settings
+
+# Password hashing runs on its own bounded executor so a login burst can't take
+# every Starlette threadpool thread. Work beyond HASH_QUEUE_LIMIT is rejected fast.
+
+_context: Optional[CryptContext] = None
+
+
+def build_context() -> CryptContext:
+    """
+    First scheme in PASSWORD_SCHEMES is used for new hashes; the others are only verified.
+    Pinning min/max rounds to BCRYPT_ROUNDS makes any other cost "need update", so
+    hashes are upgraded (or downgraded) on the next successful login.
+    """
+    rounds = settings.BCRYPT_ROUNDS
+    return CryptContext(
+        schemes=settings.PASSWORD_SCHEMES,
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds,
+    )
+
+
+def get_context() -> CryptContext:
+    global _context
+    if _context is None:
+        _context = build_context()
+    return _context
+
+
+# Module-level so they can be pickled into a process pool
+def hash_password(password: str) -> str:
+    return get_context().hash(password)
+
+
+def verify_and_update(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """(ok, new_hash); new_hash is set when the stored hash uses an old scheme/cost."""
+    return get_context().verify_and_update(password, hashed)
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing queue is full."""
+
+
+class HashingPool:
+    def __init__(self, workers: int, queue_limit: int, kind: str = "thread"):
+        self.workers = workers
+        self.kind = kind
+        self._slots = BoundedSemaphore(max(queue_limit, workers))
+        self._executor: Optional[Executor] = None
+        self._lock = Lock()
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == "process":
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pwhash")
+        return self._executor
+
+    async def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+hashing_pool = HashingPool(
+    workers=settings.HASH_WORKERS,
+    queue_limit=settings.HASH_QUEUE_LIMIT,
+    kind=settings.HASH_EXECUTOR,
+)
+
+
+async def hash_password_async(password: str) -> str:
+    return await hashing_pool.run(hash_password, password)
+
+
+async def verify_and_update_async(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    return await hashing_pool.run(verify_and_update, password, hashed)
@@ -0,0 +1,229 @@
+import csv
+import io
+import json
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import IO, Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import bindparam, select, insert, update, or_
+from sqlalchemy.orm import Session
+
+from .geo import encode_geohash
+from .models.shelter import Shelter
+from .settings import settings
+
+# Bulk shelter import (CSV / NDJSON / GeoJSON) with upsert semantics.
+# Records are parsed lazily and written in batches of IMPORT_BATCH_SIZE with
+# INSERT ... ON CONFLICT (import_key) DO UPDATE, so a 50k-row directory costs
+# ~50k/batch statements instead of a SELECT + INSERT per row.
+
+IMPORT_FORMATS = ("csv", "ndjson", "geojson")
+UPSERT_FIELDS = ("name", "address", "geo_lat", "geo_lng", "geohash", "phone", "policies", "hours")
+
+# Accepted column / property names for each field (211 exports vary)
+ALIASES = {
+    "external_id": ("external_id", "id", "site_id", "location_id"),
+    "name": ("name", "site_name", "location_name", "organization_name"),
+    "address": ("address", "address_1", "street", "full_address"),
+    "geo_lat": ("geo_lat", "lat", "latitude"),
+    "geo_lng": ("geo_lng", "lng", "lon", "long", "longitude"),
+    "phone": ("phone", "phone_number"),
+    "policies": ("policies", "eligibility", "description"),
+    "hours": ("hours", "schedule"),
+}
+
+
+def normalize_key(name: str, address: str) -> str:
+    """Case/punctuation/whitespace-insensitive name+address key."""
+    def norm(s: str) -> str:
+        return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", s.lower())).strip()
+    return f"na:{norm(name)}|{norm(address)}"[:255]
+
+
+def shelter_import_key(name: str, address: str, external_id: Optional[str] = None) -> str:
+    # An external id (e.g. the 211 site id) is more stable than name/address
+    if external_id:
+        return f"ext:{external_id.strip()}"[:255]
+    return normalize_key(name, address)
+
+
+class InvalidRecord(ValueError):
+    pass
+
+
+def _pick(record: dict, field_name: str):
+    for alias in ALIASES[field_name]:
+        value = record.get(alias)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def to_row(record: dict) -> dict:
+    """Maps a raw record to shelters columns (plus import_key). Raises InvalidRecord."""
+    name, address = _pick(record, "name"), _pick(record, "address")
+    if not name or not address:
+        raise InvalidRecord("name and address are required")
+    try:
+        lat, lng = float(_pick(record, "geo_lat")), float(_pick(record, "geo_lng"))
+    except (TypeError, ValueError):
+        raise InvalidRecord("geo_lat/geo_lng must be numbers")
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise InvalidRecord("coordinates out of range")
+
+    external_id = _pick(record, "external_id")
+    row = {
+        "import_key": shelter_import_key(str(name), str(address), str(external_id) if external_id is not None else None),
+        "name": str(name).strip(),
+        "address": str(address).strip(),
+        "geo_lat": lat,
+        "geo_lng": lng,
+        "geohash": encode_geohash(lat, lng),  # Core inserts skip the ORM event
+    }
+    for optional in ("phone", "policies", "hours"):
+        value = _pick(record, optional)
+        row[optional] = str(value) if value is not None else None
+    return row
+
+
+# --- parsers (all lazy except GeoJSON, which is one JSON document) ---
+def iter_csv(fp: IO[str]) -> Iterator[dict]:
+    yield from csv.DictReader(fp)
+
+
+def iter_ndjson(fp: IO[str]) -> Iterator[dict]:
+    for line in fp:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def iter_geojson(fp: IO[str]) -> Iterator[dict]:
+    doc = json.load(fp)
+    features = doc.get("features", []) if doc.get("type") == "FeatureCollection" else [doc]
+    for feature in features:
+        props = dict(feature.get("properties") or {})
+        geometry = feature.get("geometry") or {}
+        if geometry.get("type") == "Point":
+            lng, lat = geometry["coordinates"][:2]  # GeoJSON order is [lng, lat]
+            props.setdefault("geo_lat", lat)
+            props.setdefault("geo_lng", lng)
+        if feature.get("id") is not None:
+            props.setdefault("external_id", feature["id"])
+        yield props
+
+
+PARSERS = {"csv": iter_csv, "ndjson": iter_ndjson, "geojson": iter_geojson}
+
+
+def detect_format(filename: str) -> Optional[str]:
+    lower = filename.lower()
+    if lower.endswith(".csv"):
+        return "csv"
+    if lower.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    if lower.endswith((".geojson", ".json")):
+        return "geojson"
+    return None
+
+
+@dataclass
+class ImportResult:
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0   # unchanged rows and in-file duplicates
+    invalid: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {
+            "inserted": self.inserted, "updated": self.updated,
+            "skipped": self.skipped, "invalid": self.invalid, "errors": self.errors,
+        }
+
+
+def _upsert_returning(db: Session, rows: List[dict]) -> set:
+    """Writes rows; returns the import_keys actually inserted or changed."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    t = Shelter.__table__
+    stmt = dialect_insert(t)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[t.c.import_key],
+        set_={**{f: stmt.excluded[f] for f in UPSERT_FIELDS}, "updated_at": datetime.now(timezone.utc)},
+        # identical rows are left alone (no write, not returned)
+        where=or_(*(t.c[f].is_distinct_from(stmt.excluded[f]) for f in UPSERT_FIELDS)),
+    ).returning(t.c.import_key)
+    return set(db.execute(stmt, rows).scalars().all())
+
+
+def _upsert_generic(db: Session, rows: List[dict], existing: set) -> set:
+    # Fallback for other dialects: executemany UPDATE for known keys, INSERT for the rest
+    t = Shelter.__table__
+    new = [r for r in rows if r["import_key"] not in existing]
+    old = [r for r in rows if r["import_key"] in existing]
+    if new:
+        db.execute(insert(t), new)
+    if old:
+        db.execute(
+            update(t).where(t.c.import_key == bindparam("b_key"))
+            .values({f: bindparam(f"b_{f}") for f in UPSERT_FIELDS}, updated_at=datetime.now(timezone.utc)),
+            [{"b_key": r["import_key"], **{f"b_{f}": r[f] for f in UPSERT_FIELDS}} for r in old],
+        )
+    return {r["import_key"] for r in rows}
+
+
+def upsert_batch(db: Session, rows: List[dict], result: ImportResult) -> None:
+    keys = [r["import_key"] for r in rows]
+    existing = set(db.execute(select(Shelter.import_key).where(Shelter.import_key.in_(keys))).scalars().all())
+    if db.get_bind().dialect.name in ("postgresql", "sqlite"):
+        written = _upsert_returning(db, rows)
+    else:
+        written = _upsert_generic(db, rows, existing)
+    result.inserted += len(written - existing)
+    result.updated += len(written & existing)
+    result.skipped += len(rows) - len(written)
+
+
+def import_records(db: Session, records: Iterable[dict], batch_size: Optional[int] = None,
+                   max_errors: int = 20) -> ImportResult:
+    """Upserts records in batches, committing after each batch."""
+    size = batch_size or settings.IMPORT_BATCH_SIZE
+    result = ImportResult()
+    batch: Dict[str, dict] = {}  # keyed by import_key: ON CONFLICT can't touch a row twice per statement
+
+    def flush():
+        if batch:
+            upsert_batch(db, list(batch.values()), result)
+            db.commit()
+            batch.clear()
+
+    for n, record in enumerate(records, start=1):
+        try:
+            row = to_row(record)
+        except InvalidRecord as e:
+            result.invalid += 1
+            if len(result.errors) < max_errors:
+                result.errors.append(f"record {n}: {e}")
+            continue
+        if row["import_key"] in batch:
+            result.skipped += 1  # later duplicate in the same file wins
+        batch[row["import_key"]] = row
+        if len(batch) >= size:
+            flush()
+    flush()
+    return result
+
+
+def import_file(db: Session, fp: IO[bytes], fmt: str, batch_size: Optional[int] = None) -> ImportResult:
+    if fmt not in PARSERS:
+        raise ValueError(f"format must be one of: {', '.join(IMPORT_FORMATS)}")
+    text = io.TextIOWrapper(fp, encoding="utf-8-sig", newline="")
+    try:
+        return import_records(db, PARSERS[fmt](text), batch_size)
+    finally:
+        text.detach()
@@ -0,0 +1,124 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select, func, cast, Date
+from sqlalchemy.orm import Session
+
+from .cache import TTLCache
+from .models.counters import IntakeDailyCounter
+from .models.intake import IntakeRequest
+from .settings import settings
+
+# Intake analytics (GET /intake/stats).
+# Aggregates come from intake_daily_counters (shelter, status, day) when they are
+# maintained, so the GROUP BY touches days x shelters x statuses rows instead of
+# every intake; otherwise from intake_requests directly.
+# Results are split at the start of the current (open) bucket: the closed part is
+# cached for INTAKE_STATS_CLOSED_TTL_SECONDS, the open part for INTAKE_STATS_OPEN_TTL_SECONDS.
+
+GROUP_KEYS = ("day", "week", "shelter", "status")
+
+_closed_cache = TTLCache(maxsize=4096, ttl=settings.INTAKE_STATS_CLOSED_TTL_SECONDS)
+_open_cache = TTLCache(maxsize=4096, ttl=settings.INTAKE_STATS_OPEN_TTL_SECONDS)
+
+
+def parse_group_by(value: str) -> Tuple[str, ...]:
+    keys = tuple(dict.fromkeys(k.strip().lower() for k in value.split(",") if k.strip()))
+    if not keys or any(k not in GROUP_KEYS for k in keys):
+        raise ValueError(f"group_by must be a comma-separated subset of: {', '.join(GROUP_KEYS)}")
+    if "day" in keys and "week" in keys:
+        raise ValueError("group_by can't contain both day and week")
+    return keys
+
+
+def _today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+def week_start(d: date) -> date:
+    return d - timedelta(days=d.weekday())  # Monday
+
+
+def _week_expr(dialect: str, day_col):
+    if dialect == "postgresql":
+        return cast(func.date_trunc("week", day_col), Date)
+    # SQLite: forward to Sunday (same day if already Sunday), then back to its Monday
+    return func.date(day_col, "weekday 0", "-6 days")
+
+
+def _query(db: Session, keys: Sequence[str], shelter_id: Optional[int], status: Optional[str],
+           start: Optional[date], end: Optional[date]) -> Dict[tuple, int]:
+    """Counts per key tuple for days in [start, end] (inclusive, either open-ended)."""
+    dialect = db.get_bind().dialect.name
+    if settings.INTAKE_DAILY_COUNTERS:
+        D = IntakeDailyCounter
+        day_col, shelter_col, status_col, count = D.day, D.shelter_id, D.status, func.sum(D.count)
+    else:
+        R = IntakeRequest
+        day_col, shelter_col, status_col, count = func.date(R.created_at), R.shelter_id, R.status, func.count()
+
+    exprs = {
+        "day": day_col,
+        "week": _week_expr(dialect, day_col) if "week" in keys else None,
+        "shelter": shelter_col,
+        "status": status_col,
+    }
+    cols = [exprs[k].label(k) for k in keys]
+    q = select(*cols, count.label("count"))
+    if shelter_id is not None:
+        q = q.where(shelter_col == shelter_id)
+    if status is not None:
+        q = q.where(status_col == status)
+    if start is not None:
+        q = q.where(day_col >= start)
+    if end is not None:
+        q = q.where(day_col <= end)
+    q = q.group_by(*cols)
+
+    out: Dict[tuple, int] = {}
+    for row in db.execute(q):
+        # dates come back as date (Postgres, Date columns) or ISO text (SQLite date())
+        key = tuple(v.isoformat() if isinstance(v, date) else v for v in row[:-1])
+        out[key] = out.get(key, 0) + int(row[-1] or 0)
+    return out
+
+
+def _cached(cache: TTLCache, db: Session, keys, shelter_id, status, start, end) -> Dict[tuple, int]:
+    ck = (keys, shelter_id, status, start, end, settings.INTAKE_DAILY_COUNTERS)
+    hit = cache.get(ck)
+    if hit is None:
+        hit = _query(db, keys, shelter_id, status, start, end)
+        cache.set(ck, hit)
+    return hit
+
+
+def intake_stats(db: Session, keys: Sequence[str], shelter_id: Optional[int], status: Optional[str],
+                 from_date: Optional[date], to_date: Optional[date]) -> List[dict]:
+    keys = tuple(keys)
+    today = _today()
+    # First day of the bucket that can still change; everything before it is closed
+    open_start = week_start(today) if "week" in keys else today
+
+    merged: Dict[tuple, int] = {}
+    parts = []
+    if from_date is None or from_date < open_start:
+        closed_end = open_start - timedelta(days=1)
+        parts.append((_closed_cache, from_date, min(to_date, closed_end) if to_date else closed_end))
+    if to_date is None or to_date >= open_start:
+        parts.append((_open_cache, max(from_date, open_start) if from_date else open_start, to_date))
+
+    for cache, start, end in parts:
+        if start is not None and end is not None and start > end:
+            continue
+        for key, n in _cached(cache, db, keys, shelter_id, status, start, end).items():
+            merged[key] = merged.get(key, 0) + n
+
+    rows = [dict(zip(keys, key), count=n) for key, n in merged.items() if n]
+    rows.sort(key=lambda r: tuple(r[k] for k in keys))
+    return rows
+
+
+def invalidate_intake_stats() -> None:
+    """Status changes can move counts between statuses inside closed buckets."""
+    _closed_cache.clear()
+    _open_cache.clear()
@@ -0,0 +1,256 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import FrozenSet, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+
+from .availability import availability_index
+from .db import SessionLocal
+from .models.capacity import CapacityLog
+from .models.shelter import Shelter
+from .settings import settings
+
+# Live capacity feed (SSE / WebSocket in routes/capacity.py).
+#
+# Fan-out: commits made by this worker are published immediately; commits made by
+# other uvicorn workers are picked up by a per-worker poller that tails capacity_logs
+# by id (one indexed query per LIVE_FEED_POLL_SECONDS, independent of client count).
+# Deduplication goes through availability_index.record, which also keeps this
+# worker's availability index current with the other workers' writes.
+# With no subscribers the poller idles; the first subscriber after that reloads the index
+# and resumes tailing from the current newest log instead of replaying the gap.
+
+logger = logging.getLogger("app.live")
+
+BBox = Tuple[float, float, float, float]  # min_lng, min_lat, max_lng, max_lat
+
+
+@dataclass(frozen=True)
+class CapacityEvent:
+    shelter_id: int
+    beds_available: int
+    beds_total: int
+    version: int
+    updated_at: datetime
+    geo_lat: Optional[float] = None
+    geo_lng: Optional[float] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "shelter_id": self.shelter_id,
+            "beds_available": self.beds_available,
+            "beds_total": self.beds_total,
+            "version": self.version,
+            "updated_at": self.updated_at.isoformat(),
+        }
+
+
+@dataclass(frozen=True)
+class LiveFilter:
+    shelter_ids: Optional[FrozenSet[int]] = None
+    bbox: Optional[BBox] = None
+
+    def matches(self, event: CapacityEvent) -> bool:
+        if self.shelter_ids is not None and event.shelter_id not in self.shelter_ids:
+            return False
+        if self.bbox is not None:
+            if event.geo_lat is None or event.geo_lng is None:
+                return False
+            min_lng, min_lat, max_lng, max_lat = self.bbox
+            if not (min_lat <= event.geo_lat <= max_lat and min_lng <= event.geo_lng <= max_lng):
+                return False
+        return True
+
+
+class Subscription:
+    def __init__(self, flt: LiveFilter, maxsize: int):
+        self.filter = flt
+        self.queue: "asyncio.Queue[Optional[CapacityEvent]]" = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[CapacityEvent]:
+        """Next event, or None on timeout / overflow (caller should close the stream)."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class CapacityBroker:
+    def __init__(self):
+        self._subs: Set[Subscription] = set()
+        self._last_id = 0
+        self._idle = False
+        self._task: Optional[asyncio.Task] = None
+
+    # --- subscribers ---
+    def subscribe(self, flt: LiveFilter) -> Subscription:
+        sub = Subscription(flt, settings.LIVE_FEED_QUEUE_SIZE)
+        self._subs.add(sub)
+        return sub
+
+    async def resume(self) -> None:
+        """Call before subscribe(): catches up after the poller skipped polls for lack of subscribers."""
+        if self._idle:
+            self._last_id = await run_in_threadpool(self._resync)
+            self._idle = False
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        self._subs.discard(sub)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subs)
+
+    def _fanout(self, event: CapacityEvent) -> None:
+        for sub in list(self._subs):
+            if sub.overflowed or not sub.filter.matches(event):
+                continue
+            try:
+                sub.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # slow client: drop it rather than buffer without bound; it reconnects and re-snapshots
+                sub.overflowed = True
+                self._subs.discard(sub)
+
+    # --- publishing ---
+    def publish_log(self, log, geo_lat: Optional[float] = None, geo_lng: Optional[float] = None) -> None:
+        """Call on the event loop after a capacity log is committed."""
+        self._last_id = max(self._last_id, log.id)
+        if not availability_index.record(log):
+            return  # already seen (e.g. published locally, then seen again by the poller)
+        self._fanout(CapacityEvent(
+            shelter_id=log.shelter_id,
+            beds_available=log.beds_available,
+            beds_total=log.beds_total,
+            version=log.id,
+            updated_at=log.updated_at,
+            geo_lat=geo_lat,
+            geo_lng=geo_lng,
+        ))
+
+    # --- cross-worker poller ---
+    def _fetch_since(self, after_id: int) -> list:
+        stmt = (
+            select(
+                CapacityLog.id, CapacityLog.shelter_id, CapacityLog.beds_total,
+                CapacityLog.beds_available, CapacityLog.updated_at,
+                Shelter.geo_lat, Shelter.geo_lng,
+            )
+            .join(Shelter, Shelter.id == CapacityLog.shelter_id)
+            .where(CapacityLog.id > after_id)
+            .order_by(CapacityLog.id)
+            .limit(1000)
+        )
+        db = SessionLocal()
+        try:
+            return db.execute(stmt).all()
+        finally:
+            db.close()
+
+    def _max_id(self) -> int:
+        db = SessionLocal()
+        try:
+            return db.scalar(select(CapacityLog.id).order_by(CapacityLog.id.desc()).limit(1)) or 0
+        finally:
+            db.close()
+
+    def _resync(self) -> int:
+        # Newest id first: anything committed after it is picked up by the next poll,
+        # anything before it is in the reloaded index
+        last_id = self._max_id()
+        db = SessionLocal()
+        try:
+            availability_index.load(db)
+        finally:
+            db.close()
+        return last_id
+
+    async def poll_once(self) -> int:
+        # Look back a little: ids are assigned before commit, so a slow transaction can
+        # commit a lower id after a higher one was seen. Re-reads are deduplicated.
+        after = max(self._last_id - settings.LIVE_FEED_LOOKBACK_IDS, 0)
+        rows = await run_in_threadpool(self._fetch_since, after)
+        for row in rows:
+            self.publish_log(row, row.geo_lat, row.geo_lng)
+        return len(rows)
+
+    async def _run(self) -> None:
+        while True:
+            if not self._subs:
+                self._idle = True
+            else:
+                try:
+                    await self.resume()
+                    await self.poll_once()
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    logger.exception("Live feed poll failed")
+            await asyncio.sleep(settings.LIVE_FEED_POLL_SECONDS)
+
+    async def start(self) -> None:
+        if self._task is None and settings.LIVE_FEED_POLL_SECONDS > 0:
+            self._last_id = await run_in_threadpool(self._max_id)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+capacity_broker = CapacityBroker()
+
+
+def parse_live_filter(shelter_ids: Optional[str], bbox: Optional[str]) -> LiveFilter:
+    """shelter_ids="1,2,3"; bbox="min_lng,min_lat,max_lng,max_lat". Raises ValueError."""
+    ids = frozenset(int(x) for x in shelter_ids.split(",") if x.strip()) if shelter_ids else None
+    box = None
+    if bbox:
+        parts = [float(x) for x in bbox.split(",")]
+        if len(parts) != 4 or parts[0] > parts[2] or parts[1] > parts[3]:
+            raise ValueError("bbox must be min_lng,min_lat,max_lng,max_lat")
+        box = tuple(parts)
+    return LiveFilter(shelter_ids=ids, bbox=box)
+
+
+def snapshot_shelter_ids(flt: LiveFilter) -> Optional[Set[int]]:
+    """Shelter ids allowed in the snapshot (None = all). Sync; run in a threadpool."""
+    if flt.bbox is None:
+        return set(flt.shelter_ids) if flt.shelter_ids is not None else None
+    min_lng, min_lat, max_lng, max_lat = flt.bbox
+    stmt = select(Shelter.id).where(
+        Shelter.geo_lat.between(min_lat, max_lat),
+        Shelter.geo_lng.between(min_lng, max_lng),
+    )
+    db = SessionLocal()
+    try:
+        ids = set(db.execute(stmt).scalars().all())
+    finally:
+        db.close()
+    if flt.shelter_ids is not None:
+        ids &= flt.shelter_ids
+    return ids
+
+
+def snapshot(flt: LiveFilter) -> List[dict]:
+    allowed = snapshot_shelter_ids(flt)
+    return [
+        {
+            "shelter_id": c.shelter_id,
+            "beds_available": c.beds_available,
+            "beds_total": c.beds_total,
+            "version": c.version,
+            "updated_at": c.updated_at.isoformat(),
+        }
+        for c in availability_index.all()
+        if allowed is None or c.shelter_id in allowed
+    ]
@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .routes import root
@@ -6,9 +7,37 @@ from .routes import capacity as capacity_routes
 from .routes import intake as intake_routes
 from .routes import shelters as shelters_routes
 from .settings import settings
+from .db import SessionLocal, async_engine, engine
+from .availability import availability_index
+from .hashing import hashing_pool
+from .live import capacity_broker
+from .responses import APIResponse, WireFormatMiddleware
+from .compression import CompressionMiddleware
+from .metrics import MetricsMiddleware, instrument_engine
+from .diagnostics import DiagnosticsMiddleware
+from .replicas import ReadYourWritesMiddleware, replica_set
 
 
-app = FastAPI(title=settings.PROJECT_NAME, version=settings.API_VERSION)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm the current-availability index with one query
+    db = SessionLocal()
+    try:
+        availability_index.load(db)
+    finally:
+        db.close()
+    await capacity_broker.start()
+    await replica_set.start()
+    yield
+    await replica_set.stop()
+    await capacity_broker.stop()
+    hashing_pool.shutdown()
+    if async_engine is not None:
+        await async_engine.dispose()
+
+
+app = FastAPI(title=settings.PROJECT_NAME, version=settings.API_VERSION, lifespan=lifespan,
+              default_response_class=APIResponse)
 
 # CORS
 app.add_middleware(
@@ -17,8 +46,37 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"] + (["X-DB-Queries"] if settings.DB_DIAGNOSTICS_HEADER else []),
+)
+
+# Encoding: JSON/MessagePack negotiation, then br/gzip (outermost, sees the final body)
+app.add_middleware(WireFormatMiddleware)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_BYTES,
+    gzip_level=settings.GZIP_LEVEL,
+    brotli_quality=settings.BROTLI_QUALITY,
 )
 
+# Read-your-writes stickiness for the read replicas (DATABASE_REPLICA_URLS)
+if replica_set:
+    app.add_middleware(ReadYourWritesMiddleware)
+
+# Per-request SQL diagnostics (DB_DIAGNOSTICS=true)
+if settings.DB_DIAGNOSTICS:
+    app.add_middleware(DiagnosticsMiddleware)
+
+# Metrics (outermost, so latency includes encoding and compression)
+if settings.METRICS_ENABLED:
+    instrument_engine(engine, "sync")
+    if async_engine is not None:
+        instrument_engine(async_engine.sync_engine, "async")
+    for replica in replica_set.replicas:
+        instrument_engine(replica.engine, replica.name)
+        if replica.async_engine is not None:
+            instrument_engine(replica.async_engine.sync_engine, f"{replica.name}-async")
+    app.add_middleware(MetricsMiddleware)
+
 # Routers
 app.include_router(root.router, prefix="")
 app.include_router(auth_routes.router)
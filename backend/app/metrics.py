@@ -0,0 +1,305 @@
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Process-local Prometheus metrics (text exposition format 0.0.4, no client library).
+# - MetricsMiddleware: request latency histogram per route template + status code, and
+#   per-request DB query count/time (engine events below feed a per-request cell).
+# - instrument_engine(): query counters, pool checkout wait histogram, pool gauges.
+# - Outbox delivery attempts/failures per channel (app/outbox.py).
+# Each uvicorn worker (and notification_worker.py, via --metrics-port) has its own
+# registry: scrape every process, or run one worker per scrape target.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """Set directly, or computed at scrape time from a callback returning {labels: value}."""
+    kind = "gauge"
+
+    def __init__(self, *args, callback: Optional[Callable[[], Dict[LabelValues, float]]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+        self._callback = callback
+
+    def set(self, *labels: str, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        if self._callback is not None:
+            values.update(self._callback())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = LATENCY_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._values: Dict[LabelValues, list] = {}  # labels -> [bucket counts..., sum]
+
+    def observe(self, *labels: str, value: float) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [0] * len(self.buckets) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        lines = self.header()
+        for labels, series in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, series):
+                cumulative += n
+                le = f'le="{_num(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_num(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines += metric.collect()
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route template and status", ("method", "route", "status")))
+http_latency = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency (streaming responses excluded)",
+    ("method", "route", "status"), buckets=LATENCY_BUCKETS))
+http_in_progress = registry.register(Gauge(
+    "http_requests_in_progress", "HTTP requests currently being served"))
+request_queries = registry.register(Histogram(
+    "http_request_db_queries", "DB statements executed per HTTP request", ("route",),
+    buckets=QUERY_COUNT_BUCKETS))
+request_query_time = registry.register(Histogram(
+    "http_request_db_seconds", "DB time spent per HTTP request", ("route",), buckets=LATENCY_BUCKETS))
+db_queries = registry.register(Counter(
+    "db_queries_total", "DB statements executed", ("engine",)))
+db_query_seconds = registry.register(Counter(
+    "db_query_seconds_total", "Time spent executing DB statements", ("engine",)))
+pool_wait = registry.register(Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection", ("engine",),
+    buckets=POOL_WAIT_BUCKETS))
+notifications_attempted = registry.register(Counter(
+    "notifications_attempts_total", "Outbound notification delivery attempts", ("channel",)))
+notifications_failed = registry.register(Counter(
+    "notifications_failures_total", "Outbound notification delivery failures", ("channel",)))
+
+
+# --- DB instrumentation ---
+# [statements, seconds] for the current HTTP request. Starlette's threadpool and the
+# async engine's greenlets run with a copy of the request's context, so the cell is shared.
+_request_db: ContextVar[Optional[list]] = ContextVar("request_db", default=None)
+
+_engines: Dict[str, object] = {}
+
+
+def _pool_stats() -> Dict[str, Dict[LabelValues, float]]:
+    stats: Dict[str, Dict[LabelValues, float]] = {"size": {}, "checked_out": {}, "overflow": {}, "utilization": {}}
+    for name, engine in _engines.items():
+        pool = engine.pool  # read at scrape time: dispose() swaps in a new pool
+        if not hasattr(pool, "checkedout"):
+            continue  # NullPool / StaticPool / SingletonThreadPool have no counters
+        size, out, overflow = pool.size(), pool.checkedout(), max(pool.overflow(), 0)
+        capacity = size + max(getattr(pool, "_max_overflow", 0), 0)
+        stats["size"][(name,)] = size
+        stats["checked_out"][(name,)] = out
+        stats["overflow"][(name,)] = overflow
+        stats["utilization"][(name,)] = out / capacity if capacity > 0 else 0.0
+    return stats
+
+
+for _key, _doc in (("size", "Configured pool size"), ("checked_out", "Connections currently checked out"),
+                   ("overflow", "Overflow connections currently open"),
+                   ("utilization", "Checked-out connections / (pool size + max overflow)")):
+    registry.register(Gauge(f"db_pool_{_key}", _doc, ("engine",),
+                            callback=lambda key=_key: _pool_stats()[key]))
+
+
+def instrument_engine(engine, name: str) -> None:
+    """Hooks query counting/timing and pool wait timing into a (sync) Engine."""
+    from sqlalchemy import event
+
+    if name in _engines:
+        return
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_start", []).append(time.perf_counter())
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("metrics_start")
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        db_queries.inc(name)
+        db_query_seconds.inc(name, amount=elapsed)
+        cell = _request_db.get()
+        if cell is not None:
+            cell[0] += 1
+            cell[1] += elapsed
+
+    event.listen(engine, "before_cursor_execute", before)
+    event.listen(engine, "after_cursor_execute", after)
+
+    # Pools have no "checkout requested" event: time Pool.connect() itself, and again on
+    # the fresh pool that Engine.dispose() creates
+    def time_checkouts(pool) -> None:
+        connect = pool.connect
+
+        def timed_connect():
+            start = time.perf_counter()
+            try:
+                return connect()
+            finally:
+                pool_wait.observe(name, value=time.perf_counter() - start)
+
+        pool.connect = timed_connect
+
+    time_checkouts(engine.pool)
+    event.listen(engine, "engine_disposed", lambda eng: time_checkouts(eng.pool))
+    _engines[name] = engine
+
+
+# --- HTTP middleware ---
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = "500"
+        streaming = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+                streaming = Headers(raw=message.get("headers", [])).get("content-type", "").startswith("text/event-stream")
+            await send(message)
+
+        cell = [0, 0.0]
+        token = _request_db.set(cell)
+        http_in_progress.inc(amount=1)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_in_progress.inc(amount=-1)
+            _request_db.reset(token)
+            # Router fills scope["route"]; label by template (/shelters/{shelter_id}) to bound cardinality
+            route = getattr(scope.get("route"), "path", None) or "<unmatched>"
+            method = scope["method"]
+            http_requests.inc(method, route, status)
+            if not streaming:
+                http_latency.observe(method, route, status, value=elapsed)
+            request_queries.observe(route, value=cell[0])
+            request_query_time.observe(route, value=cell[1])
+
+
+# --- standalone exporter for non-HTTP processes (notification_worker.py) ---
+def serve_metrics(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -2,8 +2,11 @@
 from .base import Base
 from .user import User
 from .shelter import Shelter
-from .capacity import CapacityLog
+from .capacity import CapacityLog, CapacityLogArchive
 from .intake import IntakeRequest
+from .counters import IntakeStatusCounter, IntakeDailyCounter
+from .outbox import NotificationOutbox
+from .rollups import CapacityRollup
 
-__all__ = ["Base", "User", "Shelter", "CapacityLog", "IntakeRequest"]
+__all__ = ["Base", "User", "Shelter", "CapacityLog", "CapacityLogArchive", "IntakeRequest", "IntakeStatusCounter", "IntakeDailyCounter", "NotificationOutbox", "CapacityRollup"]
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, LargeBinary, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from .base import Base
@@ -15,3 +15,22 @@ class CapacityLog(TimestampMixin, Base):
     updated_by = Column(Integer, ForeignKey("users.id"))
 
     shelter = relationship("Shelter", backref="capacity_logs")
+
+    __table_args__ = (
+        # Latest-per-shelter and per-shelter history lookups
+        Index("ix_capacity_logs_shelter_updated", shelter_id, updated_at),
+    )
+
+# Expired capacity logs, moved out of the hot table by app/retention.py.
+# One row per archived batch and month: gzip-compressed NDJSON of the original rows.
+class CapacityLogArchive(Base):
+    __tablename__ = "capacity_log_archive"
+
+    id = Column(Integer, primary_key=True)
+    period = Column(String(7), nullable=False, index=True)  # "YYYY-MM" of updated_at
+    first_log_id = Column(Integer, nullable=False)
+    last_log_id = Column(Integer, nullable=False)
+    row_count = Column(Integer, nullable=False)
+    codec = Column(String(16), nullable=False, default="ndjson+gzip")
+    payload = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Date
+from .base import Base
+
+# Denormalized intake counts, maintained in the same transaction as the intake writes
+# (see app/counters.py). Rebuild with `python rebuild_intake_counters.py`.
+
+class IntakeStatusCounter(Base):
+    __tablename__ = "intake_status_counters"
+
+    shelter_id = Column(Integer, ForeignKey("shelters.id", ondelete="CASCADE"), primary_key=True)
+    status = Column(String, primary_key=True)
+    count = Column(Integer, default=0, nullable=False)
+
+class IntakeDailyCounter(Base):
+    __tablename__ = "intake_daily_counters"
+
+    shelter_id = Column(Integer, ForeignKey("shelters.id", ondelete="CASCADE"), primary_key=True)
+    status = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)  # created_at date (UTC)
+    count = Column(Integer, default=0, nullable=False)
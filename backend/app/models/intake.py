@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, CheckConstraint
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, CheckConstraint, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from .base import Base
@@ -13,7 +13,7 @@ class IntakeRequest(TimestampMixin, Base):
     reason = Column(String, nullable=True) 
     eta = Column(DateTime, nullable=True)    # text for ETA
     status = Column(String, default="pending", nullable=False)
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
 
     __table_args__ = (
         # SQLite treats CHECK as advisory; Postgres will enforce strictly.
@@ -21,6 +21,10 @@ class IntakeRequest(TimestampMixin, Base):
             "status in ('pending','fulfilled','cancelled')",
             name="ck_intake_status"
         ),
+        # Composite indexes matching the role-scoped list/search filters + keyset order
+        Index("ix_intake_requests_shelter_status_created", shelter_id, status, created_at.desc(), id.desc()),
+        Index("ix_intake_requests_shelter_created", shelter_id, created_at.desc(), id.desc()),
+        Index("ix_intake_requests_status_created", status, created_at.desc(), id.desc()),
     )
 
     shelter = relationship("Shelter", back_populates="intakes")
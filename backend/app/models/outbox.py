@@ -0,0 +1,33 @@
+from sqlalchemy import Boolean, Column, Integer, String, Text, DateTime, ForeignKey, Index
+from datetime import datetime, timezone
+from .base import Base
+
+class NotificationOutbox(Base):
+    """
+    One pending email/SMS, written in the same transaction as the intake change and
+    delivered by the worker (notification_worker.py). See app/outbox.py.
+    """
+    __tablename__ = "notification_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    channel = Column(String, nullable=False)        # "email" | "sms"
+    kind = Column(String, nullable=False)           # "intake_created" | "intake_status"
+    shelter_id = Column(Integer, ForeignKey("shelters.id", ondelete="SET NULL"), nullable=True)
+    intake_id = Column(Integer, nullable=True)
+    recipient = Column(String, nullable=True)       # email / E164 number; None -> default
+    subject = Column(String, nullable=True)
+    body = Column(Text, nullable=False)
+    digest = Column(Boolean, default=False, nullable=False)  # held and merged per shelter/channel
+
+    status = Column(String, default="pending", nullable=False)  # pending|sending|sent|failed
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    claimed_by = Column(String, nullable=True)
+    claimed_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_notification_outbox_due", "status", "next_attempt_at"),
+    )
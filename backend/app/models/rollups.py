@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime
+from .base import Base
+
+# Hourly / daily capacity aggregates per shelter, maintained in the same transaction
+# as the capacity log writes (see app/rollups.py). Rebuild with `python rebuild_capacity_rollups.py`.
+
+class CapacityRollup(Base):
+    __tablename__ = "capacity_rollups"
+
+    shelter_id = Column(Integer, ForeignKey("shelters.id", ondelete="CASCADE"), primary_key=True)
+    bucket = Column(String(8), primary_key=True)        # "hour" | "day"
+    bucket_start = Column(DateTime, primary_key=True)   # UTC, truncated to the bucket
+    samples = Column(Integer, default=0, nullable=False)  # number of capacity updates
+    min_available = Column(Integer, nullable=False)
+    max_available = Column(Integer, nullable=False)
+    sum_available = Column(Integer, default=0, nullable=False)
+    sum_occupancy_pct = Column(Float, default=0.0, nullable=False)  # sum of per-update occupancy %
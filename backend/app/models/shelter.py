@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Float, Text
+from sqlalchemy import Column, Integer, String, Float, Text, event, inspect
 from .base import Base
 from sqlalchemy.orm import relationship
 from .mixins import TimestampMixin
+from ..geo import encode_geohash
 
 class Shelter(TimestampMixin, Base):
     __tablename__ = "shelters"
@@ -11,8 +12,39 @@ class Shelter(TimestampMixin, Base):
     address = Column(String, nullable=False)
     geo_lat = Column(Float, nullable=False)
     geo_lng = Column(Float, nullable=False)
+    geohash = Column(String(12), nullable=True, index=True)  # kept in sync with geo_lat/geo_lng
     phone = Column(String, nullable=True)
     policies = Column(Text, nullable=True)  # JSON-ish text
     hours = Column(String, nullable=True)   # e.g. "9am–9pm"
+    notification_mode = Column(String, nullable=True)  # "immediate" | "digest"; None -> settings.NOTIFY_MODE
+    # Upsert key for bulk imports: "ext:<external id>" or normalized "na:<name>|<address>"
+    import_key = Column(String(255), nullable=True, unique=True, index=True)
 
-    intakes = relationship("IntakeRequest", back_populates="shelter", cascade="all, delete-orphan")
\ No newline at end of file
+    intakes = relationship("IntakeRequest", back_populates="shelter", cascade="all, delete-orphan")
+
+
+# Recompute the spatial key on every ORM write so all paths (API, scripts) stay consistent
+@event.listens_for(Shelter, "before_insert")
+@event.listens_for(Shelter, "before_update")
+def _set_geohash(mapper, connection, target):
+    if target.geo_lat is not None and target.geo_lng is not None:
+        target.geohash = encode_geohash(target.geo_lat, target.geo_lng)
+
+
+# Shelters created through the API get a name+address key so a later import matches them
+@event.listens_for(Shelter, "before_insert")
+def _set_import_key(mapper, connection, target):
+    if target.import_key is None and target.name and target.address:
+        from ..importer import normalize_key  # importer imports this module
+        target.import_key = normalize_key(target.name, target.address)
+
+
+# Name+address keys follow renames; "ext:" keys belong to the source directory and stay
+@event.listens_for(Shelter, "before_update")
+def _refresh_import_key(mapper, connection, target):
+    if target.import_key is not None and not target.import_key.startswith("na:"):
+        return
+    attrs = inspect(target).attrs
+    if attrs.name.history.has_changes() or attrs.address.history.has_changes():
+        from ..importer import normalize_key
+        target.import_key = normalize_key(target.name, target.address)
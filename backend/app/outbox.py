@@ -0,0 +1,272 @@
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select, update, and_, or_, func, case
+from sqlalchemy.orm import Session
+
+from .db import SessionLocal
+from .metrics import notifications_attempted, notifications_failed
+from .models.outbox import NotificationOutbox
+from .models.shelter import Shelter
+from .settings import settings
+from .utils.notifications import (
+    build_email,
+    deliver_sms,
+    intake_email_content,
+    intake_sms_body,
+    intake_status_sms_body,
+    smtp_session,
+    twilio_client,
+)
+
+# Transactional outbox for intake notifications.
+# Routes only INSERT rows (same transaction as the intake); the worker claims due rows
+# in batches, delivers them over one SMTP session / one Twilio client, and retries
+# failures with exponential backoff. Shelters in digest mode get their new-intake rows
+# held and merged into one message per window (see _ready_digest_groups).
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def notification_mode(shelter) -> str:
+    return getattr(shelter, "notification_mode", None) or settings.NOTIFY_MODE
+
+
+# --- enqueue (called inside the request transaction; no I/O) ---
+def enqueue_intake_created(db: Session, shelter, req) -> None:
+    # Digest rows wait out the window; the worker may release them early at DIGEST_MAX_ITEMS
+    digest = notification_mode(shelter) == "digest"
+    not_before = _now() + timedelta(seconds=settings.DIGEST_WINDOW_SECONDS) if digest else _now()
+
+    subject, body = intake_email_content(shelter.name, req)
+    db.add(NotificationOutbox(
+        channel="email", kind="intake_created", shelter_id=shelter.id, intake_id=req.id,
+        subject=subject, body=body, digest=digest, next_attempt_at=not_before,
+    ))
+    if settings.TWILIO_ENABLED and settings.TEST_SMS_TO:
+        # destination for now (Marker 9: use shelter phone)
+        db.add(NotificationOutbox(
+            channel="sms", kind="intake_created", shelter_id=shelter.id, intake_id=req.id,
+            recipient=settings.TEST_SMS_TO, body=intake_sms_body(shelter.name, req),
+            digest=digest, next_attempt_at=not_before,
+        ))
+
+
+def enqueue_intake_status(db: Session, shelter, req) -> None:
+    # SMS to requester (for now uses TEST_SMS_TO)
+    if not (settings.TWILIO_ENABLED and settings.TEST_SMS_TO):
+        return
+    db.add(NotificationOutbox(
+        channel="sms", kind="intake_status", shelter_id=shelter.id, intake_id=req.id,
+        recipient=settings.TEST_SMS_TO, body=intake_status_sms_body(shelter, req),
+    ))
+
+
+# --- worker side ---
+def _ready_digest_groups(db: Session, now: datetime, limit: int) -> List[Tuple[int, str]]:
+    """(shelter_id, channel) digests whose window has elapsed or that hit DIGEST_MAX_ITEMS."""
+    O = NotificationOutbox
+    fresh = func.sum(case((O.attempts == 0, 1), else_=0))  # rows in backoff don't force a send
+    stmt = (
+        select(O.shelter_id, O.channel)
+        .where(O.status == "pending", O.digest.is_(True))
+        .group_by(O.shelter_id, O.channel)
+        .having(or_(func.min(O.next_attempt_at) <= now, fresh >= settings.DIGEST_MAX_ITEMS))
+        .limit(limit)
+    )
+    return [tuple(r) for r in db.execute(stmt).all()]
+
+
+def claim_batch(db: Session, limit: int) -> List[NotificationOutbox]:
+    """
+    Atomically marks up to `limit` due rows (plus up to DIGEST_MAX_ITEMS rows of each
+    of up to `limit` ready digests) as "sending" for this claim and returns them.
+    Postgres: FOR UPDATE SKIP LOCKED lets several workers claim disjoint batches.
+    SQLite: the single UPDATE runs under the database write lock, which gives the
+    same guarantee (with_for_update renders nothing there).
+    """
+    now = _now()
+    stale = now - timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+    O = NotificationOutbox
+    due = or_(
+        and_(O.status == "pending", O.digest.is_(False), O.next_attempt_at <= now),
+        and_(O.status == "sending", O.claimed_at < stale),  # crashed worker
+    )
+    ids = (
+        select(O.id).where(due).order_by(O.id).limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    token = uuid.uuid4().hex
+    db.execute(
+        update(O).where(O.id.in_(ids), due)
+        .values(status="sending", claimed_by=token, claimed_at=now)
+        .execution_options(synchronize_session=False)
+    )
+
+    groups = _ready_digest_groups(db, now, limit)
+    if groups:
+        # Fresh rows join the digest early; rows in backoff wait until they are due.
+        # At most DIGEST_MAX_ITEMS rows per digest, oldest first; the rest go next time.
+        claimable = and_(
+            O.status == "pending", O.digest.is_(True),
+            or_(O.attempts == 0, O.next_attempt_at <= now),
+        )
+        ranked = (
+            select(O.id, func.row_number().over(
+                partition_by=(O.shelter_id, O.channel), order_by=O.id).label("rn"))
+            .where(claimable, or_(*(and_(O.shelter_id == sid, O.channel == ch) for sid, ch in groups)))
+            .subquery()
+        )
+        db.execute(
+            update(O)
+            .where(O.id.in_(select(ranked.c.id).where(ranked.c.rn <= settings.DIGEST_MAX_ITEMS)), claimable)
+            .values(status="sending", claimed_by=token, claimed_at=now)
+            .execution_options(synchronize_session=False)
+        )
+    db.commit()
+    return list(db.execute(select(O).where(O.claimed_by == token).order_by(O.id)).scalars().all())
+
+
+def _deliver_emails(rows: List[NotificationOutbox]) -> List[Tuple[NotificationOutbox, Optional[str]]]:
+    if not settings.EMAIL_ENABLED:
+        for r in rows:
+            print(f"[NOTIFY] {r.subject}\n{r.body}")
+        return [(r, None) for r in rows]
+
+    results = []
+    try:
+        with smtp_session() as server:
+            for r in rows:
+                try:
+                    server.send_message(build_email(r.subject or "", r.body, r.recipient))
+                    results.append((r, None))
+                except Exception as e:
+                    results.append((r, str(e)))
+    except Exception as e:
+        # connection/login failure: everything not yet attempted fails this round
+        done = {r.id for r, _ in results}
+        results += [(r, f"SMTP session: {e}") for r in rows if r.id not in done]
+    return results
+
+
+def _deliver_sms(rows: List[NotificationOutbox]) -> List[Tuple[NotificationOutbox, Optional[str]]]:
+    client = twilio_client()
+    if client is None:
+        return [(r, "Twilio client unavailable") for r in rows]
+    results = []
+    for r in rows:
+        try:
+            deliver_sms(client, r.body, r.recipient)
+            results.append((r, None))
+        except Exception as e:
+            results.append((r, str(e)))
+    return results
+
+
+def build_digests(rows: List[NotificationOutbox], shelter_names: Dict[int, str]) -> List[Tuple[NotificationOutbox, List[NotificationOutbox]]]:
+    """
+    Merges digest rows into one synthetic message per (shelter, channel).
+    Returns (message, member rows); the message is never persisted.
+    """
+    groups: Dict[Tuple[Optional[int], str], List[NotificationOutbox]] = {}
+    for r in rows:
+        groups.setdefault((r.shelter_id, r.channel), []).append(r)
+
+    merged = []
+    for (shelter_id, channel), members in groups.items():
+        name = shelter_names.get(shelter_id, f"shelter #{shelter_id}")
+        n = len(members)
+        if channel == "email":
+            subject = f"[Shelter App] {n} new intake request{'s' if n != 1 else ''} for {name}"
+            body = f"{n} new intake request(s) for {name}\n\n" + "\n----\n".join(m.body for m in members)
+        else:
+            subject = None
+            ids = ", ".join(str(m.intake_id) for m in members)
+            body = f"{n} new intake(s) at {name}\nIntake IDs: {ids}"[:1600]
+        msg = NotificationOutbox(
+            id=members[0].id, channel=channel, kind="intake_digest", shelter_id=shelter_id,
+            recipient=members[0].recipient, subject=subject, body=body,
+        )
+        merged.append((msg, members))
+    return merged
+
+
+def deliver_batch(rows: List[NotificationOutbox], shelter_names: Optional[Dict[int, str]] = None) -> List[Tuple[NotificationOutbox, Optional[str]]]:
+    # digest members are delivered as one merged message and share its outcome
+    digests = build_digests([r for r in rows if r.digest], shelter_names or {})
+    single = [r for r in rows if not r.digest] + [msg for msg, _ in digests]
+    members = {id(msg): group for msg, group in digests}
+
+    emails = [r for r in single if r.channel == "email"]
+    sms = [r for r in single if r.channel == "sms"]
+    sent = []
+    if emails:
+        sent += _deliver_emails(emails)
+    if sms:
+        sent += _deliver_sms(sms)
+
+    results = []
+    for row, error in sent:
+        notifications_attempted.inc(row.channel)
+        if error is not None:
+            notifications_failed.inc(row.channel)
+        for member in members.get(id(row), [row]):
+            results.append((member, error))
+    return results
+
+
+def backoff_seconds(attempts: int) -> float:
+    return min(settings.OUTBOX_BACKOFF_SECONDS * (2 ** max(attempts - 1, 0)), settings.OUTBOX_BACKOFF_MAX_SECONDS)
+
+
+def mark_results(db: Session, results: List[Tuple[NotificationOutbox, Optional[str]]]) -> None:
+    now = _now()
+    O = NotificationOutbox
+    for row, error in results:
+        if error is None:
+            values = {"status": "sent", "sent_at": now, "claimed_by": None, "last_error": None}
+        else:
+            attempts = row.attempts + 1
+            values = {
+                "attempts": attempts,
+                "status": "failed" if attempts >= settings.OUTBOX_MAX_ATTEMPTS else "pending",
+                "next_attempt_at": now + timedelta(seconds=backoff_seconds(attempts)),
+                "claimed_by": None,
+                "last_error": error[:1000],
+            }
+        # guard on claimed_by so a reclaimed (stale) row isn't overwritten
+        db.execute(update(O).where(O.id == row.id, O.claimed_by == row.claimed_by).values(**values))
+    db.commit()
+
+
+def process_once(batch_size: Optional[int] = None) -> int:
+    """Claims, delivers and records one batch. Returns the number of rows handled."""
+    db = SessionLocal(expire_on_commit=False)
+    try:
+        rows = claim_batch(db, batch_size or settings.OUTBOX_BATCH_SIZE)
+        if not rows:
+            return 0
+        shelter_ids = {r.shelter_id for r in rows if r.digest and r.shelter_id is not None}
+        names = dict(db.execute(select(Shelter.id, Shelter.name).where(Shelter.id.in_(shelter_ids))).all()) \
+            if shelter_ids else {}
+        mark_results(db, deliver_batch(rows, names))
+        return len(rows)
+    finally:
+        db.close()
+
+
+def run_worker(poll_seconds: Optional[float] = None, batch_size: Optional[int] = None) -> None:
+    poll = settings.OUTBOX_POLL_SECONDS if poll_seconds is None else poll_seconds
+    print(f"[OUTBOX] worker started (batch={batch_size or settings.OUTBOX_BATCH_SIZE}, poll={poll}s)")
+    while True:
+        try:
+            handled = process_once(batch_size)
+        except Exception as e:
+            print(f"[OUTBOX][ERROR] {e}")
+            handled = 0
+        if not handled:
+            time.sleep(poll)
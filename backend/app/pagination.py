@@ -0,0 +1,44 @@
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+# Keyset (cursor) pagination on (created_at, id), newest first.
+# The cursor is opaque to clients: base64url(JSON [created_at, id]).
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def apply_keyset(q, created_col, id_col, cursor: Optional[str]):
+    """Order newest first and, if a cursor is given, start strictly after it."""
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        q = q.where(or_(created_col < created_at, and_(created_col == created_at, id_col < row_id)))
+    return q.order_by(created_col.desc(), id_col.desc())
+
+
+def split_page(rows: Sequence, page_size: int) -> Tuple[List, Optional[str]]:
+    """
+    Expects page_size + 1 rows (the extra one only signals there is a next page).
+    Returns the page and the cursor for the next one, if any.
+    """
+    items = list(rows[:page_size])
+    if len(rows) <= page_size or not items:
+        return items, None
+    last = items[-1]
+    return items, encode_cursor(last.created_at, last.id)
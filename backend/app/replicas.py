@@ -0,0 +1,222 @@
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, List, Optional
+
+from fastapi import Request
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .cache import TTLCache
+from .db import ThreadedSession, _set_sqlite_pragmas, get_async_db, is_sqlite_file, to_async_url
+from .settings import settings
+
+# Read replicas (DATABASE_REPLICA_URLS). Read-only public routes take get_read_db instead
+# of get_async_db:
+# - Load balancing: round-robin over the replicas currently marked healthy; with none
+#   healthy (or none configured) reads go to the primary.
+# - Health checking: a per-worker task runs SELECT 1 on every replica each
+#   REPLICA_HEALTH_CHECK_SECONDS; a replica that fails is skipped until it answers again.
+#   A connection error on a replica also marks it down right away.
+# - Read-your-writes: after a successful non-GET request, the same client reads from the
+#   primary for READ_YOUR_WRITES_SECONDS. Clients are recognised by their bearer token
+#   (per worker) and by a short-lived cookie (any worker).
+# Locally: cp dev.db replica.db, then DATABASE_REPLICA_URLS=sqlite:///./replica.db
+# (the copy does not follow the primary, which makes stale reads easy to spot).
+
+logger = logging.getLogger("app.db.replicas")
+
+STICKY_COOKIE = "db_primary_until"
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+@dataclass
+class Replica:
+    name: str
+    url: str
+    engine: object
+    SessionLocal: sessionmaker
+    AsyncSessionLocal: Optional[object] = None
+    async_engine: Optional[object] = None
+    healthy: bool = True
+    last_error: Optional[str] = None
+
+    def check(self) -> bool:
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+        except Exception as e:
+            self.mark_down(e)
+            return False
+        if not self.healthy:
+            logger.info("Replica %s is back", self.name)
+        self.healthy, self.last_error = True, None
+        return True
+
+    def mark_down(self, error: Exception) -> None:
+        if self.healthy:
+            logger.warning("Replica %s marked down: %s", self.name, error)
+        self.healthy, self.last_error = False, str(error)
+
+
+def _make_replica(i: int, url: str) -> Replica:
+    engine = create_engine(url, pool_pre_ping=True, future=True)
+    sqlite_tuned = settings.SQLITE_TUNED and is_sqlite_file(url)
+    if sqlite_tuned:
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+    replica = Replica(
+        name=f"replica-{i}", url=url, engine=engine,
+        SessionLocal=sessionmaker(autocommit=False, autoflush=False, bind=engine, future=True,
+                                  expire_on_commit=False),
+    )
+    if settings.DB_ASYNC:
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+        replica.async_engine = create_async_engine(to_async_url(url), pool_pre_ping=True)
+        if sqlite_tuned:
+            event.listen(replica.async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+        replica.AsyncSessionLocal = async_sessionmaker(replica.async_engine, autoflush=False,
+                                                       expire_on_commit=False)
+    if settings.DB_DIAGNOSTICS:
+        from .diagnostics import attach_diagnostics
+        attach_diagnostics(engine)
+        if replica.async_engine is not None:
+            attach_diagnostics(replica.async_engine.sync_engine)
+    return replica
+
+
+class ReplicaSet:
+    def __init__(self, urls: List[str]):
+        self.replicas = [_make_replica(i, url) for i, url in enumerate(urls)]
+        self._rr = itertools.count()
+        self._rr_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._recent_writers = TTLCache(maxsize=settings.AUTH_CACHE_MAX_ENTRIES,
+                                        ttl=settings.READ_YOUR_WRITES_SECONDS)
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def pick(self) -> Optional[Replica]:
+        healthy = [r for r in self.replicas if r.healthy]
+        if not healthy:
+            return None
+        with self._rr_lock:
+            n = next(self._rr)
+        return healthy[n % len(healthy)]
+
+    # --- read-your-writes ---
+    def wrote_recently(self, headers: Headers) -> bool:
+        token = headers.get("authorization")
+        if token and self._recent_writers.get(token):
+            return True
+        for part in headers.get("cookie", "").split(";"):
+            name, _, value = part.strip().partition("=")
+            if name == STICKY_COOKIE:
+                try:
+                    return float(value) > time.time()
+                except ValueError:
+                    return False
+        return False
+
+    def record_write(self, headers: Headers) -> None:
+        token = headers.get("authorization")
+        if token:
+            self._recent_writers.set(token, True)
+
+    # --- health checks ---
+    def check_all(self) -> None:
+        for replica in self.replicas:
+            replica.check()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.REPLICA_HEALTH_CHECK_SECONDS)
+            try:
+                await run_in_threadpool(self.check_all)
+            except Exception:
+                logger.exception("Replica health check failed")
+
+    async def start(self) -> None:
+        if self.replicas and self._task is None and settings.REPLICA_HEALTH_CHECK_SECONDS > 0:
+            await run_in_threadpool(self.check_all)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self.replicas:
+            if replica.async_engine is not None:
+                await replica.async_engine.dispose()
+            replica.engine.dispose()
+
+    def status(self) -> List[dict]:
+        return [{"name": r.name, "healthy": r.healthy, "error": r.last_error} for r in self.replicas]
+
+
+replica_set = ReplicaSet([u.strip() for u in settings.DATABASE_REPLICA_URLS.split(",") if u.strip()])
+_primary_session = asynccontextmanager(get_async_db)
+
+
+# Dependency for read-only routes: a replica session when one is healthy and the client
+# has not written recently, otherwise the primary (same session types as get_async_db)
+async def get_read_db(request: Request) -> AsyncIterator:
+    replica = replica_set.pick() if replica_set else None
+    if replica is None or replica_set.wrote_recently(request.headers):
+        async with _primary_session() as db:
+            yield db
+        return
+
+    try:
+        if replica.AsyncSessionLocal is not None:
+            async with replica.AsyncSessionLocal() as db:
+                yield db
+        else:
+            db = ThreadedSession(replica.SessionLocal())
+            try:
+                yield db
+            finally:
+                await db.close()
+    except Exception as e:
+        # Take a dead replica out of rotation now instead of at the next health check
+        if isinstance(e, (OperationalError, InterfaceError)):
+            replica.mark_down(e)
+        raise
+
+
+class ReadYourWritesMiddleware:
+    """Pins a client to the primary for READ_YOUR_WRITES_SECONDS after a successful write."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in READ_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400 \
+                    and settings.READ_YOUR_WRITES_SECONDS > 0:
+                window = settings.READ_YOUR_WRITES_SECONDS
+                replica_set.record_write(Headers(scope=scope))
+                MutableHeaders(scope=message).append(
+                    "Set-Cookie",
+                    f"{STICKY_COOKIE}={time.time() + window:.3f}; Max-Age={int(window) + 1}; Path=/; "
+                    f"HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,100 @@
+import contextvars
+import json
+from typing import Any
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .settings import settings
+
+# App-wide response class: orjson for JSON, MessagePack when the client asks for it.
+# The wire format is picked once per request by WireFormatMiddleware and read in
+# render(), so the payload is encoded exactly once in the negotiated format.
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# Optional: pip install msgpack
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+_wire_format: contextvars.ContextVar[str] = contextvars.ContextVar("wire_format", default="json")
+
+
+def wire_format() -> str:
+    """Negotiated format for the current request: "json" or "msgpack"."""
+    return _wire_format.get()
+
+
+def msgpack_available() -> bool:
+    return msgpack is not None and settings.MSGPACK_ENABLED
+
+
+def encode_json(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class APIResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        if _wire_format.get() == "msgpack":
+            self.media_type = MSGPACK_MEDIA_TYPES[0]
+            return msgpack.packb(content, use_bin_type=True)
+        return encode_json(content)
+
+
+def wants_msgpack(accept: str) -> bool:
+    """True if the Accept header prefers MessagePack over JSON (q-values respected)."""
+    best_msgpack, best_json = 0.0, 0.0
+    for part in accept.split(","):
+        media, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        media = media.strip().lower()
+        if media in MSGPACK_MEDIA_TYPES:
+            best_msgpack = max(best_msgpack, q)
+        elif media == "application/json":
+            best_json = max(best_json, q)
+    return best_msgpack > 0 and best_msgpack >= best_json
+
+
+class WireFormatMiddleware:
+    """Sets the negotiated wire format for APIResponse and marks responses Vary: Accept."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not msgpack_available():
+            await self.app(scope, receive, send)
+            return
+
+        fmt = "msgpack" if wants_msgpack(Headers(scope=scope).get("accept", "")) else "json"
+
+        async def send_with_vary(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                content_type = headers.get("content-type", "")
+                if content_type.startswith("application/json") or content_type in MSGPACK_MEDIA_TYPES:
+                    headers.add_vary_header("Accept")
+            await send(message)
+
+        token = _wire_format.set(fmt)
+        try:
+            await self.app(scope, receive, send_with_vary)
+        finally:
+            _wire_format.reset(token)
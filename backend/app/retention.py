@@ -0,0 +1,189 @@
+import gzip
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import select, delete, insert, text
+from sqlalchemy.orm import Session, aliased
+
+from .models.capacity import CapacityLog, CapacityLogArchive
+from .settings import settings
+
+# Raw capacity log retention.
+# Logs older than CAPACITY_LOG_RETENTION_DAYS are moved, in batches with one short
+# transaction each, into capacity_log_archive as gzip-compressed NDJSON chunks (one per
+# batch and month). The newest log of every shelter is always kept so the availability
+# index never loses a shelter; hourly/daily history lives on in capacity_rollups.
+#
+# Postgres: capacity_logs is range-partitioned by month on updated_at (see migration
+# a9e3f7c2b5d4). Each run also creates partitions ahead of time and drops expired month
+# partitions once archiving has emptied them, so the hot table stays a fixed size.
+# SQLite: a single table; the batched move into the archive table plays the same role.
+
+ARCHIVE_COLUMNS = ("id", "shelter_id", "beds_total", "beds_available", "updated_at", "updated_by", "created_at")
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def retention_cutoff(now: Optional[datetime] = None) -> Optional[datetime]:
+    """Naive UTC cutoff (rows strictly older are expired), or None if retention is off."""
+    if settings.CAPACITY_LOG_RETENTION_DAYS <= 0:
+        return None
+    now = now or _now()
+    return (now - timedelta(days=settings.CAPACITY_LOG_RETENTION_DAYS)).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _period(ts: datetime) -> str:
+    return f"{ts.year:04d}-{ts.month:02d}"
+
+
+def _encode(rows: List[dict]) -> bytes:
+    lines = "\n".join(json.dumps(r, default=str, separators=(",", ":")) for r in rows)
+    return gzip.compress(lines.encode("utf-8"), compresslevel=6)
+
+
+def archive_batch(db: Session, cutoff: datetime, batch_size: int) -> int:
+    """Moves up to batch_size expired logs into the archive (one transaction). Returns rows moved."""
+    L = CapacityLog
+    newer = aliased(CapacityLog)
+    # Only rows superseded by a newer log of the same shelter (index seek on shelter_id, updated_at)
+    superseded = select(newer.id).where(newer.shelter_id == L.shelter_id, newer.updated_at > L.updated_at).exists()
+    rows = db.execute(
+        select(*(getattr(L, c) for c in ARCHIVE_COLUMNS))
+        .where(L.updated_at < cutoff, superseded)
+        .order_by(L.id)
+        .limit(batch_size)
+    ).mappings().all()
+    if not rows:
+        return 0
+
+    by_period: Dict[str, List[dict]] = {}
+    for r in rows:
+        by_period.setdefault(_period(r["updated_at"]), []).append(dict(r))
+    db.execute(insert(CapacityLogArchive), [
+        {
+            "period": period,
+            "first_log_id": chunk[0]["id"],
+            "last_log_id": chunk[-1]["id"],
+            "row_count": len(chunk),
+            "codec": "ndjson+gzip",
+            "payload": _encode(chunk),
+        }
+        for period, chunk in by_period.items()
+    ])
+    db.execute(delete(L).where(L.id.in_([r["id"] for r in rows])).execution_options(synchronize_session=False))
+    db.commit()
+    return len(rows)
+
+
+# --- Postgres partition maintenance ---
+def partition_name(year: int, month: int) -> str:
+    return f"capacity_logs_p{year:04d}{month:02d}"
+
+
+def _month_start(ts: datetime, add: int = 0) -> datetime:
+    m = ts.year * 12 + (ts.month - 1) + add
+    return datetime(m // 12, m % 12 + 1, 1)
+
+
+def is_partitioned(db: Session) -> bool:
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    return bool(db.scalar(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = 'capacity_logs'"
+    )))
+
+
+def partition_ddl(start: datetime) -> str:
+    end = _month_start(start, 1)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(start.year, start.month)} "
+        f"PARTITION OF capacity_logs FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+    )
+
+
+def ensure_partitions(db: Session, months_ahead: int, since: Optional[datetime] = None) -> None:
+    # Rows land in capacity_logs_default if their month has no partition; keep it empty
+    now = _now()
+    first = _month_start(since) if since is not None else _month_start(now)
+    last = _month_start(now, months_ahead)
+    month = first
+    while month <= last:
+        db.execute(text(partition_ddl(month)))
+        month = _month_start(month, 1)
+    db.commit()
+
+
+def _partitions(db: Session) -> List[Tuple[str, datetime]]:
+    names = db.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = 'capacity_logs'"
+    )).scalars().all()
+    out = []
+    for name in names:
+        suffix = name.rsplit("_p", 1)[-1]
+        if name.startswith("capacity_logs_p") and suffix.isdigit() and len(suffix) == 6:
+            out.append((name, datetime(int(suffix[:4]), int(suffix[4:]), 1)))
+    return out
+
+
+def drop_expired_partitions(db: Session, cutoff: datetime) -> List[str]:
+    """Drops month partitions that end before the cutoff and are already empty."""
+    dropped = []
+    for name, start in sorted(_partitions(db), key=lambda p: p[1]):
+        if _month_start(start, 1) > cutoff:
+            continue
+        if db.execute(text(f"SELECT 1 FROM {name} LIMIT 1")).first() is not None:
+            continue  # still holds some shelter's newest log
+        # Empty, so the brief ACCESS EXCLUSIVE lock is released immediately
+        db.execute(text(f"ALTER TABLE capacity_logs DETACH PARTITION {name}"))
+        db.execute(text(f"DROP TABLE {name}"))
+        db.commit()
+        dropped.append(name)
+    return dropped
+
+
+def run_retention(db: Session, batch_size: Optional[int] = None, max_batches: Optional[int] = None,
+                  pause: Optional[float] = None) -> dict:
+    """One retention pass: archive expired rows in batches, then maintain partitions."""
+    size = batch_size or settings.CAPACITY_ARCHIVE_BATCH_SIZE
+    pause = settings.CAPACITY_ARCHIVE_PAUSE_SECONDS if pause is None else pause
+    cutoff = retention_cutoff()
+    archived, batches = 0, 0
+    if cutoff is not None:
+        while max_batches is None or batches < max_batches:
+            moved = archive_batch(db, cutoff, size)
+            if not moved:
+                break
+            archived += moved
+            batches += 1
+            if pause:
+                time.sleep(pause)  # let writers in between batches
+
+    dropped: List[str] = []
+    if is_partitioned(db):
+        ensure_partitions(db, settings.CAPACITY_PARTITION_MONTHS_AHEAD)
+        if cutoff is not None:
+            dropped = drop_expired_partitions(db, cutoff)
+    return {
+        "cutoff": cutoff.isoformat() if cutoff else None,
+        "archived": archived,
+        "batches": batches,
+        "dropped_partitions": dropped,
+    }
+
+
+def iter_archived_logs(db: Session, period: Optional[str] = None) -> Iterator[dict]:
+    """Decompresses archived logs (optionally one "YYYY-MM"), oldest chunk first."""
+    q = select(CapacityLogArchive.payload).order_by(CapacityLogArchive.first_log_id)
+    if period is not None:
+        q = q.where(CapacityLogArchive.period == period)
+    for payload in db.execute(q).scalars():
+        for line in gzip.decompress(payload).decode("utf-8").splitlines():
+            if line:
+                yield json.loads(line)
@@ -0,0 +1,167 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select, delete, insert, func, case, literal
+from sqlalchemy.orm import Session
+
+from .models.capacity import CapacityLog
+from .models.rollups import CapacityRollup
+from .retention import retention_cutoff
+from .settings import settings
+
+# Capacity rollups: per (shelter, hour|day) min/max/avg beds_available, average
+# occupancy % and number of updates. Averages are per update, not time-weighted.
+# Writers call record_capacity_logs() before committing the logs; rebuild_rollups()
+# recomputes everything (or a range) from capacity_logs with one INSERT ... SELECT per bucket.
+
+BUCKETS = ("hour", "day")
+
+
+def bucket_start(ts: datetime, bucket: str) -> datetime:
+    """Naive UTC bucket start, matching how DateTime columns are stored."""
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    ts = ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0) if bucket == "day" else ts
+
+
+def occupancy_pct(beds_total: int, beds_available: int) -> float:
+    return (beds_total - beds_available) * 100.0 / beds_total if beds_total > 0 else 0.0
+
+
+def _dialect_insert(db: Session):
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        return dialect_insert, func.least, func.greatest
+    from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert, func.min, func.max  # SQLite: multi-argument min()/max() are scalar
+
+
+def record_capacity_logs(db: Session, logs: Iterable) -> None:
+    """
+    Folds capacity logs (anything with shelter_id, beds_total, beds_available, updated_at)
+    into the rollups. Logs are pre-aggregated per bucket, so a bulk write costs one
+    executemany upsert. Runs in the caller's transaction.
+    """
+    if not settings.CAPACITY_ROLLUPS:
+        return
+    acc: Dict[Tuple[int, str, datetime], dict] = {}
+    for log in logs:
+        pct = occupancy_pct(log.beds_total, log.beds_available)
+        for bucket in BUCKETS:
+            key = (log.shelter_id, bucket, bucket_start(log.updated_at, bucket))
+            row = acc.get(key)
+            if row is None:
+                acc[key] = {
+                    "shelter_id": key[0], "bucket": bucket, "bucket_start": key[2], "samples": 1,
+                    "min_available": log.beds_available, "max_available": log.beds_available,
+                    "sum_available": log.beds_available, "sum_occupancy_pct": pct,
+                }
+            else:
+                row["samples"] += 1
+                row["min_available"] = min(row["min_available"], log.beds_available)
+                row["max_available"] = max(row["max_available"], log.beds_available)
+                row["sum_available"] += log.beds_available
+                row["sum_occupancy_pct"] += pct
+    if not acc:
+        return
+
+    dialect_insert, least, greatest = _dialect_insert(db)
+    t = CapacityRollup.__table__
+    stmt = dialect_insert(t)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[t.c.shelter_id, t.c.bucket, t.c.bucket_start],
+        set_={
+            "samples": t.c.samples + stmt.excluded.samples,
+            "min_available": least(t.c.min_available, stmt.excluded.min_available),
+            "max_available": greatest(t.c.max_available, stmt.excluded.max_available),
+            "sum_available": t.c.sum_available + stmt.excluded.sum_available,
+            "sum_occupancy_pct": t.c.sum_occupancy_pct + stmt.excluded.sum_occupancy_pct,
+        },
+    )
+    db.execute(stmt, list(acc.values()))
+
+
+def _bucket_expr(dialect: str, bucket: str, col):
+    if dialect == "postgresql":
+        return func.date_trunc(bucket, col)
+    # Same text format SQLAlchemy uses for DateTime on SQLite, so keys match incremental rows
+    fmt = "%Y-%m-%d %H:00:00.000000" if bucket == "hour" else "%Y-%m-%d 00:00:00.000000"
+    return func.strftime(fmt, col)
+
+
+def backfill_statements(dialect: str, shelter_id: Optional[int] = None,
+                        since: Optional[datetime] = None) -> List:
+    """INSERT ... SELECT per bucket, aggregating capacity_logs (used by rebuild_rollups)."""
+    L = CapacityLog
+    pct = case(
+        (L.beds_total > 0, (L.beds_total - L.beds_available) * 100.0 / L.beds_total),
+        else_=0.0,
+    )
+    stmts = []
+    for bucket in BUCKETS:
+        start = _bucket_expr(dialect, bucket, L.updated_at)
+        sel = select(
+            L.shelter_id, literal(bucket), start,
+            func.count(), func.min(L.beds_available), func.max(L.beds_available),
+            func.sum(L.beds_available), func.sum(pct),
+        ).group_by(L.shelter_id, start)
+        if shelter_id is not None:
+            sel = sel.where(L.shelter_id == shelter_id)
+        if since is not None:
+            sel = sel.where(L.updated_at >= since)
+        stmts.append(insert(CapacityRollup).from_select(
+            ["shelter_id", "bucket", "bucket_start", "samples", "min_available",
+             "max_available", "sum_available", "sum_occupancy_pct"],
+            sel,
+        ))
+    return stmts
+
+
+def rebuild_rollups(db: Session, shelter_id: Optional[int] = None, since: Optional[datetime] = None) -> int:
+    """
+    Recomputes rollups from capacity_logs. With `since`, only buckets from the day
+    containing it onwards are rebuilt. Buckets older than the raw-log retention window
+    are never rebuilt (their logs are archived). Returns the number of rollup rows written.
+    """
+    cutoff = retention_cutoff()
+    if cutoff is not None:
+        first_full_day = bucket_start(cutoff, "day") + timedelta(days=1)
+        since = max(since, first_full_day) if since is not None else first_full_day
+    if since is not None:
+        since = bucket_start(since, "day")
+    q = delete(CapacityRollup)
+    if shelter_id is not None:
+        q = q.where(CapacityRollup.shelter_id == shelter_id)
+    if since is not None:
+        q = q.where(CapacityRollup.bucket_start >= since)
+    db.execute(q)
+
+    written = 0
+    for stmt in backfill_statements(db.get_bind().dialect.name, shelter_id, since):
+        written += db.execute(stmt).rowcount or 0
+    db.commit()
+    return written
+
+
+def read_history(db: Session, shelter_id: int, bucket: str,
+                 from_dt: Optional[datetime], to_dt: Optional[datetime]) -> List[dict]:
+    R = CapacityRollup
+    q = select(
+        R.bucket_start, R.samples, R.min_available, R.max_available, R.sum_available, R.sum_occupancy_pct,
+    ).where(R.shelter_id == shelter_id, R.bucket == bucket)
+    if from_dt is not None:
+        q = q.where(R.bucket_start >= bucket_start(from_dt, bucket))
+    if to_dt is not None:
+        q = q.where(R.bucket_start <= bucket_start(to_dt, bucket))
+    return [
+        {
+            "bucket_start": r.bucket_start,
+            "updates": r.samples,
+            "min_available": r.min_available,
+            "max_available": r.max_available,
+            "avg_available": round(r.sum_available / r.samples, 2),
+            "avg_occupancy_pct": round(r.sum_occupancy_pct / r.samples, 2),
+        }
+        for r in db.execute(q.order_by(R.bucket_start))
+    ]
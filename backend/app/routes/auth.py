@@ -1,35 +1,68 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from sqlalchemy import select, insert
 from ..db import get_db
 from ..schemas import UserCreate, UserLogin, Token, UserOut
-from ..auth import get_password_hash, verify_password, create_access_token, get_user_by_email, get_current_user
+from ..auth import create_access_token, get_user_by_email, get_current_user, CurrentUser
+from ..hashing import HashingBusy, hash_password_async, verify_and_update_async
 from ..models.user import User
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-@router.post("/register", response_model=UserOut, status_code=201)
-def register(payload: UserCreate, db: Session = Depends(get_db)):
-    # enforce unique email
-    existing = get_user_by_email(db, payload.email)
-    if existing:
-        raise HTTPException(status_code=400, detail="Email already registered")
+# Hashing is offloaded to app.hashing's bounded pool; these handlers are async so a
+# burst of logins waits there instead of holding Starlette threadpool threads.
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many concurrent sign-ins, please retry",
+        headers={"Retry-After": "1"},
+    )
 
-    hashed = get_password_hash(payload.password)
+def _create_user(db: Session, payload: UserCreate, hashed: str) -> User:
     user = User(email=payload.email, hashed_password=hashed, role=payload.role, shelter_id=payload.shelter_id)
     db.add(user)
     db.commit()
     db.refresh(user)
     return user
 
+def _save_hash(db: Session, user: User, hashed: str) -> None:
+    user.hashed_password = hashed
+    db.add(user)
+    db.commit()
+
+@router.post("/register", response_model=UserOut, status_code=201)
+async def register(payload: UserCreate, db: Session = Depends(get_db)):
+    # enforce unique email
+    existing = await run_in_threadpool(get_user_by_email, db, payload.email)
+    if existing:
+        raise HTTPException(status_code=400, detail="Email already registered")
+
+    try:
+        hashed = await hash_password_async(payload.password)
+    except HashingBusy:
+        raise _busy()
+    return await run_in_threadpool(_create_user, db, payload, hashed)
+
 @router.post("/login", response_model=Token)
-def login(payload: UserLogin, db: Session = Depends(get_db)):
-    user = get_user_by_email(db, payload.email)
-    if not user or not verify_password(payload.password, user.hashed_password):
+async def login(payload: UserLogin, db: Session = Depends(get_db)):
+    user = await run_in_threadpool(get_user_by_email, db, payload.email)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email or password")
+    try:
+        ok, new_hash = await verify_and_update_async(payload.password, user.hashed_password)
+    except HashingBusy:
+        raise _busy()
+    if not ok:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email or password")
+
+    # transparent rehash when the configured scheme/cost changed
+    if new_hash:
+        await run_in_threadpool(_save_hash, db, user, new_hash)
+
     token = create_access_token({"sub": str(user.id)})
     return {"access_token": token, "token_type": "bearer"}
 
 @router.get("/me", response_model=UserOut)
-def me(current_user: User = Depends(get_current_user)):
+def me(current_user: CurrentUser = Depends(get_current_user)):
     return current_user
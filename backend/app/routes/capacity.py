@@ -1,32 +1,224 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import select
-from typing import List
+import asyncio
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timezone
+from sqlalchemy import select, insert, func
+from typing import List, Optional
 
-from ..db import get_db
+from ..db import get_async_db, SessionLocal
+from ..replicas import get_read_db
 from ..models.shelter import Shelter
 from ..models.capacity import CapacityLog
-from ..schemas import CapacityUpdate, CapacityLogOut
-from ..auth import get_current_user, require_role
-from ..models.user import User
+from ..schemas import (
+    CapacityUpdate, CapacityLogOut, CurrentCapacityOut,
+    CapacityBulkItem, CapacityBulkResult, CapacityBulkOut,
+    CapacityHistoryPoint, RollupBucket,
+)
+from ..auth import get_current_user, require_role, CurrentUser
+from ..availability import availability_index
+from ..live import capacity_broker, parse_live_filter, snapshot, LiveFilter
+from ..settings import settings
+from ..conditional import conditional, make_validator
+from ..rollups import record_capacity_logs, read_history
 
 router = APIRouter(prefix="/capacity", tags=["capacity"])
 
-# Latest capacity logs for a shelter (public)
+# Current availability for every shelter (public), served from the in-memory index
+@router.get("/current", response_model=List[CurrentCapacityOut])
+async def list_current_capacity(db: AsyncSession = Depends(get_async_db)):
+    if not availability_index.loaded:
+        await db.run_sync(availability_index.load)
+    return availability_index.all()
+
+# --- Live feed (public) ---
+# Snapshot on connect, then deltas {shelter_id, beds_available, beds_total, version}.
+# Filters: ?shelter_ids=1,2,3 and/or ?bbox=min_lng,min_lat,max_lng,max_lat
+SHELTER_IDS_QUERY = Query(None, description="Comma-separated shelter ids")
+BBOX_QUERY = Query(None, description="min_lng,min_lat,max_lng,max_lat")
+
+def _load_index() -> None:
+    db = SessionLocal()
+    try:
+        availability_index.ensure_loaded(db)
+    finally:
+        db.close()
+
+async def _open_feed(flt: LiveFilter):
+    if not availability_index.loaded:
+        await run_in_threadpool(_load_index)
+    await capacity_broker.resume()
+    # subscribe before taking the snapshot so nothing falls in between (clients dedupe by version)
+    sub = capacity_broker.subscribe(flt)
+    items = await run_in_threadpool(snapshot, flt)
+    return sub, items
+
+def _sse(event: str, data: dict, event_id: Optional[int] = None) -> str:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+@router.get("/stream")
+async def capacity_stream(request: Request, shelter_ids: Optional[str] = SHELTER_IDS_QUERY,
+                          bbox: Optional[str] = BBOX_QUERY):
+    try:
+        flt = parse_live_filter(shelter_ids, bbox)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    sub, items = await _open_feed(flt)
+
+    async def events():
+        try:
+            yield _sse("snapshot", {"items": items})
+            while not sub.overflowed and not await request.is_disconnected():
+                event = await sub.get(timeout=settings.LIVE_FEED_HEARTBEAT_SECONDS)
+                if event is None:
+                    yield ": ping\n\n"
+                else:
+                    yield _sse("delta", event.to_dict(), event.version)
+        finally:
+            capacity_broker.unsubscribe(sub)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
+@router.websocket("/ws")
+async def capacity_ws(websocket: WebSocket, shelter_ids: Optional[str] = None, bbox: Optional[str] = None):
+    try:
+        flt = parse_live_filter(shelter_ids, bbox)
+    except ValueError:
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    sub, items = await _open_feed(flt)
+    receiver = getter = None
+    try:
+        await websocket.send_json({"type": "snapshot", "items": items})
+        receiver = asyncio.ensure_future(websocket.receive())  # only used to notice disconnects
+        while not sub.overflowed:
+            if getter is None:
+                getter = asyncio.ensure_future(sub.get(timeout=settings.LIVE_FEED_HEARTBEAT_SECONDS))
+            done, _ = await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver in done:
+                if receiver.result()["type"] == "websocket.disconnect":
+                    break
+                receiver = asyncio.ensure_future(websocket.receive())
+            if getter in done:
+                event, getter = getter.result(), None
+                if event is None:
+                    await websocket.send_json({"type": "ping"})
+                else:
+                    await websocket.send_json({"type": "delta", **event.to_dict()})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in (receiver, getter):
+            if task is not None:
+                task.cancel()
+        capacity_broker.unsubscribe(sub)
+
+# Bulk update (admin or shelter): validate everything in one pass, insert valid rows in
+# one executemany, one commit. Invalid items are reported per item and skipped.
+@router.post("/bulk", response_model=CapacityBulkOut,
+             dependencies=[Depends(require_role("admin", "shelter"))])
+async def bulk_update_capacity(payload: List[CapacityBulkItem],
+                               db: AsyncSession = Depends(get_async_db),
+                               user: CurrentUser = Depends(get_current_user)):
+    if not payload:
+        raise HTTPException(status_code=400, detail="No items")
+    if len(payload) > settings.CAPACITY_BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.CAPACITY_BULK_MAX_ITEMS} items per request")
+
+    # existence (and coordinates for the live feed) with a single IN query
+    ids = {item.shelter_id for item in payload}
+    geo = {
+        row.id: (row.geo_lat, row.geo_lng)
+        for row in (await db.execute(
+            select(Shelter.id, Shelter.geo_lat, Shelter.geo_lng).where(Shelter.id.in_(ids))
+        )).all()
+    }
+
+    results: List[CapacityBulkResult] = []
+    valid = []
+    for i, item in enumerate(payload):
+        error = None
+        if user.role != "admin" and item.shelter_id != user.shelter_id:
+            error = "Forbidden"
+        elif item.shelter_id not in geo:
+            error = "Shelter not found"
+        elif item.beds_available > item.beds_total:
+            error = "beds_available cannot exceed beds_total"
+        results.append(CapacityBulkResult(index=i, shelter_id=item.shelter_id, ok=error is None, error=error))
+        if error is None:
+            valid.append(i)
+
+    if valid:
+        now = datetime.now(timezone.utc)
+        rows = [
+            {
+                "shelter_id": payload[i].shelter_id,
+                "beds_total": payload[i].beds_total,
+                "beds_available": payload[i].beds_available,
+                "updated_at": now,
+                "updated_by": user.id,
+            }
+            for i in valid
+        ]
+        stmt = insert(CapacityLog).returning(
+            CapacityLog.id, CapacityLog.shelter_id, CapacityLog.beds_total, CapacityLog.beds_available,
+            CapacityLog.updated_at, CapacityLog.updated_by,
+            sort_by_parameter_order=True,
+        )
+        logs = (await db.execute(stmt, rows)).all()
+        await db.run_sync(record_capacity_logs, logs)
+        await db.commit()
+
+        for i, log in zip(valid, logs):
+            results[i].log = CapacityLogOut.model_validate(log)
+            capacity_broker.publish_log(log, *geo[log.shelter_id])
+
+    return CapacityBulkOut(created=len(valid), failed=len(payload) - len(valid), results=results)
+
+# Latest capacity logs for a shelter (public; read replica)
 @router.get("/{shelter_id}", response_model=List[CapacityLogOut])
-def list_capacity_logs(shelter_id: int, db: Session = Depends(get_db)):
+async def list_capacity_logs(shelter_id: int, request: Request, response: Response,
+                             db: AsyncSession = Depends(get_read_db)):
+    # Logs are append-only: max(id) moves on every write, count when old rows are pruned
+    count, max_id, last_modified = (await db.execute(
+        select(func.count(CapacityLog.id), func.max(CapacityLog.id), func.max(CapacityLog.updated_at))
+        .where(CapacityLog.shelter_id == shelter_id)
+    )).one()
+    validator = make_validator("capacity", shelter_id, count, max_id, last_modified, last_modified=last_modified)
+    not_modified = conditional(request, response, validator)
+    if not_modified is not None:
+        return not_modified
+
     # Return last ~20 entries, newest first
     stmt = select(CapacityLog).where(CapacityLog.shelter_id == shelter_id)\
         .order_by(CapacityLog.updated_at.desc()).limit(20)
-    return list(db.execute(stmt).scalars().all())
+    return list((await db.execute(stmt)).scalars().all())
+
+# Hourly/daily occupancy history from the rollups (public; read replica)
+@router.get("/{shelter_id}/history", response_model=List[CapacityHistoryPoint])
+async def capacity_history(
+    shelter_id: int,
+    bucket: RollupBucket = Query("day"),
+    from_dt: Optional[datetime] = Query(None, alias="from", description="ISO datetime (UTC), inclusive"),
+    to_dt: Optional[datetime] = Query(None, alias="to", description="ISO datetime (UTC), inclusive"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    if from_dt and to_dt and from_dt > to_dt:
+        raise HTTPException(status_code=400, detail="from must be before to")
+    return await db.run_sync(read_history, shelter_id, bucket, from_dt, to_dt)
 
 # Update capacity (admin or shelter)
 @router.post("/{shelter_id}", response_model=CapacityLogOut,
              dependencies=[Depends(require_role("admin", "shelter"))])
-def update_capacity(shelter_id: int, payload: CapacityUpdate,
-                    db: Session = Depends(get_db),
-                    user: User = Depends(get_current_user)):
-    shelter = db.get(Shelter, shelter_id)
+async def update_capacity(shelter_id: int, payload: CapacityUpdate,
+                          db: AsyncSession = Depends(get_async_db),
+                          user: CurrentUser = Depends(get_current_user)):
+    shelter = await db.get(Shelter, shelter_id)
     if not shelter:
         raise HTTPException(status_code=404, detail="Shelter not found")
 
@@ -41,6 +233,10 @@ def update_capacity(shelter_id: int, payload: CapacityUpdate,
         updated_by=user.id
     )
     db.add(log)
-    db.commit()
-    db.refresh(log)
+    await db.flush()
+    await db.run_sync(record_capacity_logs, [log])
+    await db.commit()
+    await db.refresh(log)
+    # updates the availability index and pushes the delta to live subscribers
+    capacity_broker.publish_log(log, shelter.geo_lat, shelter.geo_lng)
     return log
@@ -1,36 +1,109 @@
-from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, Response
+from datetime import date, datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from io import StringIO
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-from typing import List, Optional
+from typing import Iterator, List, Literal, Optional
 import csv
+import json
+import zlib
 
-from ..db import get_db
+from ..db import get_async_db, SessionLocal
 from ..models.intake import IntakeRequest
 from ..models.shelter import Shelter
-from ..models.user import User
 from ..schemas import (
     IntakeRequestCreate,
     IntakeRequestOut,
     IntakeStatusUpdate,       # strict (pending|fulfilled|cancelled)
     IntakeStatusUpdateLoose,  # for future use
+    IntakeStatsRow,
     Paginated,
 )
-from ..auth import require_role, get_current_user
-from ..utils.notifications import send_email_intake, send_intake_sms, send_intake_status_sms
-from ..settings import settings
+from ..auth import require_role, get_current_user, CurrentUser
+from ..outbox import enqueue_intake_created, enqueue_intake_status
+from ..pagination import apply_keyset, split_page
+from ..counters import record_intake_created, record_intake_status_change, count_intakes
+from ..intake_stats import intake_stats, invalidate_intake_stats, parse_group_by
 
 router = APIRouter(prefix="/intake", tags=["intake"])
 
+
+# Role scoping shared by list/search/export/stats
+# - Admin: can view all; optional shelter_id
+# - Shelter role: only their own shelter
+def _scoped_shelter_id(current_user: CurrentUser, shelter_id: Optional[int]) -> Optional[int]:
+    """The shelter the query must be limited to (None = all shelters)."""
+    if current_user.role == "admin":
+        return shelter_id or None
+    if current_user.role == "shelter":
+        if not current_user.shelter_id:
+            raise HTTPException(
+                status_code=403,
+                detail="Shelter role is not associated with a shelter",
+            )
+        return current_user.shelter_id
+    raise HTTPException(status_code=403, detail="Forbidden")
+
+
+def _normalize_status(status: Optional[str]) -> Optional[str]:
+    if not status:
+        return None
+    s = status.lower().strip()
+    if s not in {"pending", "fulfilled", "cancelled"}:
+        raise HTTPException(status_code=422, detail="Invalid status")
+    return s
+
+
+# Shared filters + role scoping for the list/search/export endpoints
+def _apply_intake_filters(q, current_user: CurrentUser, status: Optional[str], shelter_id: Optional[int],
+                          from_dt: Optional[datetime], to_dt: Optional[datetime]):
+    s = _normalize_status(status)
+    if s:
+        q = q.where(IntakeRequest.status == s)
+
+    # date range filters
+    if from_dt:
+        q = q.where(IntakeRequest.created_at >= from_dt)
+    if to_dt:
+        q = q.where(IntakeRequest.created_at <= to_dt)
+
+    scope = _scoped_shelter_id(current_user, shelter_id)
+    if scope is not None:
+        q = q.where(IntakeRequest.shelter_id == scope)
+    return q
+
+
+# List/search responses are built from one JOIN projected to plain rows: no ORM
+# hydration, no identity map, no per-row lazy load of the shelter. FastAPI's cached
+# response-model validator then works on dicts instead of walking ORM attributes.
+def _intake_rows_query():
+    return (
+        select(
+            IntakeRequest.id, IntakeRequest.shelter_id, IntakeRequest.name, IntakeRequest.reason,
+            IntakeRequest.eta, IntakeRequest.created_at, IntakeRequest.status,
+            Shelter.name.label("shelter_name"), Shelter.address.label("shelter_address"),
+        )
+        .join(Shelter, Shelter.id == IntakeRequest.shelter_id)
+    )
+
+
+def _intake_out(row) -> dict:
+    return {
+        "id": row.id, "shelter_id": row.shelter_id, "name": row.name, "reason": row.reason,
+        "eta": row.eta, "created_at": row.created_at, "status": row.status,
+        "shelter": {"id": row.shelter_id, "name": row.shelter_name, "address": row.shelter_address},
+    }
+
+
 # Public: submit intake request
 @router.post("/", response_model=IntakeRequestOut, status_code=201)
-def create_intake(
+async def create_intake(
     payload: IntakeRequestCreate,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    shelter = db.get(Shelter, payload.shelter_id)
+    shelter = await db.get(Shelter, payload.shelter_id)
     if not shelter:
         raise HTTPException(status_code=404, detail="Shelter not found")
 
@@ -40,22 +113,14 @@ def create_intake(
         reason=payload.reason,
         eta=payload.eta,
         status="pending",
+        shelter=shelter,
     )
     db.add(req)
-    db.commit()
-    db.refresh(req)
-
-    # Fire-and-forget notification (email; falls back to stub if disabled)
-    background_tasks.add_task(send_email_intake, shelter.name, req, None)
-
-    # Fire-and-forget SMS notification (local/dev)
-    if settings.TWILIO_ENABLED and settings.TEST_SMS_TO:
-        background_tasks.add_task(
-            send_intake_sms,
-            shelter.name,
-            req,
-            settings.TEST_SMS_TO,  # destination for now (Marker 9: use shelter phone)
-        )
+    await db.flush()
+    await db.run_sync(record_intake_created, req)
+    # Email/SMS go through the outbox in this same transaction; notification_worker.py delivers them
+    enqueue_intake_created(db, shelter, req)
+    await db.commit()  # no refresh: expire_on_commit=False keeps req (and req.shelter) loaded
 
     return req
 
@@ -64,9 +129,10 @@ def create_intake(
 # - Shelter role: only their own shelter
 # - Optional status filter (?status=pending|fulfilled|cancelled)
 @router.get("/", response_model=List[IntakeRequestOut])
-def list_intakes_flexible(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+async def list_intakes_flexible(
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user),
     status: Optional[str] = Query(
         None, description="Filter by status: pending|fulfilled|cancelled"
     ),
@@ -78,142 +144,148 @@ def list_intakes_flexible(
     to_dt: Optional[datetime] = Query(None, description="Filter created_at <= this ISO datetime"),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from X-Next-Cursor; overrides page"),
 ):
-    q = select(IntakeRequest)
+    q = _apply_intake_filters(_intake_rows_query(), current_user, status, shelter_id, from_dt, to_dt)
+    q = apply_keyset(q, IntakeRequest.created_at, IntakeRequest.id, cursor)
 
-    if status:
-        s = status.lower().strip()
-        if s not in {"pending", "fulfilled", "cancelled"}:
-            raise HTTPException(status_code=422, detail="Invalid status")
-        q = q.where(IntakeRequest.status == s)
-
-    # date range filters
-    if from_dt:
-        q = q.where(IntakeRequest.created_at >= from_dt)
-    if to_dt:
-        q = q.where(IntakeRequest.created_at <= to_dt)
-
-    if current_user.role == "admin":
-        if shelter_id:
-            q = q.where(IntakeRequest.shelter_id == shelter_id)
-    elif current_user.role == "shelter":
-        if not current_user.shelter_id:
-            raise HTTPException(
-                status_code=403,
-                detail="Shelter role is not associated with a shelter",
-            )
-        q = q.where(IntakeRequest.shelter_id == current_user.shelter_id)
-    else:
-        raise HTTPException(status_code=403, detail="Forbidden")
-
-    q = q.order_by(IntakeRequest.created_at.desc())
-    # pagination (calculate total first)
-    total = db.scalar(select(func.count()).select_from(q.subquery()))
-    offset = (page - 1) * page_size
-    q = q.limit(page_size).offset(offset)
-    return list(db.execute(q).scalars().all())
+    # fetch one extra row to know whether there is a next page
+    if not cursor:
+        q = q.offset((page - 1) * page_size)
+    rows = (await db.execute(q.limit(page_size + 1))).all()
+    items, next_cursor = split_page(rows, page_size)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [_intake_out(r) for r in items]
 
 
 @router.get("/search", response_model=Paginated[IntakeRequestOut])
-def search_intakes(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+async def search_intakes(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user),
     status: Optional[str] = Query(None),
     shelter_id: Optional[int] = Query(None),
     from_dt: Optional[datetime] = Query(None),
     to_dt: Optional[datetime] = Query(None),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque next_cursor from a previous page; overrides page"),
 ):
-    q = select(IntakeRequest)
-
-    if status:
-        s = status.lower().strip()
-        if s not in {"pending", "fulfilled", "cancelled"}:
-            raise HTTPException(status_code=422, detail="Invalid status")
-        q = q.where(IntakeRequest.status == s)
-
-    if from_dt:
-        q = q.where(IntakeRequest.created_at >= from_dt)
-    if to_dt:
-        q = q.where(IntakeRequest.created_at <= to_dt)
-
-    if current_user.role == "admin":
-        if shelter_id:
-            q = q.where(IntakeRequest.shelter_id == shelter_id)
-    elif current_user.role == "shelter":
-        if not current_user.shelter_id:
-            raise HTTPException(status_code=403, detail="Shelter role is not associated with a shelter")
-        q = q.where(IntakeRequest.shelter_id == current_user.shelter_id)
+    if from_dt is None and to_dt is None:
+        # status/shelter-only filter: answer from the maintained counters
+        scope = _scoped_shelter_id(current_user, shelter_id)
+        total = await db.run_sync(count_intakes, scope, _normalize_status(status))
     else:
-        raise HTTPException(status_code=403, detail="Forbidden")
-
-    q = q.order_by(IntakeRequest.created_at.desc())
-
-    total = db.scalar(select(func.count()).select_from(q.subquery()))
-    offset = (page - 1) * page_size
-    q = q.limit(page_size).offset(offset)
-
-    items = list(db.execute(q).scalars().all())
-    return {"items": items, "total": total or 0, "page": page, "page_size": page_size}
-
-
+        counted = _apply_intake_filters(select(IntakeRequest.id), current_user, status, shelter_id, from_dt, to_dt)
+        total = await db.scalar(select(func.count()).select_from(counted.subquery()))
+
+    q = _apply_intake_filters(_intake_rows_query(), current_user, status, shelter_id, from_dt, to_dt)
+    q = apply_keyset(q, IntakeRequest.created_at, IntakeRequest.id, cursor)
+    if not cursor:
+        q = q.offset((page - 1) * page_size)
+    rows = (await db.execute(q.limit(page_size + 1))).all()
+    items, next_cursor = split_page(rows, page_size)
+    return {"items": [_intake_out(r) for r in items], "total": total or 0, "page": page,
+            "page_size": page_size, "next_cursor": next_cursor}
+
+
+# Aggregated counts, e.g. ?group_by=day,status,shelter (same role scoping as /search)
+@router.get("/stats", response_model=List[IntakeStatsRow], response_model_exclude_none=True)
+async def intake_stats_endpoint(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    group_by: str = Query("day", description="Comma-separated: day|week|shelter|status"),
+    status: Optional[str] = Query(None),
+    shelter_id: Optional[int] = Query(None, description="Admin-only: limit to one shelter"),
+    from_date: Optional[date] = Query(None, alias="from", description="First day (UTC), inclusive"),
+    to_date: Optional[date] = Query(None, alias="to", description="Last day (UTC), inclusive"),
+):
+    try:
+        keys = parse_group_by(group_by)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if from_date and to_date and from_date > to_date:
+        raise HTTPException(status_code=400, detail="from must be before to")
+    scope = _scoped_shelter_id(current_user, shelter_id)
+    return await db.run_sync(intake_stats, keys, scope, _normalize_status(status), from_date, to_date)
+
+
+# Columns written by the export, in order
+EXPORT_COLUMNS = ("id", "shelter_id", "name", "reason", "eta", "status", "created_at")
+EXPORT_CHUNK_ROWS = 1000
+
+EXPORT_FORMATS = {
+    # format -> (filename, media type, gzip?)
+    "csv": ("intakes.csv", "text/csv; charset=utf-8", False),
+    "ndjson": ("intakes.ndjson", "application/x-ndjson", False),
+    "csv.gz": ("intakes.csv.gz", "application/gzip", True),
+    "ndjson.gz": ("intakes.ndjson.gz", "application/gzip", True),
+}
+
+
+def _export_value(v):
+    return v.isoformat() if isinstance(v, datetime) else v
+
+
+def _iter_export(stmt, fmt: str, compress: bool) -> Iterator[bytes]:
+    """
+    Streams the export in chunks. Opens its own session because the request-scoped
+    one is closed before the response body is sent.
+    """
+    gz = zlib.compressobj(wbits=31) if compress else None  # wbits=31 -> gzip container
+    buf = StringIO()
+    writer = csv.writer(buf) if fmt.startswith("csv") else None
+
+    def flush() -> bytes:
+        data = buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+        return gz.compress(data) if gz else data
+
+    if writer:
+        writer.writerow(EXPORT_COLUMNS)
+
+    db = SessionLocal()
+    try:
+        # yield_per -> server-side cursor on Postgres, fixed-size fetches on SQLite
+        result = db.execute(stmt.execution_options(yield_per=EXPORT_CHUNK_ROWS))
+        for rows in result.partitions():
+            for row in rows:
+                if writer:
+                    writer.writerow(["" if v is None else _export_value(v) for v in row])
+                else:
+                    buf.write(json.dumps({k: _export_value(v) for k, v in zip(EXPORT_COLUMNS, row)}))
+                    buf.write("\n")
+            chunk = flush()
+            if chunk:
+                yield chunk
+        tail = flush()
+        if gz:
+            tail += gz.flush()
+        if tail:
+            yield tail
+    finally:
+        db.close()
+
+
+@router.get("/export")
 @router.get("/export.csv")
-def export_intakes_csv(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+def export_intakes(
+    current_user: CurrentUser = Depends(get_current_user),
     status: Optional[str] = Query(None),
     shelter_id: Optional[int] = Query(None),
     from_dt: Optional[datetime] = Query(None),
     to_dt: Optional[datetime] = Query(None),
+    format: Literal["csv", "ndjson", "csv.gz", "ndjson.gz"] = Query("csv"),
 ):
-    q = select(IntakeRequest)
-
-    if status:
-        s = status.lower().strip()
-        if s not in {"pending", "fulfilled", "cancelled"}:
-            raise HTTPException(status_code=422, detail="Invalid status")
-        q = q.where(IntakeRequest.status == s)
-
-    if from_dt:
-        q = q.where(IntakeRequest.created_at >= from_dt)
-    if to_dt:
-        q = q.where(IntakeRequest.created_at <= to_dt)
-
-    if current_user.role == "admin":
-        if shelter_id:
-            q = q.where(IntakeRequest.shelter_id == shelter_id)
-    elif current_user.role == "shelter":
-        if not current_user.shelter_id:
-            raise HTTPException(status_code=403, detail="Shelter role is not associated with a shelter")
-        q = q.where(IntakeRequest.shelter_id == current_user.shelter_id)
-    else:
-        raise HTTPException(status_code=403, detail="Forbidden")
-
+    # Project only the exported columns; no ORM hydration
+    q = select(*(getattr(IntakeRequest, c) for c in EXPORT_COLUMNS))
+    q = _apply_intake_filters(q, current_user, status, shelter_id, from_dt, to_dt)
     q = q.order_by(IntakeRequest.created_at.desc())
-    rows = list(db.execute(q).scalars().all())
-
-    # Build CSV
-    sio = StringIO()
-    writer = csv.writer(sio)
-    writer.writerow(["id", "shelter_id", "name", "reason", "eta", "status", "created_at"])
-    for r in rows:
-        writer.writerow([
-            r.id,
-            r.shelter_id,
-            r.name or "",
-            r.reason or "",
-            r.eta.isoformat() if r.eta else "",
-            r.status,
-            r.created_at.isoformat() if r.created_at else "",
-        ])
-
-    data = sio.getvalue().encode("utf-8")
-    headers = {
-        "Content-Disposition": 'attachment; filename="intakes.csv"',
-        "Content-Type": "text/csv; charset=utf-8",
-    }
-    return Response(content=data, headers=headers, media_type="text/csv")
+
+    filename, media_type, compress = EXPORT_FORMATS[format]
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    return StreamingResponse(_iter_export(q, format, compress), headers=headers, media_type=media_type)
 
 
 # Admin/shelter: list requests
@@ -222,28 +294,34 @@ def export_intakes_csv(
     response_model=List[IntakeRequestOut],
     dependencies=[Depends(require_role("admin", "shelter"))],
 )
-def list_intakes(
+async def list_intakes(
     shelter_id: int,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    page_size: Optional[int] = Query(None, ge=1, le=500, description="Omit to return every intake"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from X-Next-Cursor"),
 ):
-    stmt = (
-        select(IntakeRequest)
-        .where(IntakeRequest.shelter_id == shelter_id)
-        .order_by(IntakeRequest.created_at.desc())
-    )
-    return list(db.execute(stmt).scalars().all())
+    stmt = _intake_rows_query().where(IntakeRequest.shelter_id == shelter_id)
+    stmt = apply_keyset(stmt, IntakeRequest.created_at, IntakeRequest.id, cursor)
+    if page_size is None:
+        return [_intake_out(r) for r in (await db.execute(stmt)).all()]
+
+    rows = (await db.execute(stmt.limit(page_size + 1))).all()
+    items, next_cursor = split_page(rows, page_size)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [_intake_out(r) for r in items]
 
 
 # Update intake status (admin or owning shelter)
 @router.patch("/{intake_id}/status", response_model=IntakeRequestOut)
-def update_intake_status(
+async def update_intake_status(
     intake_id: int,
     payload: IntakeStatusUpdate,  # or IntakeStatusUpdateLoose for case-insensitive
-    background_tasks: BackgroundTasks,            # <--- added
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
-    req = db.get(IntakeRequest, intake_id)
+    req = await db.get(IntakeRequest, intake_id, options=[selectinload(IntakeRequest.shelter)])
     if not req:
         raise HTTPException(status_code=404, detail="Intake not found")
 
@@ -258,16 +336,15 @@ def update_intake_status(
 
     # Only do work if status actually changes
     if req.status != payload.status:
+        old_status = req.status
         req.status = payload.status  # validated by schema
         db.add(req)
-        db.commit()
-        db.refresh(req)
-
-        # Fetch shelter so the SMS can include name/address
-        shelter = db.get(Shelter, req.shelter_id)
-        if shelter:
-            # Fire-and-forget SMS to requester (for now uses TEST_SMS_TO)
-            background_tasks.add_task(send_intake_status_sms, shelter, req)
+        await db.run_sync(record_intake_status_change, req, old_status)
+        # Shelter (already loaded) so the SMS can include name/address
+        if req.shelter:
+            enqueue_intake_status(db, req.shelter, req)
+        await db.commit()
+        invalidate_intake_stats()
 
     return req
 
@@ -1,6 +1,9 @@
-from fastapi import APIRouter
+import hmac
+from fastapi import APIRouter, HTTPException, Request, Response
 from ..settings import settings
 from ..db import ping_db
+from ..metrics import CONTENT_TYPE, registry
+from ..replicas import replica_set
 
 router = APIRouter()
 
@@ -14,4 +17,18 @@ def version():
 
 @router.get("/db-check")
 def db_check():
-    return {"database": "up" if ping_db() else "down"}
+    result = {"database": "up" if ping_db() else "down"}
+    if replica_set:
+        result["replicas"] = replica_set.status()
+    return result
+
+# Prometheus scrape target (this process only)
+@router.get("/metrics", include_in_schema=False)
+def metrics(request: Request):
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if settings.METRICS_TOKEN:
+        supplied = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+        if not hmac.compare_digest(supplied, settings.METRICS_TOKEN):
+            raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return Response(registry.render(), media_type=CONTENT_TYPE)
@@ -1,35 +1,159 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import select, update, delete
-from typing import List
+import tempfile
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, delete, or_, func
+from sqlalchemy.exc import IntegrityError
+from typing import List, Optional
 
-from ..db import get_db
+from ..db import get_async_db, SessionLocal
+from ..replicas import get_read_db
 from ..models.shelter import Shelter
-from ..schemas import ShelterCreate, ShelterUpdate, ShelterOut
+from ..models.counters import IntakeStatusCounter, IntakeDailyCounter
+from ..models.rollups import CapacityRollup
+from ..schemas import ShelterCreate, ShelterUpdate, ShelterOut, ShelterNearbyOut
 from ..auth import require_role
+from ..availability import availability_index
+from ..geo import covering_cells, prefix_range, haversine_km
+from ..conditional import conditional, make_validator
+from ..importer import IMPORT_FORMATS, detect_format, import_file
+from ..settings import settings
 
 router = APIRouter(prefix="/shelters", tags=["shelters"])
 
+DUPLICATE_SHELTER = "A shelter with this name and address already exists"
+
+async def _commit_unique(db: AsyncSession) -> None:
+    # shelters.import_key is unique: same name+address (normalized) as another shelter
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail=DUPLICATE_SHELTER)
+
 # Create (admin or shelter role)
 @router.post("/", response_model=ShelterOut, status_code=201,
              dependencies=[Depends(require_role("admin", "shelter"))])
-def create_shelter(payload: ShelterCreate, db: Session = Depends(get_db)):
+async def create_shelter(payload: ShelterCreate, db: AsyncSession = Depends(get_async_db)):
     s = Shelter(**payload.model_dump())
     db.add(s)
-    db.commit()
-    db.refresh(s)
+    await _commit_unique(db)
+    await db.refresh(s)
     return s
 
-# List (public)
+def _format_from_content_type(content_type: str) -> Optional[str]:
+    media = content_type.split(";")[0].strip().lower()
+    return {
+        "text/csv": "csv",
+        "application/x-ndjson": "ndjson",
+        "application/ndjson": "ndjson",
+        "application/geo+json": "geojson",
+    }.get(media)
+
+# Bulk import with upsert (admin only). Send the file as the raw request body:
+#   curl -X POST --data-binary @sites.csv -H "Content-Type: text/csv" "/shelters/import?format=csv"
+# The body is spooled to a temp file while it arrives, then parsed and upserted in batches.
+@router.post("/import", dependencies=[Depends(require_role("admin"))])
+async def import_shelters(
+    request: Request,
+    format: Optional[str] = Query(None, description="csv | ndjson | geojson (default: from filename / Content-Type)"),
+    filename: Optional[str] = Query(None),
+    batch_size: Optional[int] = Query(None, ge=1, le=10000),
+):
+    fmt = format or detect_format(filename or "") or _format_from_content_type(request.headers.get("content-type", ""))
+    if fmt not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(IMPORT_FORMATS)}")
+
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as spool:
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > settings.IMPORT_MAX_BYTES:
+                raise HTTPException(status_code=413, detail="Import file too large")
+            # past max_size the spool is a real file: keep disk writes off the event loop
+            await run_in_threadpool(spool.write, chunk)
+        spool.seek(0)
+
+        def run():
+            db = SessionLocal()
+            try:
+                return import_file(db, spool, fmt, batch_size)
+            finally:
+                db.close()
+
+        try:
+            result = await run_in_threadpool(run)
+        except (ValueError, UnicodeDecodeError) as e:
+            # malformed file (bad JSON / encoding); batches already committed stay committed
+            raise HTTPException(status_code=400, detail=f"Could not parse {fmt}: {e}")
+    return result.to_dict()
+
+# List (public; served from a read replica when configured)
 @router.get("/", response_model=List[ShelterOut])
-def list_shelters(db: Session = Depends(get_db)):
+async def list_shelters(request: Request, response: Response, db: AsyncSession = Depends(get_read_db)):
+    # Version: count + max(id) catch inserts/deletes, max(updated_at) catches edits
+    count, max_id, last_modified = (await db.execute(
+        select(func.count(Shelter.id), func.max(Shelter.id), func.max(Shelter.updated_at))
+    )).one()
+    validator = make_validator("shelters", count, max_id, last_modified, last_modified=last_modified)
+    not_modified = conditional(request, response, validator)
+    if not_modified is not None:
+        return not_modified
+
     stmt = select(Shelter).order_by(Shelter.id.desc())
-    return list(db.execute(stmt).scalars().all())
+    return list((await db.execute(stmt)).scalars().all())
+
+# Nearby shelters sorted by distance, with current availability (public)
+@router.get("/nearby", response_model=List[ShelterNearbyOut])
+async def nearby_shelters(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(5.0, gt=0, le=200),
+    min_beds: Optional[int] = Query(None, ge=0, description="Only shelters with at least this many free beds"),
+    limit: int = Query(20, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_db),
+):
+    # Candidate set from the geohash index: a few BETWEEN ranges instead of a full scan
+    ranges = [Shelter.geohash.between(*prefix_range(cell)) for cell in covering_cells(lat, lng, radius_km)]
+    candidates = (await db.execute(select(Shelter).where(or_(*ranges)))).scalars().all()
+
+    if not availability_index.loaded:
+        await db.run_sync(availability_index.load)
+    results = []
+    for s in candidates:
+        distance = haversine_km(lat, lng, s.geo_lat, s.geo_lng)
+        if distance > radius_km:
+            continue
+        current = availability_index.get(s.id)
+        if min_beds is not None and (current is None or current.beds_available < min_beds):
+            continue
+        results.append((distance, s, current))
 
-# Get by id (public)
+    results.sort(key=lambda r: r[0])
+    return [
+        ShelterNearbyOut(
+            **ShelterOut.model_validate(s).model_dump(),
+            distance_km=round(distance, 3),
+            beds_total=current.beds_total if current else None,
+            beds_available=current.beds_available if current else None,
+            capacity_updated_at=current.updated_at if current else None,
+        )
+        for distance, s, current in results[:limit]
+    ]
+
+# Get by id (public; read replica)
 @router.get("/{shelter_id}", response_model=ShelterOut)
-def get_shelter(shelter_id: int, db: Session = Depends(get_db)):
-    s = db.get(Shelter, shelter_id)
+async def get_shelter(shelter_id: int, request: Request, response: Response,
+                      db: AsyncSession = Depends(get_read_db)):
+    last_modified = await db.scalar(select(Shelter.updated_at).where(Shelter.id == shelter_id))
+    if last_modified is None:
+        raise HTTPException(404, "Shelter not found")
+    validator = make_validator("shelter", shelter_id, last_modified, last_modified=last_modified)
+    not_modified = conditional(request, response, validator)
+    if not_modified is not None:
+        return not_modified
+
+    s = await db.get(Shelter, shelter_id)
     if not s:
         raise HTTPException(404, "Shelter not found")
     return s
@@ -37,24 +161,28 @@ def get_shelter(shelter_id: int, db: Session = Depends(get_db)):
 # Update (admin or shelter role)
 @router.patch("/{shelter_id}", response_model=ShelterOut,
               dependencies=[Depends(require_role("admin", "shelter"))])
-def update_shelter(shelter_id: int, payload: ShelterUpdate, db: Session = Depends(get_db)):
-    s = db.get(Shelter, shelter_id)
+async def update_shelter(shelter_id: int, payload: ShelterUpdate, db: AsyncSession = Depends(get_async_db)):
+    s = await db.get(Shelter, shelter_id)
     if not s:
         raise HTTPException(404, "Shelter not found")
     for k, v in payload.model_dump(exclude_unset=True).items():
         setattr(s, k, v)
     db.add(s)
-    db.commit()
-    db.refresh(s)
+    await _commit_unique(db)
+    await db.refresh(s)
     return s
 
 # Delete (admin only)
 @router.delete("/{shelter_id}", status_code=204,
                dependencies=[Depends(require_role("admin"))])
-def delete_shelter(shelter_id: int, db: Session = Depends(get_db)):
-    s = db.get(Shelter, shelter_id)
+async def delete_shelter(shelter_id: int, db: AsyncSession = Depends(get_async_db)):
+    s = await db.get(Shelter, shelter_id)
     if not s:
         raise HTTPException(404, "Shelter not found")
-    db.delete(s)
-    db.commit()
+    await db.delete(s)
+    await db.execute(delete(IntakeStatusCounter).where(IntakeStatusCounter.shelter_id == shelter_id))
+    await db.execute(delete(IntakeDailyCounter).where(IntakeDailyCounter.shelter_id == shelter_id))
+    await db.execute(delete(CapacityRollup).where(CapacityRollup.shelter_id == shelter_id))
+    await db.commit()
+    availability_index.discard(shelter_id)
     return
@@ -30,6 +30,8 @@ class UserOut(BaseModel):
 
 
 # ---------- Shelter ----------
+NotificationMode = Literal["immediate", "digest"]
+
 class ShelterBase(BaseModel):
     name: str
     address: str
@@ -38,6 +40,7 @@ class ShelterBase(BaseModel):
     phone: Optional[str] = None
     policies: Optional[str] = None
     hours: Optional[str] = None
+    notification_mode: Optional[NotificationMode] = None
 
 class ShelterCreate(ShelterBase):
     pass
@@ -50,6 +53,7 @@ class ShelterUpdate(BaseModel):
     phone: Optional[str] = None
     policies: Optional[str] = None
     hours: Optional[str] = None
+    notification_mode: Optional[NotificationMode] = None
 
 class ShelterOut(ShelterBase):
     id: int
@@ -58,6 +62,12 @@ class ShelterOut(ShelterBase):
     class Config:
         from_attributes = True
 
+class ShelterNearbyOut(ShelterOut):
+    distance_km: float
+    beds_total: Optional[int] = None
+    beds_available: Optional[int] = None
+    capacity_updated_at: Optional[datetime] = None
+
 class ShelterBrief(BaseModel):
     id: int
     name: str
@@ -81,6 +91,39 @@ class CapacityLogOut(BaseModel):
     class Config:
         from_attributes = True
 
+class CurrentCapacityOut(BaseModel):
+    shelter_id: int
+    beds_total: int
+    beds_available: int
+    updated_at: datetime
+    class Config:
+        from_attributes = True
+
+RollupBucket = Literal["hour", "day"]
+
+class CapacityHistoryPoint(BaseModel):
+    bucket_start: datetime   # UTC
+    updates: int
+    min_available: int
+    max_available: int
+    avg_available: float
+    avg_occupancy_pct: float
+
+class CapacityBulkItem(CapacityUpdate):
+    shelter_id: int
+
+class CapacityBulkResult(BaseModel):
+    index: int                     # position in the request list
+    shelter_id: int
+    ok: bool
+    error: Optional[str] = None
+    log: Optional[CapacityLogOut] = None
+
+class CapacityBulkOut(BaseModel):
+    created: int
+    failed: int
+    results: List[CapacityBulkResult]
+
 # ---------- Intake ----------
 IntakeStatus = Literal["pending", "fulfilled", "cancelled"]
 
@@ -103,6 +146,14 @@ class IntakeRequestOut(BaseModel):
     class Config:
         from_attributes = True
     
+class IntakeStatsRow(BaseModel):
+    # Only the requested group_by keys are set
+    day: Optional[str] = None      # YYYY-MM-DD (UTC)
+    week: Optional[str] = None     # Monday, YYYY-MM-DD
+    shelter: Optional[int] = None  # shelter_id
+    status: Optional[IntakeStatus] = None
+    count: int
+
 # For a more strict status literal from IntakeStatus literal list
 # we using this for now
 class IntakeStatusUpdate(BaseModel):
@@ -127,4 +178,5 @@ class Paginated(BaseModel, Generic[T]):
     items: List[T]
     total: int
     page: int
-    page_size: int
\ No newline at end of file
+    page_size: int
+    next_cursor: Optional[str] = None  # pass back as ?cursor= for keyset paging
\ No newline at end of file
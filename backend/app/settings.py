@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import field_validator
-from typing import List
+from typing import List, Literal
 
 class Settings(BaseSettings):
     # API
@@ -17,12 +17,106 @@ class Settings(BaseSettings):
     # -----------------------------
     DATABASE_URL: str = "sqlite:///./dev.db"
 
+    # SQLite profile for single-box deployments (file databases only): WAL, busy timeout,
+    # synchronous=NORMAL, mmap/cache sizing, one writer at a time per process.
+    SQLITE_TUNED: bool = True
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_SYNCHRONOUS: Literal["OFF", "NORMAL", "FULL"] = "NORMAL"
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE_KB: int = 64 * 1024
+    SQLITE_POOL_SIZE: int = 10
+
+    # Read replicas for read-only public routes (app/replicas.py), comma-separated URLs.
+    # Healthy replicas are used round-robin, the primary when none is.
+    # A client that wrote reads from the primary for READ_YOUR_WRITES_SECONDS afterwards.
+    # REPLICA_HEALTH_CHECK_SECONDS=0 disables the periodic SELECT 1.
+    DATABASE_REPLICA_URLS: str = ""
+    REPLICA_HEALTH_CHECK_SECONDS: float = 5.0
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+
+    # Opt-in SQL diagnostics (app/diagnostics.py): slow-query log, per-request statement
+    # grouping and N+1 warnings; DB_DIAGNOSTICS_HEADER adds X-DB-Queries / Server-Timing.
+    # Off = no engine listeners at all.
+    DB_DIAGNOSTICS: bool = False
+    DB_SLOW_QUERY_MS: float = 200.0
+    DB_N_PLUS_ONE_THRESHOLD: int = 5
+    DB_DIAGNOSTICS_HEADER: bool = False
+
+    # Async DB layer for the shelters/capacity/intake routers (aiosqlite / asyncpg).
+    # ASYNC_DATABASE_URL is derived from DATABASE_URL when left empty.
+    DB_ASYNC: bool = False
+    ASYNC_DATABASE_URL: str = ""
+
+    # Also keep per-day intake counters (shelter, status, day) next to the totals
+    INTAKE_DAILY_COUNTERS: bool = True
+
+    # GET /intake/stats result cache. Closed buckets (before today / this week) only change
+    # when an old intake's status changes; this worker drops its cache on status changes,
+    # other workers pick it up within INTAKE_STATS_CLOSED_TTL_SECONDS.
+    INTAKE_STATS_CLOSED_TTL_SECONDS: float = 24 * 3600
+    INTAKE_STATS_OPEN_TTL_SECONDS: float = 15.0
+
+    # Live capacity feed (/capacity/stream, /capacity/ws). Each worker tails capacity_logs
+    # every LIVE_FEED_POLL_SECONDS to pick up other workers' writes (0 = local only).
+    LIVE_FEED_POLL_SECONDS: float = 1.0
+    LIVE_FEED_LOOKBACK_IDS: int = 100
+    LIVE_FEED_QUEUE_SIZE: int = 256
+    LIVE_FEED_HEARTBEAT_SECONDS: float = 15.0
+
+    # POST /capacity/bulk: max items per request
+    CAPACITY_BULK_MAX_ITEMS: int = 1000
+
+    # Maintain hourly/daily capacity rollups (GET /capacity/{id}/history) on every write
+    CAPACITY_ROLLUPS: bool = True
+
+    # Raw capacity log retention (archive_capacity_logs.py). 0 = keep forever.
+    # Expired rows move to capacity_log_archive (gzip NDJSON) in batches; on Postgres the
+    # job also pre-creates monthly partitions and drops emptied ones.
+    CAPACITY_LOG_RETENTION_DAYS: int = 90
+    CAPACITY_ARCHIVE_BATCH_SIZE: int = 5000
+    CAPACITY_ARCHIVE_PAUSE_SECONDS: float = 0.05
+    CAPACITY_PARTITION_MONTHS_AHEAD: int = 2
+
+    # Shelter import (import_shelters.py, POST /shelters/import): rows per upsert statement
+    IMPORT_BATCH_SIZE: int = 2000
+    IMPORT_MAX_BYTES: int = 200 * 1024 * 1024
+
+    # Response encoding: orjson JSON by default, MessagePack for "Accept: application/msgpack"
+    # (needs msgpack). Bodies >= COMPRESSION_MIN_BYTES are sent br (needs brotli) or gzip;
+    # 0 disables compression (e.g. when the reverse proxy already does it).
+    MSGPACK_ENABLED: bool = True
+    COMPRESSION_MIN_BYTES: int = 1024
+    GZIP_LEVEL: int = 6
+    BROTLI_QUALITY: int = 4
+
+
+    # Prometheus metrics at GET /metrics (per process). Off by default: the output lists
+    # every route, status counts and DB timings. METRICS_TOKEN, if set, must be sent as
+    # "Authorization: Bearer <token>" by the scraper; leave it empty only behind a
+    # network boundary that keeps /metrics private.
+    METRICS_ENABLED: bool = False
+    METRICS_TOKEN: str = ""
 
     # Auth (Marker 3)
     JWT_SECRET: str = "CHANGE_ME"
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24
 
+    # Cache verified tokens + user principals (id, role, shelter_id) per process.
+    # Role/shelter changes made through the ORM invalidate immediately in that process;
+    # other workers pick them up within AUTH_CACHE_TTL_SECONDS.
+    AUTH_CACHE_ENABLED: bool = True
+    AUTH_CACHE_TTL_SECONDS: int = 60
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
+
+    # Password hashing. First scheme hashes new passwords; listed older schemes still
+    # verify and are rehashed on login (e.g. ["argon2","bcrypt"] needs argon2-cffi).
+    PASSWORD_SCHEMES: List[str] = ["bcrypt"]
+    BCRYPT_ROUNDS: int = 12
+    HASH_EXECUTOR: Literal["thread", "process"] = "thread"
+    HASH_WORKERS: int = 4
+    HASH_QUEUE_LIMIT: int = 32   # queued + running; beyond this login/register get 503
+
     # Email (SMTP)
     # Use Gmail App Password (NOT your real password) if using Gmail.
     EMAIL_ENABLED: bool = False
@@ -45,6 +139,21 @@ class Settings(BaseSettings):
 
     TEST_SMS_TO: str = ""           # local testing convenience
 
+    # Notification outbox worker (python notification_worker.py)
+    OUTBOX_BATCH_SIZE: int = 50
+    OUTBOX_POLL_SECONDS: float = 2.0
+    OUTBOX_MAX_ATTEMPTS: int = 8
+    OUTBOX_BACKOFF_SECONDS: float = 5.0        # 5s, 10s, 20s, ... capped below
+    OUTBOX_BACKOFF_MAX_SECONDS: float = 3600.0
+    OUTBOX_LEASE_SECONDS: int = 300            # reclaim rows a crashed worker left in "sending"
+
+    # New-intake notifications: "immediate" (one per intake) or "digest" (one summary per
+    # shelter every DIGEST_WINDOW_SECONDS or DIGEST_MAX_ITEMS intakes, whichever first).
+    # Shelters can override with shelters.notification_mode.
+    NOTIFY_MODE: Literal["immediate", "digest"] = "immediate"
+    DIGEST_WINDOW_SECONDS: int = 60
+    DIGEST_MAX_ITEMS: int = 25
+
 
     # Pydantic v2 config (do NOT add class Config)
     model_config = SettingsConfigDict(
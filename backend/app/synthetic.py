@@ -0,0 +1,376 @@
+import csv
+import io
+import math
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate, islice
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from sqlalchemy import func, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from .counters import rebuild_counters
+from .geo import encode_geohash
+from .hashing import hash_password
+from .importer import normalize_key
+from .models import Base, CapacityLog, IntakeRequest, Shelter, User
+from .retention import ensure_partitions, is_partitioned
+from .rollups import rebuild_rollups
+from .settings import settings
+
+# Deterministic synthetic datasets (seed_synthetic.py, benchmarks/load.py).
+# Same seed + same anchor hour -> identical rows. Rows are generated lazily as tuples and
+# written in one transaction through the fastest path the driver has: COPY ... FROM STDIN
+# on Postgres (psycopg2), executemany on the raw sqlite3 connection with relaxed pragmas,
+# and a Core executemany elsewhere. Counters and rollups are rebuilt set-based afterwards.
+
+SEED_PASSWORD = "synthetic-password"  # every seeded account; only one hash is computed
+
+# Metro areas shelters cluster around: (city, state, lat, lng, relative weight)
+METROS = [
+    ("Nashville", "TN", 36.1627, -86.7816, 3),
+    ("Atlanta", "GA", 33.7490, -84.3880, 5),
+    ("Houston", "TX", 29.7604, -95.3698, 7),
+    ("Chicago", "IL", 41.8781, -87.6298, 8),
+    ("Los Angeles", "CA", 34.0522, -118.2437, 12),
+    ("New York", "NY", 40.7128, -74.0060, 14),
+    ("Seattle", "WA", 47.6062, -122.3321, 4),
+    ("Denver", "CO", 39.7392, -104.9903, 3),
+    ("Phoenix", "AZ", 33.4484, -112.0740, 4),
+    ("Philadelphia", "PA", 39.9526, -75.1652, 5),
+    ("Memphis", "TN", 35.1495, -90.0490, 2),
+    ("New Orleans", "LA", 29.9511, -90.0715, 2),
+]
+STREETS = ("Main St", "Church St", "Broadway", "Oak Ave", "Elm St", "Market St", "2nd Ave", "Jefferson St",
+           "Lincoln Ave", "Park Rd", "Union St", "River Rd")
+KINDS = ("Family Shelter", "Community Housing", "Emergency Shelter", "Rescue Mission", "Safe Haven",
+         "Women's Shelter", "Youth Shelter", "Veterans Housing")
+SIZES = (12, 24, 40, 60, 100, 200)
+SIZE_WEIGHTS = (15, 25, 25, 18, 12, 5)
+REASONS = ("Needs a bed tonight", "Eviction", "Fleeing domestic violence", "Released from hospital",
+           "Lost job", "Family conflict", "Weather emergency", None)
+# Intakes arrive mostly in the afternoon and evening (weights per UTC-naive hour)
+HOUR_CUM = list(accumulate((2, 1, 1, 1, 1, 1, 2, 3, 4, 5, 6, 6, 7, 7, 8, 9, 10, 11, 11, 10, 8, 6, 4, 3)))
+
+
+@dataclass
+class SeedPlan:
+    shelters: int = 1_000
+    intakes: int = 100_000
+    capacity_logs: int = 100_000
+    admins: int = 2
+    public_users: int = 100
+    shelter_users: Optional[int] = None  # one account for the first N shelters (default: all)
+    days: int = 90                       # history window ending at `end`
+    seed: int = 1
+    end: Optional[datetime] = None       # naive UTC; default: the current hour
+
+
+SHELTER_COLUMNS = ("id", "name", "address", "geo_lat", "geo_lng", "geohash", "phone", "policies", "hours",
+                   "import_key", "created_at", "updated_at")
+USER_COLUMNS = ("id", "email", "hashed_password", "role", "shelter_id", "created_at", "updated_at")
+INTAKE_COLUMNS = ("id", "shelter_id", "name", "reason", "eta", "status", "created_at", "updated_at")
+CAPACITY_COLUMNS = ("id", "shelter_id", "beds_total", "beds_available", "updated_at", "updated_by", "created_at")
+
+
+def _ts(dt: Optional[datetime]) -> Optional[str]:
+    # Same text SQLAlchemy stores for DateTime on SQLite; Postgres parses it as-is
+    return dt.isoformat(" ", "microseconds") if dt is not None else None
+
+
+def _rng(plan: SeedPlan, table: str) -> random.Random:
+    # One stream per table, so changing one count doesn't reshuffle the other tables
+    return random.Random(f"{plan.seed}:{table}")
+
+
+# --- generators (tuples in *_COLUMNS order) ---
+def gen_shelters(plan: SeedPlan, first_id: int, start: datetime) -> Iterator[tuple]:
+    rng = _rng(plan, "shelters")
+    cum = list(accumulate(m[4] for m in METROS))
+    for sid in range(first_id, first_id + plan.shelters):
+        city, state, lat0, lng0, weight = rng.choices(METROS, cum_weights=cum)[0]
+        spread = 0.04 * math.sqrt(weight)  # bigger metros sprawl further
+        lat, lng = lat0 + rng.gauss(0, spread), lng0 + rng.gauss(0, spread * 1.2)
+        name = f"{city} {rng.choice(KINDS)} #{sid}"
+        address = f"{rng.randint(100, 9999)} {rng.choice(STREETS)}, {city}, {state}"
+        created = start - timedelta(days=rng.randint(30, 3 * 365))
+        yield (
+            sid, name, address, round(lat, 6), round(lng, 6), encode_geohash(lat, lng),
+            f"{rng.randint(200, 999)}-555-{rng.randint(0, 9999):04d}",
+            rng.choice(('{"pets": false}', '{"pets": true, "curfew": "22:00"}', '{"id_required": false}', None)),
+            rng.choice(("Open 24/7", "5pm-9am daily", "6pm-8am", None)),
+            normalize_key(name, address), _ts(created), _ts(created),
+        )
+
+
+def shelter_sizes(plan: SeedPlan) -> List[int]:
+    rng = _rng(plan, "sizes")
+    return rng.choices(SIZES, weights=SIZE_WEIGHTS, k=plan.shelters)
+
+
+def gen_users(plan: SeedPlan, first_id: int, shelter_ids: Sequence[int], hashed: str, now: datetime) -> Iterator[tuple]:
+    uid = first_id
+    stamp = _ts(now)
+    for _ in range(plan.admins):
+        yield (uid, f"admin{uid}@seed.example.org", hashed, "admin", None, stamp, stamp)
+        uid += 1
+    n_shelter = len(shelter_ids) if plan.shelter_users is None else min(plan.shelter_users, len(shelter_ids))
+    for sid in shelter_ids[:n_shelter]:
+        yield (uid, f"shelter{sid}@seed.example.org", hashed, "shelter", sid, stamp, stamp)
+        uid += 1
+    for _ in range(plan.public_users):
+        yield (uid, f"public{uid}@seed.example.org", hashed, "public", None, stamp, stamp)
+        uid += 1
+
+
+class Clock:
+    """Whole-second offsets from midnight before `start`, formatted without datetime arithmetic."""
+
+    def __init__(self, start: datetime, end: datetime):
+        self.base = start.replace(hour=0, minute=0, second=0, microsecond=0)
+        self.start = int((start - self.base).total_seconds())
+        self.end = int((end - self.base).total_seconds())
+        n_days = self.end // 86400 + 2  # ETAs may run past `end`
+        self.days = [(self.base + timedelta(days=i)).date().isoformat() + " " for i in range(n_days)]
+        self.first_weekday = self.base.weekday()
+        self.times = [f"{h:02d}:{m:02d}:{s:02d}.000000" for h in range(24) for m in range(60) for s in range(60)]
+
+    def ts(self, off: int) -> str:
+        day, sec = divmod(off, 86400)
+        return self.days[day] + self.times[sec]
+
+
+def gen_intakes(plan: SeedPlan, first_id: int, shelter_ids: Sequence[int], sizes: Sequence[int],
+                start: datetime, end: datetime, chunk: int = 10_000) -> Iterator[tuple]:
+    """Arrivals weighted by shelter size and hour of day; older requests have moved on."""
+    rng = _rng(plan, "intakes")
+    clock = Clock(start, end)
+    ts, lo, hi = clock.ts, clock.start, clock.end
+    rand = rng.random  # int(rand() * n) is several times cheaper than randrange/randint
+    size_cum = list(accumulate(sizes))
+    n_days = len(clock.days) - 1
+    n_reasons = len(REASONS)
+    iid = first_id
+    remaining = plan.intakes
+    while remaining > 0:
+        k = min(chunk, remaining)
+        remaining -= k
+        for sid, hour in zip(rng.choices(shelter_ids, cum_weights=size_cum, k=k),
+                             rng.choices(range(24), cum_weights=HOUR_CUM, k=k)):
+            created = int(rand() * n_days) * 86400 + hour * 3600 + int(rand() * 3600)
+            while created >= hi:
+                created -= 86400
+            while created < lo:
+                created += 86400
+            eta = created + 1200 + int(rand() * 27600) if rand() < 0.85 else None  # 20min-8h
+            r = rand()
+            if hi - created < 6 * 3600:
+                status = "pending" if r < 0.8 else "fulfilled" if r < 0.95 else "cancelled"
+            else:
+                status = "fulfilled" if r < 0.72 else "cancelled" if r < 0.92 else "pending"
+            if status == "fulfilled":
+                changed = (eta or created) - 900 + int(rand() * 6300)  # around arrival
+            elif status == "cancelled":
+                changed = created + 300 + int(rand() * 42900)  # within 12h
+            else:
+                changed = created
+            changed = min(max(changed, created), hi)
+            yield (iid, sid, f"Guest {iid}", REASONS[int(rand() * n_reasons)], ts(eta) if eta is not None else None,
+                   status, ts(created), ts(changed))
+            iid += 1
+
+
+def occupancy(rng: random.Random, base: float, hour: float, weekday: int) -> float:
+    # Fullest around 3am, emptiest mid-afternoon, a bit fuller on Friday/Saturday nights
+    weekend = 0.04 if weekday in (4, 5) else 0.0
+    return min(1.0, max(0.0, base + 0.12 * math.cos(2 * math.pi * (hour - 3) / 24) + weekend + rng.gauss(0, 0.03)))
+
+
+def gen_capacity_logs(plan: SeedPlan, first_id: int, shelter_ids: Sequence[int], sizes: Sequence[int],
+                      updated_by: Dict[int, int], start: datetime, end: datetime) -> Iterator[tuple]:
+    """Per-shelter occupancy curves sampled at a regular interval; ids follow time order."""
+    rng = _rng(plan, "capacity")
+    if not shelter_ids or plan.capacity_logs <= 0:
+        return
+    clock = Clock(start, end)
+    n = len(shelter_ids)
+    per_shelter, extra = divmod(plan.capacity_logs, n)
+    steps = per_shelter + (1 if extra else 0)
+    interval = (clock.end - clock.start) / steps
+    bases = [rng.uniform(0.55, 0.95) for _ in range(n)]
+    lid = first_id
+    for step in range(steps):
+        slot = clock.start + interval * step
+        active = n if step < per_shelter else extra
+        for i in range(active):
+            off = min(int(slot + interval * rng.uniform(0.1, 0.9)), clock.end)
+            day, sec = divmod(off, 86400)
+            total = sizes[i]
+            occ = occupancy(rng, bases[i], sec / 3600, (clock.first_weekday + day) % 7)
+            stamp = clock.ts(off)
+            sid = shelter_ids[i]
+            yield (lid, sid, total, total - round(occ * total), stamp, updated_by.get(sid), stamp)
+            lid += 1
+
+
+# --- writers ---
+def _batched(rows: Iterable[tuple], size: int) -> Iterator[List[tuple]]:
+    it = iter(rows)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _copy_rows(dbapi_conn, table: str, columns: Sequence[str], rows: Iterable[tuple], batch_size: int) -> int:
+    # psycopg2: one COPY per batch, CSV so NULL is an unquoted empty field
+    n = 0
+    cur = dbapi_conn.cursor()
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    for batch in _batched(rows, batch_size):
+        buf = io.StringIO()
+        csv.writer(buf).writerows(batch)
+        buf.seek(0)
+        cur.copy_expert(sql, buf)
+        n += len(batch)
+    cur.close()
+    return n
+
+
+def _executemany_rows(dbapi_conn, table: str, columns: Sequence[str], rows: Iterable[tuple], batch_size: int) -> int:
+    n = 0
+    cur = dbapi_conn.cursor()
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    for batch in _batched(rows, batch_size):
+        cur.executemany(sql, batch)
+        n += len(batch)
+    cur.close()
+    return n
+
+
+def _core_rows(conn: Connection, table: str, columns: Sequence[str], rows: Iterable[tuple], batch_size: int) -> int:
+    n = 0
+    t = Base.metadata.tables[table]
+    for batch in _batched(rows, batch_size):
+        conn.execute(t.insert(), [dict(zip(columns, r)) for r in batch])
+        n += len(batch)
+    return n
+
+
+# Bulk-load session settings (per connection, restored afterwards). The single
+# transaction keeps the data consistent; synchronous=OFF only risks the seed itself.
+SQLITE_LOAD_PRAGMAS = {"synchronous": "OFF", "cache_size": "-262144", "temp_store": "MEMORY"}
+
+BULK_TABLES = ("intake_requests", "capacity_logs")
+SEED_TABLES = ("notification_outbox", "capacity_rollups", "capacity_log_archive", "capacity_logs",
+               "intake_daily_counters", "intake_status_counters", "intake_requests", "users", "shelters")
+
+
+def truncate(conn: Connection) -> None:
+    if conn.dialect.name == "postgresql":
+        conn.exec_driver_sql(f"TRUNCATE {', '.join(SEED_TABLES)} RESTART IDENTITY CASCADE")
+        return
+    for table in SEED_TABLES:
+        conn.execute(Base.metadata.tables[table].delete())
+
+
+def _next_id(conn: Connection, model) -> int:
+    return int(conn.scalar(select(func.max(model.id))) or 0) + 1
+
+
+def seed_database(engine: Engine, plan: SeedPlan, replace: bool = False, batch_size: int = 50_000) -> dict:
+    """Writes the plan in one transaction, then rebuilds counters and rollups. Returns counts and timings."""
+    end = plan.end or datetime.now(timezone.utc).replace(tzinfo=None, minute=0, second=0, microsecond=0)
+    start = end - timedelta(days=plan.days)
+    dialect = engine.dialect.name
+    timings: Dict[str, float] = {}
+    counts: Dict[str, int] = {}
+
+    if dialect == "postgresql":
+        with Session(engine) as db:
+            if is_partitioned(db):
+                # monthly partitions for the whole window, so nothing lands in the default one
+                ensure_partitions(db, settings.CAPACITY_PARTITION_MONTHS_AHEAD, since=start)
+
+    hashed = hash_password(SEED_PASSWORD)
+    with engine.connect() as conn:
+        dbapi_conn = conn.connection.dbapi_connection
+        saved: Dict[str, str] = {}
+        if dialect == "sqlite":
+            # on the raw connection: a Connection.execute here would autobegin a transaction
+            for pragma, value in SQLITE_LOAD_PRAGMAS.items():
+                saved[pragma] = dbapi_conn.execute(f"PRAGMA {pragma}").fetchone()[0]
+                dbapi_conn.execute(f"PRAGMA {pragma} = {value}")
+        try:
+            with conn.begin():
+                if replace:
+                    truncate(conn)
+                first = {m: _next_id(conn, m) for m in (Shelter, User, IntakeRequest, CapacityLog)}
+                shelter_ids = list(range(first[Shelter], first[Shelter] + plan.shelters))
+                sizes = shelter_sizes(plan)
+                n_admins = plan.admins
+                n_shelter_users = len(shelter_ids) if plan.shelter_users is None else min(plan.shelter_users, len(shelter_ids))
+                updated_by = {sid: first[User] + n_admins + i for i, sid in enumerate(shelter_ids[:n_shelter_users])}
+
+                if dialect == "postgresql" and hasattr(dbapi_conn, "copy_expert"):
+                    def write(table, columns, rows):
+                        return _copy_rows(dbapi_conn, table, columns, rows, batch_size)
+                elif dialect == "sqlite":
+                    def write(table, columns, rows):
+                        return _executemany_rows(dbapi_conn, table, columns, rows, batch_size)
+                else:
+                    def write(table, columns, rows):
+                        return _core_rows(conn, table, columns, rows, batch_size)
+
+                # Secondary indexes are built once after the load instead of maintained per row
+                # (only when the table starts empty; appending keeps them)
+                deferred = [ix for name in BULK_TABLES for ix in Base.metadata.tables[name].indexes
+                            if not conn.scalar(select(1).select_from(Base.metadata.tables[name]).limit(1))]
+                for ix in deferred:
+                    ix.drop(conn, checkfirst=True)
+
+                for table, columns, rows in (
+                    ("shelters", SHELTER_COLUMNS, gen_shelters(plan, first[Shelter], start)),
+                    ("users", USER_COLUMNS, gen_users(plan, first[User], shelter_ids, hashed, end)),
+                    ("intake_requests", INTAKE_COLUMNS,
+                     gen_intakes(plan, first[IntakeRequest], shelter_ids, sizes, start, end)),
+                    ("capacity_logs", CAPACITY_COLUMNS,
+                     gen_capacity_logs(plan, first[CapacityLog], shelter_ids, sizes, updated_by, start, end)),
+                ):
+                    t0 = time.perf_counter()
+                    counts[table] = write(table, columns, rows)
+                    timings[table] = round(time.perf_counter() - t0, 2)
+
+                t0 = time.perf_counter()
+                for ix in deferred:
+                    ix.create(conn, checkfirst=True)
+                timings["indexes"] = round(time.perf_counter() - t0, 2)
+
+                if dialect == "postgresql":
+                    # explicit ids bypass the serial sequences
+                    for table in ("shelters", "users", "intake_requests", "capacity_logs"):
+                        conn.exec_driver_sql(
+                            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                            f"COALESCE((SELECT MAX(id) FROM {table}), 1))"
+                        )
+        finally:
+            for pragma, value in saved.items():
+                dbapi_conn.execute(f"PRAGMA {pragma} = {value}")
+
+    with Session(engine) as db:
+        t0 = time.perf_counter()
+        rebuild_counters(db)
+        if settings.CAPACITY_ROLLUPS:
+            rebuild_rollups(db)
+        timings["counters_and_rollups"] = round(time.perf_counter() - t0, 2)
+        t0 = time.perf_counter()
+        db.execute(text("ANALYZE"))
+        db.commit()
+        timings["analyze"] = round(time.perf_counter() - t0, 2)
+
+    return {"rows": counts, "seconds": timings, "window": [start.isoformat(), end.isoformat()],
+            "password": SEED_PASSWORD}
@@ -1,6 +1,7 @@
+from contextlib import contextmanager
 from email.message import EmailMessage
 import smtplib, ssl
-from typing import Optional, TYPE_CHECKING
+from typing import Iterator, Optional, Tuple, TYPE_CHECKING
 from ..settings import settings
 
 if TYPE_CHECKING:
@@ -13,25 +14,9 @@ except Exception:  # pragma: no cover
     TwilioClient = None
 
 # Email notifications
-def send_email_stub(shelter_name: str, intake_req):
-    print(f"[NOTIFY] Shelter '{shelter_name}' received new intake request:")
-    print(f" - Name: {intake_req.name or 'N/A'}")
-    print(f" - Reason: {intake_req.reason or 'N/A'}")
-    print(f" - ETA: {intake_req.eta or 'unspecified'}")
-
-def send_email_intake(shelter_name: str, intake_req, to_email: Optional[str] = None):
-    """
-    Sends a real email if EMAIL_ENABLED=True; otherwise prints to console.
-    Falls back to stub on any exception so it never blocks the request.
-    """
-    if not settings.EMAIL_ENABLED:
-        return send_email_stub(shelter_name, intake_req)
-
-    msg = EmailMessage()
-    msg["Subject"] = f"[Shelter App] New intake request for {shelter_name}"
-    msg["From"] = settings.EMAIL_FROM or settings.SMTP_USER
-    msg["To"] = to_email or settings.EMAIL_TO_DEFAULT or settings.SMTP_USER
-
+def intake_email_content(shelter_name: str, intake_req) -> Tuple[str, str]:
+    """(subject, body) for a new-intake email."""
+    subject = f"[Shelter App] New intake request for {shelter_name}"
     body = (
         f"New intake request for {shelter_name}\n\n"
         f"Name: {intake_req.name or 'N/A'}\n"
@@ -39,20 +24,26 @@ def send_email_intake(shelter_name: str, intake_req, to_email: Optional[str] = N
         f"ETA: {intake_req.eta or 'unspecified'}\n"
         f"Intake ID: {intake_req.id}\n"
     )
-    msg.set_content(body)
+    return subject, body
 
-    try:
-        context = ssl.create_default_context()
-        with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=15) as server:
-            if settings.SMTP_STARTTLS:
-                server.starttls(context=context)
-            if settings.SMTP_USER and settings.SMTP_PASSWORD:
-                server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-            server.send_message(msg)
-        print(f"[EMAIL] Sent intake notification to {msg['To']}")
-    except Exception as e:
-        print(f"[EMAIL][ERROR] {e}. Falling back to stub.")
-        send_email_stub(shelter_name, intake_req)
+def build_email(subject: str, body: str, to_email: Optional[str] = None) -> EmailMessage:
+    msg = EmailMessage()
+    msg["Subject"] = subject
+    msg["From"] = settings.EMAIL_FROM or settings.SMTP_USER
+    msg["To"] = to_email or settings.EMAIL_TO_DEFAULT or settings.SMTP_USER
+    msg.set_content(body)
+    return msg
+
+@contextmanager
+def smtp_session() -> Iterator[smtplib.SMTP]:
+    """One authenticated SMTP connection; reuse it for a whole batch of messages."""
+    context = ssl.create_default_context()
+    with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=15) as server:
+        if settings.SMTP_STARTTLS:
+            server.starttls(context=context)
+        if settings.SMTP_USER and settings.SMTP_PASSWORD:
+            server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+        yield server
 
 # SMS notifications
 def _twilio_client() -> Optional["Client"]:
@@ -83,6 +74,26 @@ def send_sms_twilio(
     if not client:
         return
 
+    try:
+        msg = deliver_sms(client, body, to_number, from_number=from_number,
+                          messaging_service_sid=messaging_service_sid)
+        print(f"[SMS] Sent to {to_number}; sid={msg.sid}")
+    except Exception as e:
+        print(f"[SMS][ERROR] {e}")
+
+
+def deliver_sms(
+    client: "Client",
+    body: str,
+    to_number: str,
+    *,
+    from_number: Optional[str] = None,
+    messaging_service_sid: Optional[str] = None,
+):
+    """
+    Sends one SMS with an existing client. Unlike send_sms_twilio this raises on
+    failure, so callers (the outbox worker) can retry.
+    """
     # Prefer explicit args, then settings, then error
     ms_sid = (
         messaging_service_sid
@@ -91,46 +102,32 @@ def send_sms_twilio(
     )
     from_num = from_number or settings.TWILIO_FROM_NUMBER or None
 
-    try:
-        kwargs = {"to": to_number, "body": body}
-        if ms_sid:
-            kwargs["messaging_service_sid"] = ms_sid
-        elif from_num:
-            kwargs["from_"] = from_num
-        else:
-            print("[SMS][ERROR] No Messaging Service SID or From number configured.")
-            return
-
-        msg = client.messages.create(**kwargs)
-        print(f"[SMS] Sent to {to_number}; sid={msg.sid}")
-    except Exception as e:
-        print(f"[SMS][ERROR] {e}")
+    kwargs = {"to": to_number, "body": body}
+    if ms_sid:
+        kwargs["messaging_service_sid"] = ms_sid
+    elif from_num:
+        kwargs["from_"] = from_num
+    else:
+        raise RuntimeError("No Messaging Service SID or From number configured.")
+    return client.messages.create(**kwargs)
 
 
-def send_intake_sms(shelter_name: str, intake_req, to_number: str) -> None:
-    """
-    Formats an intake alert and sends via Twilio SMS.
-    """
-    body = (
+def twilio_client() -> Optional["Client"]:
+    """Public accessor so batch senders can build one client and reuse it."""
+    return _twilio_client()
+
+
+def intake_sms_body(shelter_name: str, intake_req) -> str:
+    return (
         f"New intake at {shelter_name}\n"
         f"Name: {intake_req.name or 'N/A'}\n"
         f"Reason: {intake_req.reason or 'N/A'}\n"
         f"ETA: {intake_req.eta or 'unspecified'}\n"
         f"Intake ID: {intake_req.id}"
     )
-    send_sms_twilio(body, to_number)
 
-def send_intake_status_sms(shelter, intake_req) -> None:
-    """
-    Sends an SMS to the requester (for now: default test destination) whenever
-    an intake status changes. Includes shelter info and the new status.
-    """
-    to_number = getattr(settings, "TEST_SMS_TO", "")
-    if not to_number:
-        print("[SMS] No TEST_SMS_TO configured; skipping status SMS.")
-        return
-
-    body = (
+def intake_status_sms_body(shelter, intake_req) -> str:
+    return (
         f"Update from {shelter.name}\n"
         f"Address: {shelter.address}\n\n"
         f"Intake status is now: {intake_req.status}\n"
@@ -139,4 +136,3 @@ def send_intake_status_sms(shelter, intake_req) -> None:
         f"ETA: {intake_req.eta or 'unspecified'}\n"
         f"Intake ID: {intake_req.id}"
     )
-    send_sms_twilio(body, to_number)
@@ -0,0 +1,39 @@
+# backend/archive_capacity_logs.py
+# Capacity log retention pass: moves logs older than CAPACITY_LOG_RETENTION_DAYS into
+# capacity_log_archive (gzip NDJSON) in short batches, keeping each shelter's newest log.
+# On Postgres it also pre-creates monthly partitions and drops emptied ones.
+# Run it from cron (e.g. hourly) so the hot table stays a fixed size.
+#
+#   python archive_capacity_logs.py
+#   python archive_capacity_logs.py --max-batches 20
+#   python archive_capacity_logs.py --export 2025-01 > capacity_logs-2025-01.ndjson
+
+import argparse
+import json
+import sys
+
+from app.db import SessionLocal
+from app.retention import iter_archived_logs, run_retention
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive expired capacity logs")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--max-batches", type=int, default=None)
+    parser.add_argument("--export", metavar="YYYY-MM", help="print archived logs for a month as NDJSON and exit")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.export:
+            for row in iter_archived_logs(db, args.export):
+                sys.stdout.write(json.dumps(row) + "\n")
+            return
+        print(json.dumps(run_retention(db, args.batch_size, args.max_batches)))
+    except Exception as e:
+        db.rollback()
+        print("❌ Retention pass failed:", e)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
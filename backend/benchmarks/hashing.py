@@ -0,0 +1,60 @@
+# backend/benchmarks/hashing.py
+# Micro-benchmark for password hashing: hashes/sec per core at the configured cost.
+#
+#   python -m benchmarks.hashing                 # settings from .env
+#   python -m benchmarks.hashing --rounds 10 12 --seconds 3
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app.settings import settings
+
+
+def _run(scheme: str, rounds: int, seconds: float) -> int:
+    from passlib.context import CryptContext
+    kwargs = {f"{scheme}__default_rounds": rounds} if scheme == "bcrypt" else {}
+    ctx = CryptContext(schemes=[scheme], **kwargs)
+    n = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        ctx.hash("correct horse battery staple")
+        n += 1
+    return n
+
+
+def bench(scheme: str, rounds: int, seconds: float, procs: int) -> dict:
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=procs) as pool:
+        counts = list(pool.map(_run, [scheme] * procs, [rounds] * procs, [seconds] * procs))
+    elapsed = time.perf_counter() - start
+    total = sum(counts)
+    return {
+        "scheme": scheme,
+        "rounds": rounds if scheme == "bcrypt" else None,
+        "processes": procs,
+        "hashes": total,
+        "hashes_per_sec": round(total / elapsed, 2),
+        "hashes_per_sec_per_core": round(total / seconds / procs, 2),
+        "ms_per_hash": round(1000 * seconds * procs / total, 2) if total else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Password hashing throughput")
+    parser.add_argument("--scheme", default=settings.PASSWORD_SCHEMES[0])
+    parser.add_argument("--rounds", type=int, nargs="+", default=[settings.BCRYPT_ROUNDS])
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--procs", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    for rounds in args.rounds:
+        single = bench(args.scheme, rounds, args.seconds, 1)
+        multi = bench(args.scheme, rounds, args.seconds, args.procs)
+        print(json.dumps({"single_core": single, "all_cores": multi}))
+
+
+if __name__ == "__main__":
+    main()
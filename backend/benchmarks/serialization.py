@@ -0,0 +1,104 @@
+# backend/benchmarks/serialization.py
+# Response encoding cost and bytes on the wire for the shelter list and a page of
+# intake search results: stdlib json vs orjson vs MessagePack, raw / gzip / br.
+#
+#   python -m benchmarks.serialization                  # 1k, 10k, 100k rows
+#   python -m benchmarks.serialization --rows 1000 --repeat 5
+#
+# MessagePack and brotli columns are skipped when those packages aren't installed.
+
+import argparse
+import gzip
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from pydantic import TypeAdapter
+
+from app.compression import brotli
+from app.responses import msgpack, orjson
+from app.schemas import IntakeRequestOut, Paginated, ShelterOut
+from app.settings import settings
+
+
+def shelters(n: int) -> List[ShelterOut]:
+    now = datetime.now(timezone.utc)
+    return [
+        ShelterOut(
+            id=i, name=f"Shelter {i}", address=f"{i} Main St, Nashville, TN",
+            geo_lat=36.16 + i * 1e-4, geo_lng=-86.78 - i * 1e-4, phone="615-555-0100",
+            policies='{"pets": false, "curfew": "22:00"}', hours="9am-9pm",
+            created_at=now, updated_at=now,
+        )
+        for i in range(n)
+    ]
+
+
+def intake_page(n: int) -> Paginated[IntakeRequestOut]:
+    now = datetime.now(timezone.utc)
+    items = [
+        IntakeRequestOut(
+            id=i, shelter_id=i % 50, name=f"Guest {i}", reason="Needs a bed tonight",
+            eta=now + timedelta(hours=2), created_at=now - timedelta(minutes=i),
+            status=("pending", "fulfilled", "cancelled")[i % 3],
+            shelter={"id": i % 50, "name": f"Shelter {i % 50}", "address": "1 Main St"},
+        )
+        for i in range(n)
+    ]
+    return Paginated[IntakeRequestOut](items=items, total=n, page=1, page_size=n)
+
+
+def best_of(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def stdlib_json(content) -> bytes:
+    # what starlette's JSONResponse does
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def bench(name: str, model, adapter: TypeAdapter, repeat: int) -> dict:
+    # FastAPI first dumps the response model to JSON-compatible Python, then the response class encodes it
+    content = adapter.dump_python(model, mode="json")
+    encoders = {"json": stdlib_json}
+    if orjson is not None:
+        encoders["orjson"] = lambda c: orjson.dumps(c, option=orjson.OPT_NON_STR_KEYS)
+    if msgpack is not None:
+        encoders["msgpack"] = lambda c: msgpack.packb(c, use_bin_type=True)
+
+    out = {"payload": name, "dump_ms": round(1000 * best_of(lambda: adapter.dump_python(model, mode="json"), repeat), 2)}
+    for enc, fn in encoders.items():
+        body = fn(content)
+        out[enc] = {
+            "encode_ms": round(1000 * best_of(lambda: fn(content), repeat), 2),
+            "bytes": len(body),
+            "gzip_bytes": len(gzip.compress(body, compresslevel=settings.GZIP_LEVEL)),
+            "gzip_ms": round(1000 * best_of(lambda: gzip.compress(body, compresslevel=settings.GZIP_LEVEL), 1), 2),
+        }
+        if brotli is not None:
+            out[enc]["br_bytes"] = len(brotli.compress(body, quality=settings.BROTLI_QUALITY))
+            out[enc]["br_ms"] = round(1000 * best_of(lambda: brotli.compress(body, quality=settings.BROTLI_QUALITY), 1), 2)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Response serialization and compression")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    shelter_adapter = TypeAdapter(List[ShelterOut])
+    page_adapter = TypeAdapter(Paginated[IntakeRequestOut])
+    for n in args.rows:
+        print(json.dumps({"rows": n, **bench("shelters", shelters(n), shelter_adapter, args.repeat)}))
+        print(json.dumps({"rows": n, **bench("intake_search", intake_page(n), page_adapter, args.repeat)}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# backend/benchmarks/sqlite_concurrency.py
+# Sustained mixed read/write load on a SQLite file through the app's engine and
+# sessions: writer threads create intakes and capacity updates (same statements as the
+# API, counters/rollups included), reader threads run dashboard and map queries.
+# Reports ops/sec, latency percentiles and "database is locked" errors per operation.
+#
+#   python -m benchmarks.sqlite_concurrency                       # SQLITE_TUNED profile
+#   python -m benchmarks.sqlite_concurrency --profile stock       # plain engine, for comparison
+#   python -m benchmarks.sqlite_concurrency --writers 8 --readers 32 --seconds 20
+#
+# Threads pause --think-ms between operations: with no pause, CPU-bound reader threads
+# starve writers of the GIL and the numbers measure the interpreter rather than SQLite.
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+
+def percentile(values: List[float], p: float):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(1000 * values[min(len(values) - 1, int(p * len(values)))], 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite concurrent read/write throughput")
+    parser.add_argument("--profile", choices=["tuned", "stock"], default="tuned")
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--think-ms", type=float, default=10.0,
+                        help="pause between operations per thread; 0 saturates the GIL with readers")
+    parser.add_argument("--shelters", type=int, default=200)
+    parser.add_argument("--intakes", type=int, default=50_000)
+    args = parser.parse_args()
+
+    # The engine is built at import time from these settings
+    tmpdir = tempfile.TemporaryDirectory(prefix="sqlite-concurrency-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmpdir.name, 'bench.db')}"
+    os.environ["SQLITE_TUNED"] = "true" if args.profile == "tuned" else "false"
+    os.environ["DB_ASYNC"] = "false"
+
+    from sqlalchemy import select
+    from app.counters import record_intake_created
+    from app.db import SessionLocal, engine
+    from app.models import Base, CapacityLog, IntakeRequest, Shelter
+    from app.rollups import record_capacity_logs
+    from app.synthetic import SeedPlan, seed_database
+
+    Base.metadata.create_all(engine)
+    seed_database(engine, SeedPlan(shelters=args.shelters, intakes=args.intakes, capacity_logs=args.shelters * 10,
+                                   public_users=0), replace=True)
+
+    def create_intake(db, rng):
+        req = IntakeRequest(shelter_id=rng.randint(1, args.shelters), name="bench", status="pending")
+        db.add(req)
+        db.flush()
+        record_intake_created(db, req)
+        db.commit()
+
+    def update_capacity(db, rng):
+        total = rng.choice((20, 40, 80))
+        log = CapacityLog(shelter_id=rng.randint(1, args.shelters), beds_total=total,
+                          beds_available=rng.randint(0, total))
+        db.add(log)
+        db.flush()
+        record_capacity_logs(db, [log])
+        db.commit()
+
+    def dashboard(db, rng):
+        db.execute(
+            select(IntakeRequest.id, IntakeRequest.status, IntakeRequest.created_at, Shelter.name)
+            .join(Shelter, Shelter.id == IntakeRequest.shelter_id)
+            .where(IntakeRequest.shelter_id == rng.randint(1, args.shelters), IntakeRequest.status == "pending")
+            .order_by(IntakeRequest.created_at.desc(), IntakeRequest.id.desc())
+            .limit(50)
+        ).all()
+
+    def shelter_list(db, rng):
+        db.execute(select(Shelter).order_by(Shelter.id.desc())).scalars().all()
+
+    latencies: Dict[str, List[float]] = {name: [] for name in ("create_intake", "update_capacity", "dashboard", "shelter_list")}
+    errors: Dict[str, int] = {name: 0 for name in latencies}
+    lock = threading.Lock()
+    stop = time.perf_counter() + args.seconds
+
+    def worker(ops, seed):
+        rng = random.Random(seed)
+        while time.perf_counter() < stop:
+            name, fn = rng.choice(ops)
+            db = SessionLocal()
+            start = time.perf_counter()
+            try:
+                fn(db, rng)
+                ok = True
+            except Exception as e:
+                db.rollback()
+                ok = False
+                if "locked" not in str(e):
+                    raise
+            finally:
+                db.close()
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies[name].append(elapsed)
+                else:
+                    errors[name] += 1
+            time.sleep(args.think_ms / 1000)
+
+    writes = [("create_intake", create_intake), ("update_capacity", update_capacity)]
+    reads = [("dashboard", dashboard), ("shelter_list", shelter_list)]
+    threads = [threading.Thread(target=worker, args=(writes, i)) for i in range(args.writers)]
+    threads += [threading.Thread(target=worker, args=(reads, 1000 + i)) for i in range(args.readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    for name, lat in latencies.items():
+        print(json.dumps({
+            "profile": args.profile, "op": name, "ok": len(lat), "locked_errors": errors[name],
+            "ops_per_sec": round(len(lat) / args.seconds, 1),
+            "p50_ms": percentile(lat, 0.5), "p95_ms": percentile(lat, 0.95), "p99_ms": percentile(lat, 0.99),
+        }))
+    print(json.dumps({
+        "profile": args.profile, "writers": args.writers, "readers": args.readers,
+        "journal_mode": engine.connect().exec_driver_sql("PRAGMA journal_mode").scalar(),
+        "writes_per_sec": round(sum(len(latencies[n]) for n, _ in writes) / args.seconds, 1),
+        "reads_per_sec": round(sum(len(latencies[n]) for n, _ in reads) / args.seconds, 1),
+        "locked_errors": sum(errors.values()),
+    }))
+    engine.dispose()
+    tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+# backend/import_shelters.py
+# Bulk-loads shelters from CSV / NDJSON / GeoJSON with upsert semantics
+# (matched on external id, else normalized name + address).
+#
+#   python import_shelters.py sites.csv
+#   python import_shelters.py sites.geojson --batch-size 5000
+
+import argparse
+import json
+import time
+
+from app.db import SessionLocal
+from app.importer import IMPORT_FORMATS, detect_format, import_file
+
+def main():
+    parser = argparse.ArgumentParser(description="Import shelters (upsert)")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="default: from the file extension")
+    parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args()
+
+    fmt = args.format or detect_format(args.path)
+    if fmt is None:
+        parser.error("could not detect the format; pass --format")
+
+    db = SessionLocal()
+    start = time.perf_counter()
+    try:
+        with open(args.path, "rb") as fp:
+            result = import_file(db, fp, fmt, args.batch_size)
+        print(json.dumps({**result.to_dict(), "seconds": round(time.perf_counter() - start, 2)}))
+    except Exception as e:
+        db.rollback()
+        print("❌ Import failed:", e)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
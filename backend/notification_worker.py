@@ -0,0 +1,35 @@
+# backend/notification_worker.py
+# Delivers queued intake emails/SMS from notification_outbox. Run alongside the API:
+#
+#   python notification_worker.py            # loop forever
+#   python notification_worker.py --once     # drain one batch (cron / debugging)
+#   python notification_worker.py --metrics-port 9101   # Prometheus delivery counters
+#
+# Several workers can run at once; each claims a disjoint batch.
+
+import argparse
+
+from app.metrics import serve_metrics
+from app.outbox import process_once, run_worker
+
+def main():
+    parser = argparse.ArgumentParser(description="Notification outbox worker")
+    parser.add_argument("--once", action="store_true", help="process a single batch and exit")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--poll", type=float, default=None, help="seconds to sleep when idle")
+    parser.add_argument("--metrics-port", type=int, default=None, help="serve /metrics on this port")
+    args = parser.parse_args()
+
+    if args.metrics_port:
+        serve_metrics(args.metrics_port)
+
+    if args.once:
+        print(f"✅ Processed {process_once(args.batch_size)} notification(s).")
+        return
+    try:
+        run_worker(poll_seconds=args.poll, batch_size=args.batch_size)
+    except KeyboardInterrupt:
+        print("Stopped.")
+
+if __name__ == "__main__":
+    main()
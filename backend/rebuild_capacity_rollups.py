@@ -0,0 +1,31 @@
+# backend/rebuild_capacity_rollups.py
+# Recomputes capacity_rollups (hourly/daily aggregates) from capacity_logs.
+# Run after bulk loads or manual SQL edits; --since limits the work to recent days.
+#
+#   python rebuild_capacity_rollups.py
+#   python rebuild_capacity_rollups.py --shelter-id 3 --since 2025-01-01
+
+import argparse
+from datetime import datetime
+
+from app.db import SessionLocal
+from app.rollups import rebuild_rollups
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild capacity rollups")
+    parser.add_argument("--shelter-id", type=int, default=None)
+    parser.add_argument("--since", type=datetime.fromisoformat, default=None, help="ISO date/datetime (UTC)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        rows = rebuild_rollups(db, args.shelter_id, args.since)
+        print(f"✅ Rebuilt capacity rollups ({rows} rows).")
+    except Exception as e:
+        db.rollback()
+        print("❌ Error rebuilding rollups:", e)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+# backend/rebuild_intake_counters.py
+# Recomputes intake_status_counters / intake_daily_counters from intake_requests.
+# Run after bulk loads, manual SQL edits, or if totals ever drift.
+
+from app.db import SessionLocal
+from app.counters import rebuild_counters
+
+def main():
+    db = SessionLocal()
+    try:
+        rows = rebuild_counters(db)
+        print(f"✅ Rebuilt intake counters ({rows} shelter/status rows).")
+    except Exception as e:
+        db.rollback()
+        print("❌ Error rebuilding counters:", e)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import os
+import tempfile
+
+# app.db builds its engines at import time: point them at a throwaway file database
+# (a file, so the SQLite profile in app/db.py applies) before anything imports app
+_tmpdir = tempfile.TemporaryDirectory(prefix="shelter-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir.name, 'test.db')}"
+os.environ["DB_ASYNC"] = "false"
+os.environ["EMAIL_ENABLED"] = "false"
+os.environ["TWILIO_ENABLED"] = "false"
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.db import engine
+from app.models import Base
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    Base.metadata.create_all(engine)
+    yield
+    engine.dispose()
+    _tmpdir.cleanup()
+
+
+@pytest.fixture(scope="session")
+def client(schema):
+    from app.main import app
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    creds = {"email": "admin@tests.example.org", "password": "password123"}
+    client.post("/auth/register", json={**creds, "role": "admin"})
+    r = client.post("/auth/login", json=creds)
+    assert r.status_code == 200, r.text
+    return {"Authorization": "Bearer " + r.json()["access_token"]}
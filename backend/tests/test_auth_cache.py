@@ -0,0 +1,58 @@
+from app.db import SessionLocal
+from app.models.user import User
+
+
+def _login(client, email, role):
+    creds = {"email": email, "password": "password123"}
+    client.post("/auth/register", json={**creds, "role": role})
+    r = client.post("/auth/login", json=creds)
+    assert r.status_code == 200, r.text
+    return {"Authorization": "Bearer " + r.json()["access_token"]}
+
+
+def _set_role(email, role, commit=True):
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.email == email).one()
+        user.role = role
+        db.flush()
+        if commit:
+            db.commit()
+        else:
+            db.rollback()
+    finally:
+        db.close()
+
+
+def test_role_change_is_seen_by_the_next_request(client):
+    email = "revoked@tests.example.org"
+    headers = _login(client, email, "admin")
+    assert client.get("/intake/", headers=headers).status_code == 200  # principal now cached
+
+    _set_role(email, "public")
+    assert client.get("/intake/", headers=headers).status_code == 403
+
+
+def test_rolled_back_role_change_keeps_the_cached_role(client):
+    email = "kept@tests.example.org"
+    headers = _login(client, email, "admin")
+    assert client.get("/intake/", headers=headers).status_code == 200
+
+    _set_role(email, "public", commit=False)
+    assert client.get("/intake/", headers=headers).status_code == 200
+
+
+def test_lookup_racing_a_commit_does_not_recache_the_old_role(client):
+    from app import auth
+
+    email = "raced@tests.example.org"
+    headers = _login(client, email, "admin")
+    assert client.get("/intake/", headers=headers).status_code == 200
+    user_id = next(iter(uid for uid, p in auth._user_cache._data.items() if p[0].email == email))
+
+    # A lookup that read the row before the commit tries to cache it afterwards
+    stale = auth._user_cache.get(user_id)
+    version = auth._user_versions.get(user_id, 0)
+    _set_role(email, "public")
+    auth._cache_principal(stale, version)
+    assert client.get("/intake/", headers=headers).status_code == 403
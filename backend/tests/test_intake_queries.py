@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.counters import rebuild_counters
+from app.db import SessionLocal, engine
+from app.models import IntakeRequest, Shelter
+
+SHELTERS = 4
+INTAKES = SHELTERS * 120  # every shelter fills the largest page
+PAGE_SIZES = (1, 10, 100)
+
+
+@pytest.fixture(scope="module")
+def shelter_ids():
+    db = SessionLocal()
+    try:
+        shelters = [Shelter(name=f"Query test {i}", address=f"{i} Count St", geo_lat=36.1 + i / 100, geo_lng=-86.7)
+                    for i in range(SHELTERS)]
+        db.add_all(shelters)
+        db.flush()
+        start = datetime(2025, 1, 1)
+        db.add_all([
+            IntakeRequest(shelter_id=shelters[i % SHELTERS].id, name=f"guest {i}", status="pending",
+                          created_at=start + timedelta(minutes=i))
+            for i in range(INTAKES)
+        ])
+        db.flush()
+        rebuild_counters(db)
+        db.commit()
+        return [s.id for s in shelters]
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def count_queries():
+    statements = []
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before)
+    yield statements
+    event.remove(engine, "before_cursor_execute", before)
+
+
+@pytest.mark.parametrize("path", ["/intake/", "/intake/search", "/intake/{shelter_id}"])
+def test_intake_list_query_count_is_constant(client, admin_headers, shelter_ids, count_queries, path):
+    url = path.format(shelter_id=shelter_ids[0])
+    client.get(url, params={"page_size": 1}, headers=admin_headers)  # warm the auth cache
+
+    counts = {}
+    for page_size in PAGE_SIZES:
+        count_queries.clear()
+        r = client.get(url, params={"page_size": page_size}, headers=admin_headers)
+        assert r.status_code == 200, r.text
+        body = r.json()
+        items = body["items"] if isinstance(body, dict) else body
+        assert len(items) == page_size
+        assert all(item["shelter"]["name"].startswith("Query test") for item in items)
+        counts[page_size] = len(count_queries)
+
+    assert counts[PAGE_SIZES[0]] > 0
+    assert len(set(counts.values())) == 1, f"{path}: statements per page size {counts}"
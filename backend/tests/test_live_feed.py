@@ -0,0 +1,57 @@
+import asyncio
+
+from app.availability import availability_index
+from app.db import SessionLocal
+from app.live import CapacityBroker, LiveFilter
+from app.models import CapacityLog, Shelter
+from app.settings import settings
+
+
+def _shelter_id():
+    db = SessionLocal()
+    try:
+        s = Shelter(name="Live feed test", address="2 Poll St", geo_lat=36.1, geo_lng=-86.7)
+        db.add(s)
+        db.commit()
+        return s.id
+    finally:
+        db.close()
+
+
+def _log_from_another_worker(shelter_id, beds_available):
+    db = SessionLocal()
+    try:
+        log = CapacityLog(shelter_id=shelter_id, beds_total=40, beds_available=beds_available)
+        db.add(log)
+        db.commit()
+        return log.id
+    finally:
+        db.close()
+
+
+def test_poller_idles_without_subscribers_and_resumes_without_replay(monkeypatch):
+    monkeypatch.setattr(settings, "LIVE_FEED_POLL_SECONDS", 0.01)
+    shelter_id = _shelter_id()
+
+    async def scenario():
+        broker = CapacityBroker()
+        await broker.start()
+        try:
+            start_id = broker._last_id
+            missed = _log_from_another_worker(shelter_id, 5)
+            await asyncio.sleep(0.1)
+            assert broker._last_id == start_id  # nobody listening: no polls
+
+            await broker.resume()
+            sub = broker.subscribe(LiveFilter(shelter_ids=frozenset({shelter_id})))
+            assert broker._last_id == missed
+            assert availability_index.get(shelter_id).version == missed
+            assert sub.queue.empty()  # the idle gap is not replayed
+
+            fresh = _log_from_another_worker(shelter_id, 4)
+            event = await sub.get(timeout=2)
+            assert event is not None and event.version == fresh
+        finally:
+            await broker.stop()
+
+    asyncio.run(scenario())
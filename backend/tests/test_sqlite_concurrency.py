@@ -0,0 +1,120 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+from sqlalchemy import func, select, text
+
+from app.counters import record_intake_created
+from app.db import SQLITE_TUNED, SessionLocal, engine, writer_gate
+from app.models import IntakeRequest, Shelter
+
+WRITERS = 4
+READERS = 8
+SECONDS = 2.0
+
+pytestmark = pytest.mark.skipif(not SQLITE_TUNED, reason="needs the SQLite profile on a file database")
+
+
+@pytest.fixture(scope="module")
+def shelter_id():
+    db = SessionLocal()
+    try:
+        s = Shelter(name="Concurrency test", address="1 Lock St", geo_lat=36.2, geo_lng=-86.8)
+        db.add(s)
+        db.commit()
+        return s.id
+    finally:
+        db.close()
+
+
+def test_concurrent_writers_and_readers_never_hit_locked(shelter_id):
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+    ops = {"write": 0, "read": 0}
+    errors = []
+    lock = threading.Lock()
+    stop = time.perf_counter() + SECONDS
+
+    def write():
+        db = SessionLocal()
+        try:
+            req = IntakeRequest(shelter_id=shelter_id, name="concurrent", status="pending")
+            db.add(req)
+            db.flush()
+            record_intake_created(db, req)
+            db.commit()
+        finally:
+            db.close()
+
+    def read():
+        db = SessionLocal()
+        try:
+            db.execute(
+                select(IntakeRequest.id, Shelter.name)
+                .join(Shelter, Shelter.id == IntakeRequest.shelter_id)
+                .where(IntakeRequest.shelter_id == shelter_id)
+                .order_by(IntakeRequest.id.desc())
+                .limit(50)
+            ).all()
+        finally:
+            db.close()
+
+    def worker(kind, fn):
+        while time.perf_counter() < stop:
+            try:
+                fn()
+            except Exception as e:  # "database is locked" included
+                with lock:
+                    errors.append(repr(e))
+                return
+            with lock:
+                ops[kind] += 1
+            time.sleep(0.005)  # keep reader threads from starving writers of the GIL
+
+    threads = [threading.Thread(target=worker, args=("write", write)) for _ in range(WRITERS)]
+    threads += [threading.Thread(target=worker, args=("read", read)) for _ in range(READERS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert ops["write"] > 0 and ops["read"] > 0
+
+    db = SessionLocal()
+    try:
+        stored = db.scalar(select(func.count()).select_from(IntakeRequest).where(IntakeRequest.shelter_id == shelter_id))
+    finally:
+        db.close()
+    assert stored == ops["write"]
+
+
+def test_cte_write_takes_the_writer_gate(shelter_id):
+    with engine.connect() as conn:
+        ids = select(Shelter.id).where(Shelter.id == shelter_id).cte("ids")
+        conn.execute(select(ids.c.id)).all()
+        assert not conn.info.get("holds_writer_gate")
+        conn.execute(
+            text("WITH s AS (SELECT :id AS id) UPDATE shelters SET phone = NULL WHERE id IN (SELECT id FROM s)"),
+            {"id": shelter_id},
+        )
+        assert conn.info.get("holds_writer_gate")
+        conn.rollback()
+    assert not writer_gate._lock.locked()
+
+
+def test_second_writer_on_same_thread_fails_fast(shelter_id):
+    first, second = SessionLocal(), SessionLocal()
+    try:
+        first.add(IntakeRequest(shelter_id=shelter_id, name="first", status="pending"))
+        first.flush()
+        second.add(IntakeRequest(shelter_id=shelter_id, name="second", status="pending"))
+        start = time.perf_counter()
+        with pytest.raises(sqlite3.OperationalError, match="writer gate already held"):
+            second.flush()
+        assert time.perf_counter() - start < writer_gate.timeout / 2
+    finally:
+        second.close()
+        first.close()
+    assert not writer_gate._lock.locked()